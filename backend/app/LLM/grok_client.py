@@ -1,51 +1,100 @@
 # backend/LLM/grok_client.py
 
+import asyncio
 import os
+import time
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from xai_sdk import Client
-from xai_sdk.chat import user, system
-import tiktoken
+from functools import lru_cache
+from typing import AsyncIterator, Optional
+
+from app.LLM.tokens import count_tokens, token_usage
+from app.utils.instrumentation import LLM_REQUEST_SECONDS, record_llm_usage
 
 # Load API key from .env
 load_dotenv()
 XAI_API_KEY = os.getenv("XAI_API_KEY")
 
-if not XAI_API_KEY:
-    raise ValueError("XAI_API_KEY is not set in the .env file")
+MODEL         = "grok-4"
+SYSTEM_PROMPT = "You are a financial analyst. Be concise, helpful, and insightful."
+
+# Process-wide limits for async LLM calls (streams hold a slot until done)
+LLM_MAX_CONCURRENCY     = max(1, int(os.getenv("LLM_MAX_CONCURRENCY", "4")))
+# Request starts per minute across the process (0 = unlimited)
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "0"))
+
+
+class _CallLimiter:
+    """
+    At most LLM_MAX_CONCURRENCY calls in flight, and call starts spaced
+    60 / LLM_REQUESTS_PER_MINUTE seconds apart when a rate is set.
+    """
+    def __init__(self, concurrency: int, per_minute: float):
+        self.slots    = asyncio.Semaphore(concurrency)
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self.lock     = asyncio.Lock()
+        self.next_at  = 0.0
+
+    @asynccontextmanager
+    async def slot(self):
+        async with self.slots:
+            if self.interval:
+                async with self.lock:
+                    now  = time.monotonic()
+                    wait = self.next_at - now
+                    self.next_at = max(now, self.next_at) + self.interval
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            yield
 
-client = Client(api_key=XAI_API_KEY)
 
-# Token counter
-def count_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
-    enc = tiktoken.encoding_for_model(model)
-    return len(enc.encode(text))
+_LIMITER = _CallLimiter(LLM_MAX_CONCURRENCY, LLM_REQUESTS_PER_MINUTE)
+
+
+# xai_sdk (grpc) is imported and the clients are built on first insight
+# request, so the dashboard starts fast and without LLM credentials
+@lru_cache(maxsize=1)
+def get_client():
+    if not XAI_API_KEY:
+        raise ValueError("XAI_API_KEY is not set in the .env file")
+    from xai_sdk import Client
+    return Client(api_key=XAI_API_KEY)
+
+@lru_cache(maxsize=1)
+def get_async_client():
+    if not XAI_API_KEY:
+        raise ValueError("XAI_API_KEY is not set in the .env file")
+    from xai_sdk import AsyncClient
+    return AsyncClient(api_key=XAI_API_KEY)
+
+def _new_chat(llm_client, prompt: str):
+    from xai_sdk.chat import user, system
+    chat = llm_client.chat.create(model=MODEL)
+    chat.append(system(SYSTEM_PROMPT))
+    chat.append(user(prompt))
+    return chat
 
 def generate_grok_insight(prompt: str, return_usage: bool = False) -> dict | str:
+    start = time.perf_counter()
     try:
-        chat = client.chat.create(model="grok-4")
-        chat.append(system("You are a financial analyst. Be concise, helpful, and insightful."))
-        chat.append(user(prompt))
+        chat = _new_chat(get_client(), prompt)
 
         response = chat.sample()
         insight = response.content.strip()
+        LLM_REQUEST_SECONDS.observe(time.perf_counter() - start, mode="sample", outcome="ok")
 
+        usage = token_usage(count_tokens(prompt), insight)
+        record_llm_usage(usage)
         if return_usage:
-            input_tokens = count_tokens(prompt)
-            output_tokens = count_tokens(insight)
-            total_tokens = input_tokens + output_tokens
-
             return {
                 "text": insight,
-                "usage": {
-                    "prompt_tokens": input_tokens,
-                    "completion_tokens": output_tokens,
-                    "total_tokens": total_tokens
-                }
+                "usage": usage
             }
 
         return insight
 
     except Exception as e:
+        LLM_REQUEST_SECONDS.observe(time.perf_counter() - start, mode="sample", outcome="error")
         print("🔴 Grok LLM Error:", e)
         if return_usage:
             return {
@@ -56,4 +105,52 @@ def generate_grok_insight(prompt: str, return_usage: bool = False) -> dict | str
                     "total_tokens": 0
                 }
             }
-        return f"Insight generation failed: {str(e)}"
\ No newline at end of file
+        return f"Insight generation failed: {str(e)}"
+
+
+async def generate_grok_insight_async(prompt: str, prompt_tokens: Optional[int] = None) -> dict:
+    """
+    Non-blocking generate_grok_insight(prompt, return_usage=True) on the
+    async xAI client. Errors propagate so failed insights are never cached.
+
+    Pass prompt_tokens when the caller has already counted the prompt.
+    """
+    async with _LIMITER.slot():
+        start = time.perf_counter()
+        try:
+            chat = _new_chat(get_async_client(), prompt)
+
+            response = await chat.sample()
+            insight  = response.content.strip()
+        except BaseException:
+            LLM_REQUEST_SECONDS.observe(time.perf_counter() - start, mode="sample", outcome="error")
+            raise
+    LLM_REQUEST_SECONDS.observe(time.perf_counter() - start, mode="sample", outcome="ok")
+
+    if prompt_tokens is None:
+        prompt_tokens = count_tokens(prompt)
+    usage = token_usage(prompt_tokens, insight)
+    record_llm_usage(usage)
+    return {
+        "text": insight,
+        "usage": usage
+    }
+
+
+async def stream_grok_insight(prompt: str) -> AsyncIterator[str]:
+    """
+    Yields the insight text piece by piece as the model produces it.
+    Errors propagate to the caller, which also records the token usage.
+    """
+    async with _LIMITER.slot():
+        start   = time.perf_counter()
+        outcome = "error"
+        try:
+            chat = _new_chat(get_async_client(), prompt)
+
+            async for _, chunk in chat.stream():
+                if chunk.content:
+                    yield chunk.content
+            outcome = "ok"
+        finally:
+            LLM_REQUEST_SECONDS.observe(time.perf_counter() - start, mode="stream", outcome=outcome)
@@ -0,0 +1,194 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.utils.cache import TTLCache
+
+# "memory" – in-process LRU (lost on restart)
+# "disk"   – SQLite file at INSIGHT_CACHE_PATH (survives restarts)
+# "off"    – every call reaches the LLM
+BACKEND         = os.getenv("INSIGHT_CACHE_BACKEND", "memory").lower()
+CACHE_PATH      = os.getenv("INSIGHT_CACHE_PATH", "insight_cache.sqlite3")
+MAX_ENTRIES     = int(os.getenv("INSIGHT_CACHE_MAX_ENTRIES", "2048"))
+# Concurrent identical prompts wait for one LLM call instead of each making one
+SINGLE_FLIGHT   = os.getenv("INSIGHT_CACHE_SINGLE_FLIGHT", "true").lower() in ("1", "true", "yes")
+
+
+class GenerationCancelled(Exception):
+    """The caller generating a shared insight was cancelled before it finished."""
+
+
+def insight_key(prompt: str, model: str) -> str:
+    """Fingerprint of a prompt for one model: identical prompts share an entry."""
+    return hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).hexdigest()
+
+
+class MemoryInsightStore:
+    """In-process LRU store on top of TTLCache."""
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self._cache = TTLCache(max_entries=max_entries)
+
+    def get(self, key: str) -> Optional[dict]:
+        return self._cache.get(key)
+
+    def set(self, key: str, value: dict, ttl: float):
+        self._cache.set(key, value, ttl)
+
+    def clear(self):
+        self._cache.clear()
+
+
+class DiskInsightStore:
+    """
+    SQLite-backed store, so insights survive restarts and are shared by
+    workers on the same host. Expired rows are skipped on read and pruned
+    on write; the oldest rows go once max_entries is exceeded.
+    """
+    def __init__(self, path: str = CACHE_PATH, max_entries: int = MAX_ENTRIES):
+        self.path        = path
+        self.max_entries = max_entries
+        self._lock       = threading.Lock()
+        self._conn       = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS insights (
+                    key        TEXT PRIMARY KEY,
+                    value      TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    stored_at  REAL NOT NULL
+                )
+            """)
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM insights WHERE key = ? AND expires_at > ?",
+                (key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: dict, ttl: float):
+        if ttl <= 0:
+            return
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO insights (key, value, expires_at, stored_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + ttl, now)
+            )
+            self._conn.execute("DELETE FROM insights WHERE expires_at <= ?", (now,))
+            self._conn.execute(
+                """
+                DELETE FROM insights WHERE key IN (
+                    SELECT key FROM insights ORDER BY stored_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,)
+            )
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM insights")
+
+
+class InsightCache:
+    """
+    Memoizes LLM insights by insight_key(prompt, model).
+
+    Only successful generations are stored: if generate() raises, the
+    error reaches every waiter and nothing is cached. If the caller
+    running generate() is cancelled, its waiters retry instead.
+
+    Example:
+        cache  = InsightCache(MemoryInsightStore())
+        result = await cache.get_or_generate(prompt, "grok-4", ttl,
+                                             lambda: generate_grok_insight_async(prompt))
+    """
+    def __init__(self, store=None, single_flight: bool = SINGLE_FLIGHT):
+        self.store         = store
+        self.single_flight = single_flight
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits   = 0
+        self.misses = 0
+
+    def get(self, prompt: str, model: str) -> Optional[dict]:
+        if self.store is None:
+            return None
+        value = self.store.get(insight_key(prompt, model))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, prompt: str, model: str, value: dict, ttl: float):
+        if self.store is not None:
+            self.store.set(insight_key(prompt, model), value, ttl)
+
+    async def get_or_generate(
+        self,
+        prompt:   str,
+        model:    str,
+        ttl:      float,
+        generate: Callable[[], Awaitable[dict]],
+    ) -> Any:
+        cached = self.get(prompt, model)
+        if cached is not None:
+            return cached
+
+        key = insight_key(prompt, model)
+        if self.single_flight and key in self._inflight:
+            try:
+                return await asyncio.shield(self._inflight[key])
+            except GenerationCancelled:
+                # the caller generating it went away (disconnect, timeout):
+                # the first waiter to get here generates it instead
+                return await self.get_or_generate(prompt, model, ttl, generate)
+
+        future = asyncio.get_running_loop().create_future()
+        if self.single_flight:
+            self._inflight[key] = future
+        try:
+            value = await generate()
+            self.set(prompt, model, value, ttl)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            # waiters get a regular error (and retry) rather than this
+            # request's cancellation
+            future.set_exception(GenerationCancelled(key))
+            future.exception()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            # waiters (if any) see the error; don't warn when there are none
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend":   type(self.store).__name__ if self.store is not None else None,
+            "hits":      self.hits,
+            "misses":    self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "inflight":  len(self._inflight),
+        }
+
+
+def _default_store():
+    if BACKEND == "disk":
+        return DiskInsightStore(CACHE_PATH)
+    if BACKEND == "memory":
+        return MemoryInsightStore()
+    return None
+
+
+INSIGHT_CACHE = InsightCache(_default_store())
@@ -0,0 +1,42 @@
+from functools import lru_cache
+from typing import List, Optional
+
+# Tokenizer used for usage accounting (grok has no public tokenizer;
+# cl100k via gpt-3.5-turbo is close enough for cost tracking)
+DEFAULT_MODEL = "gpt-3.5-turbo"
+
+
+@lru_cache(maxsize=4)
+def get_encoding(model: str = DEFAULT_MODEL):
+    """
+    Loads the tiktoken encoding for a model once per process. tiktoken is
+    imported here rather than at module level so the dashboard path never
+    pays for it.
+    """
+    import tiktoken
+    return tiktoken.encoding_for_model(model)
+
+
+def count_tokens(text: str, model: str = DEFAULT_MODEL) -> int:
+    # encode_ordinary: count special-token text as plain text instead of raising
+    return len(get_encoding(model).encode_ordinary(text))
+
+
+def count_tokens_batch(texts: List[str], model: str = DEFAULT_MODEL) -> List[int]:
+    """Counts many texts in one call (tiktoken encodes the batch in parallel)."""
+    if not texts:
+        return []
+    return [len(ids) for ids in get_encoding(model).encode_ordinary_batch(list(texts))]
+
+
+def token_usage(prompt_tokens: int, completion: Optional[str]) -> dict:
+    """
+    Usage dict for one insight, given the already-counted prompt tokens;
+    only the completion is tokenized here.
+    """
+    completion_tokens = count_tokens(completion) if completion is not None else 0
+    return {
+        "prompt_tokens":     prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens":      prompt_tokens + completion_tokens
+    }
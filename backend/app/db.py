@@ -1,8 +1,11 @@
 import os
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import sessionmaker
 
+from app.utils.instrumentation import instrument_engine
+
 load_dotenv()  # loads .env into environment
 
 # —————————————————————————————
@@ -14,11 +17,65 @@ DATABASE_URL = (
     f"{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
  )
 
+# —————————————————————————————
+# 1a) Pool profile
+# —————————————————————————————
+# DB_POOL_PROFILE picks the defaults; every DB_POOL_* variable overrides
+# its field. "api" trades the per-checkout pre-ping round trip for a
+# recycle age below the server / load balancer idle timeout, and checks
+# out the most recently used (warmest) connection first.
+POOL_PROFILES = {
+    "default": {"size": 5,  "overflow": 10, "recycle": -1,   "timeout": 30, "pre_ping": True,  "lifo": False},
+    "api":     {"size": 10, "overflow": 20, "recycle": 1800, "timeout": 10, "pre_ping": False, "lifo": True},
+    "batch":   {"size": 2,  "overflow": 2,  "recycle": 3600, "timeout": 60, "pre_ping": True,  "lifo": False},
+}
+
+def pool_settings() -> dict:
+    """create_engine pool keyword arguments for the configured profile."""
+    profile = dict(POOL_PROFILES[os.getenv("DB_POOL_PROFILE", "default").lower()])
+    for field, cast in (("size", int), ("overflow", int), ("recycle", int), ("timeout", float)):
+        value = os.getenv(f"DB_POOL_{field.upper()}")
+        if value is not None:
+            profile[field] = cast(value)
+    for field in ("pre_ping", "lifo"):
+        value = os.getenv(f"DB_POOL_{field.upper()}")
+        if value is not None:
+            profile[field] = value.lower() in ("1", "true", "yes")
+    return {
+        "pool_size":     profile["size"],
+        "max_overflow":  profile["overflow"],
+        "pool_recycle":  profile["recycle"],
+        "pool_timeout":  profile["timeout"],
+        "pool_pre_ping": profile["pre_ping"],
+        "pool_use_lifo": profile["lifo"],
+    }
+
+# Compiled-statement cache entries per engine (SQLAlchemy default 500)
+QUERY_CACHE_SIZE = int(os.getenv("DB_QUERY_CACHE_SIZE", "1000"))
+# Server-side plan_cache_mode for every connection (unset = server default)
+PLAN_CACHE_MODE  = os.getenv("DB_PLAN_CACHE_MODE")
+if PLAN_CACHE_MODE not in (None, "auto", "force_custom_plan", "force_generic_plan"):
+    raise ValueError(f"Unsupported DB_PLAN_CACHE_MODE: {PLAN_CACHE_MODE}")
+
+def _apply_session_settings(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"SET plan_cache_mode = {PLAN_CACHE_MODE}")
+    finally:
+        cursor.close()
+
+def _configure(sync_engine):
+    instrument_engine(sync_engine)
+    if PLAN_CACHE_MODE:
+        event.listen(sync_engine, "connect", _apply_session_settings)
+
 engine = create_engine(
     DATABASE_URL,
     future=True,
-    pool_pre_ping=True,
+    query_cache_size=QUERY_CACHE_SIZE,
+    **pool_settings(),
 )
+_configure(engine)
 
 def get_engine():
     """
@@ -27,6 +84,36 @@ def get_engine():
     return engine
 
 
+# —————————————————————————————
+# 1b) Async engine (opt-in via DB_ASYNC)
+# —————————————————————————————
+ASYNC_DB = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+
+# asyncpg prepares every statement server-side; the dialect keeps this
+# many prepared statements per connection, so a repeated dashboard query
+# is parsed (and, with plan_cache_mode, planned) once per connection.
+PREPARED_STATEMENT_CACHE_SIZE = int(os.getenv("DB_PREPARED_STATEMENT_CACHE_SIZE", "256"))
+
+ASYNC_DATABASE_URL = (
+    DATABASE_URL.replace("+pg8000", "+asyncpg", 1)
+    + f"?prepared_statement_cache_size={PREPARED_STATEMENT_CACHE_SIZE}"
+)
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    query_cache_size=QUERY_CACHE_SIZE,
+    **pool_settings(),
+) if ASYNC_DB else None
+if async_engine is not None:
+    _configure(async_engine.sync_engine)
+
+def get_async_engine():
+    """
+    Returns the AsyncEngine, or None when DB_ASYNC is disabled.
+    """
+    return async_engine
+
+
 # —————————————————————————————
 # 2) Session factory & dependency
 # —————————————————————————————
@@ -0,0 +1,88 @@
+import inspect
+import os
+import time
+from functools import lru_cache
+
+from graphql import GraphQLError
+
+from strawberry.extensions import Extension
+from strawberry.extensions.utils import is_introspection_field
+from strawberry.schema.execute import parse_document, validate_document
+
+from app.utils.instrumentation import GRAPHQL_RESOLVER_SECONDS
+
+# Distinct documents kept parsed / validated per process
+DOCUMENT_CACHE_SIZE = int(os.getenv("GRAPHQL_DOCUMENT_CACHE_SIZE", "256"))
+
+
+@lru_cache(maxsize=DOCUMENT_CACHE_SIZE)
+def _parse(query: str):
+    return parse_document(query)
+
+
+@lru_cache(maxsize=DOCUMENT_CACHE_SIZE)
+def _validate(schema, document, rules) -> list:
+    return validate_document(schema, document, rules)
+
+
+class DocumentCache(Extension):
+    """
+    Parses and validates each distinct query string once per process.
+
+    The LRUs live at module level and the extension is registered as a
+    class, so every request gets its own instance (and execution context)
+    while sharing the cached documents. The cached parse returns the same
+    document object for the same text, which is what makes the validation
+    lookup hit.
+    """
+    def on_parsing_start(self):
+        # a query that fails to parse is left to strawberry, which reports
+        # the syntax error as a regular {"errors": [...]} result
+        try:
+            self.execution_context.graphql_document = _parse(self.execution_context.query)
+        except GraphQLError:
+            pass
+
+    def on_validation_start(self):
+        ctx = self.execution_context
+        ctx.errors = _validate(ctx.schema._schema, ctx.graphql_document, ctx.validation_rules)
+
+
+class ResolverTiming(Extension):
+    """
+    Records the duration of every root field resolver (dashboard,
+    chartInsight, ...) in graphql_resolver_duration_seconds. Nested fields
+    are plain attribute reads and are not timed.
+    """
+    def resolve(self, _next, root, info, *args, **kwargs):
+        if info.path.prev is not None or is_introspection_field(info):
+            return _next(root, info, *args, **kwargs)
+
+        field = f"{info.parent_type.name}.{info.field_name}"
+        start = time.perf_counter()
+        try:
+            result = _next(root, info, *args, **kwargs)
+        except Exception:
+            GRAPHQL_RESOLVER_SECONDS.observe(time.perf_counter() - start, field=field, outcome="error")
+            raise
+        if inspect.isawaitable(result):
+            return self._timed(result, field, start)
+        GRAPHQL_RESOLVER_SECONDS.observe(time.perf_counter() - start, field=field, outcome="ok")
+        return result
+
+    @staticmethod
+    async def _timed(result, field: str, start: float):
+        outcome = "error"
+        try:
+            value   = await result
+            outcome = "ok"
+            return value
+        finally:
+            GRAPHQL_RESOLVER_SECONDS.observe(time.perf_counter() - start, field=field, outcome=outcome)
+
+
+def document_cache_stats() -> dict:
+    return {
+        "parse":    _parse.cache_info()._asdict(),
+        "validate": _validate.cache_info()._asdict(),
+    }
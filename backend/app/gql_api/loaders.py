@@ -0,0 +1,17 @@
+from app.services.fetch_dashboard import load_parts_async, fetch_acquirer_names_async
+from app.utils.dataloader import DataLoader
+
+
+class RequestLoaders:
+    """
+    Per-request DataLoaders, created fresh for every GraphQL operation and
+    exposed as info.context["loaders"].
+
+    - dashboard_parts: PartRef -> (metrics, charts). Every dashboard /
+      chartInsight field in one document queues its query parts here, so
+      identical parts are fetched once and the rest share one batched load.
+    - acquirer_names:  acquirer id -> name, one IN (...) query per batch.
+    """
+    def __init__(self):
+        self.dashboard_parts = DataLoader(load_parts_async)
+        self.acquirer_names  = DataLoader(fetch_acquirer_names_async)
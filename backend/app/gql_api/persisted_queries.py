@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+from typing import Optional
+
+from starlette import status
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+
+from strawberry.asgi.handlers import HTTPHandler
+from strawberry.exceptions import MissingQueryError
+from strawberry.http import parse_query_params, parse_request_data
+from strawberry.schema.exceptions import InvalidOperationTypeError
+from strawberry.types.graphql import OperationType
+
+from app.utils.cache import TTLCache
+
+# Automatic persisted queries (Apollo APQ protocol): clients send
+# extensions.persistedQuery.sha256Hash and only send the full query text
+# when the server answers PERSISTED_QUERY_NOT_FOUND.
+APQ_TTL         = float(os.getenv("GRAPHQL_APQ_TTL", str(24 * 3600)))
+# Cache-Control max-age for hashed GET queries (0 = not cacheable)
+APQ_GET_MAX_AGE = int(os.getenv("GRAPHQL_APQ_GET_MAX_AGE", "60"))
+
+PERSISTED_QUERIES = TTLCache(
+    max_entries=int(os.getenv("GRAPHQL_APQ_MAX_ENTRIES", "1024")),
+    max_bytes=int(os.getenv("GRAPHQL_APQ_MAX_BYTES", str(4 * 1024 * 1024))),
+)
+
+
+def query_hash(query: str) -> str:
+    return hashlib.sha256(query.encode("utf-8")).hexdigest()
+
+
+def _apq_error(message: str, code: str) -> JSONResponse:
+    return JSONResponse(
+        {"errors": [{"message": message, "extensions": {"code": code}}]},
+        status_code=status.HTTP_200_OK,
+    )
+
+
+def _persisted_hash(data: dict) -> Optional[str]:
+    extensions = data.get("extensions") or {}
+    if isinstance(extensions, str):
+        # GET requests carry extensions as a JSON-encoded parameter
+        try:
+            extensions = json.loads(extensions)
+        except json.JSONDecodeError:
+            return None
+    if not isinstance(extensions, dict):
+        return None
+    persisted = extensions.get("persistedQuery") or {}
+    return persisted.get("sha256Hash") if persisted.get("version", 1) == 1 else None
+
+
+class PersistedQueryHTTPHandler(HTTPHandler):
+    """
+    strawberry's HTTP handler with automatic persisted queries.
+
+    - hash + query:  the query is checked against the hash and registered
+    - hash only:     the registered query is executed, or the response is
+                     PERSISTED_QUERY_NOT_FOUND so the client retries with
+                     the full text
+    - no hash:       handled exactly as before
+
+    Hashed GET queries that succeed get a Cache-Control header, so
+    intermediaries can cache them by URL.
+    """
+    async def get_http_response(
+        self,
+        request: Request,
+        execute,
+        process_result,
+        root_value,
+        context,
+    ) -> Response:
+        data = await self._json_payload(request)
+        sha  = _persisted_hash(data) if data is not None else None
+        if sha is None:
+            return await super().get_http_response(
+                request, execute, process_result, root_value, context
+            )
+
+        if data.get("query"):
+            if query_hash(data["query"]) != sha:
+                return _apq_error("provided sha does not match query", "INTERNAL_SERVER_ERROR")
+            PERSISTED_QUERIES.set(sha, data["query"], APQ_TTL)
+        else:
+            query = PERSISTED_QUERIES.get(sha)
+            if query is None:
+                return _apq_error("PersistedQueryNotFound", "PERSISTED_QUERY_NOT_FOUND")
+            data = {**data, "query": query}
+
+        try:
+            request_data = parse_request_data(data)
+        except MissingQueryError:
+            return PlainTextResponse(
+                "No GraphQL query found in the request",
+                status_code=status.HTTP_400_BAD_REQUEST,
+            )
+
+        allowed_operation_types = OperationType.from_http(request.method)
+        if not self.allow_queries_via_get and request.method == "GET":
+            allowed_operation_types = allowed_operation_types - {OperationType.QUERY}
+
+        try:
+            result = await execute(
+                request_data.query,
+                variables=request_data.variables,
+                context=context,
+                operation_name=request_data.operation_name,
+                root_value=root_value,
+                allowed_operation_types=allowed_operation_types,
+            )
+        except InvalidOperationTypeError as e:
+            return PlainTextResponse(
+                e.as_http_error_reason(request.method),
+                status_code=status.HTTP_400_BAD_REQUEST,
+            )
+
+        response_data = await process_result(request=request, result=result)
+        response      = JSONResponse(response_data, status_code=status.HTTP_200_OK)
+        if request.method == "GET" and APQ_GET_MAX_AGE > 0 and not result.errors:
+            response.headers["Cache-Control"] = f"public, max-age={APQ_GET_MAX_AGE}"
+        return response
+
+    @staticmethod
+    async def _json_payload(request: Request) -> Optional[dict]:
+        """The request's GraphQL payload for GET / JSON POST, else None."""
+        try:
+            if request.method == "GET" and request.query_params:
+                return parse_query_params(dict(request.query_params))
+            if request.method == "POST" and "application/json" in request.headers.get("Content-Type", ""):
+                data = await request.json()
+                return data if isinstance(data, dict) else None
+        except json.JSONDecodeError:
+            # let the default handler produce its usual error
+            pass
+        return None
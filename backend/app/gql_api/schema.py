@@ -1,16 +1,25 @@
+import asyncio
+
 import strawberry
 from strawberry.scalars import JSON
+from strawberry.types import Info
+from strawberry.types.nodes import SelectedField
 from enum import Enum
 from datetime import date
-from typing import List, Optional, Tuple
-
-import tiktoken
-from scipy.stats import norm
-import numpy as np
+from typing import AsyncGenerator, List, Optional, Tuple
 
-from app.services.fetch_dashboard import get_dashboard_data
+from app.services.fetch_dashboard import get_dashboard_data_async, window_ttl
 from app.services.chart_configs import chart_configs
-from app.LLM.grok_client import generate_grok_insight
+from app.services.live_dashboard import subscribe_live
+from app.LLM.grok_client import MODEL, generate_grok_insight_async, stream_grok_insight
+from app.LLM.insight_cache import INSIGHT_CACHE
+from app.LLM.tokens import count_tokens, count_tokens_batch, token_usage
+from app.utils.instrumentation import record_llm_usage
+from app.utils.logger import get_logger
+from app.gql_api.extensions import DocumentCache, ResolverTiming
+from app.utils.packing import dictionary_encode, pack_float64, pack_uint32
+
+logger = get_logger(__name__)
 
 
 # ── 1) Enums & Inputs ────────────────────────────────────────────────
@@ -26,6 +35,11 @@ class FilterType(Enum):
     YTD       = "YTD"
     CUSTOM    = "CUSTOM"
 
+@strawberry.enum
+class Precision(Enum):
+    EXACT       = "EXACT"
+    APPROXIMATE = "APPROXIMATE"  # base pass from a TABLESAMPLE, with error bounds
+
 @strawberry.input
 class CustomRange:
     start: date
@@ -42,9 +56,38 @@ class ChartKey(Enum):
 
 @strawberry.type
 class Metric:
-    title: str
-    value: float
-    diff:  float
+    title:    str
+    value:    float
+    previous: float  # comparison-period value
+    diff:     float  # % change of the current vs. comparison period
+    error:    Optional[float] = None  # APPROXIMATE: +/- bound on value
+
+@strawberry.type
+class Anomaly:
+    day:        str              # last full day of the window, scored
+    value:      Optional[float]  # the category's value on that day
+    mean:       Optional[float]  # mean of its own daily history
+    std:        Optional[float]
+    z_score:    Optional[float]
+    p_value:    Optional[float]
+    lower:      Optional[float]  # prediction interval
+    upper:      Optional[float]
+    is_anomaly: bool
+
+@strawberry.type
+class PackedChart:
+    """
+    Compact encoding of a chart's series for large drills. Every array is
+    base64 of a packed little-endian array with `length` entries:
+    codes uint32, y / previous / diff float64. Bar i is labelled
+    labels[codes[i]].
+    """
+    length:   int
+    labels:   List[str]
+    codes:    str
+    y:        str
+    previous: str
+    diff:     str
 
 @strawberry.type
 class Chart:
@@ -53,13 +96,54 @@ class Chart:
     type:      str
     x:         List[str]
     y:         List[float]
+    previous:  List[float]  # comparison-period value per bar
+    diff:      List[float]  # % change per bar
     drillable: bool
     nextChart: Optional[str]
+    other:     bool = False  # last bar sums the categories past the top N
+    # per bar, base charts only; computed only when selected
+    anomalies: Optional[List[Optional[Anomaly]]] = None
+    # APPROXIMATE only: +/- bound per bar on y, and the sample it came from
+    error:          Optional[List[float]] = None
+    sample_percent: Optional[float]       = None
+
+    @strawberry.field(description="Opt-in columnar encoding of x / y / previous / diff.")
+    def packed(self) -> PackedChart:
+        labels, codes = dictionary_encode(self.x)
+        return PackedChart(
+            length=len(codes),
+            labels=labels,
+            codes=pack_uint32(codes),
+            y=pack_float64(self.y),
+            previous=pack_float64(self.previous),
+            diff=pack_float64(self.diff),
+        )
+
+    @classmethod
+    def from_raw(cls, raw: dict) -> "Chart":
+        anomalies = raw.get("anomalies")
+        return cls(**{
+            **raw,
+            "anomalies": None if anomalies is None else [
+                Anomaly(**a) if a else None for a in anomalies
+            ],
+        })
 
 @strawberry.type
 class Dashboard:
-    metrics: List[Metric]
-    charts:  List[Chart]
+    metrics:   List[Metric]
+    charts:    List[Chart]
+    # APPROXIMATE falls back to EXACT on windows too small to sample
+    precision: Precision = Precision.EXACT
+
+
+@strawberry.type
+class DashboardDelta:
+    snapshot:        bool          # true: every metric / base chart follows
+    metrics:         List[Metric]  # metrics whose values changed
+    charts:          List[Chart]   # base charts whose bars changed
+    high_water_mark: int           # last live_transactions.id folded in
+    as_of:           str
 
 
 # ── 3) Insight DTOs ────────────────────────────────────────────────
@@ -74,64 +158,38 @@ class TokenUsage:
 class ChartInsight:
     insight:     str
     token_usage: TokenUsage
+    chart_key:   Optional[ChartKey] = None  # set by chartInsights
+
+@strawberry.type
+class InsightChunk:
+    token:       Optional[str]         # next piece of insight text
+    done:        bool                  # true on the final message only
+    token_usage: Optional[TokenUsage]  # set on the final message only
 
 
 # ── 4) Helpers ─────────────────────────────────────────────────────
 
-def count_tokens(prompt: str, model: str = "gpt-3.5-turbo") -> int:
-    enc = tiktoken.encoding_for_model(model)
-    return len(enc.encode(prompt))
-
-
-def compare_to_historical_single_point(
-    yesterday_val: float,
-    historical_values: List[float],
-    alpha: float = 0.05
-) -> dict:
-    n    = len(historical_values)
-    mean = np.mean(historical_values) if n else 0.0
-    std  = np.std(historical_values, ddof=1) if n > 1 else 0.0
-
-    if std == 0:
-        return {
-            "z_score":        None,
-            "p_value":        None,
-            "mean":           round(mean, 2),
-            "std":            round(std, 2),
-            "is_significant": False,
-            "insight":        "No variation in historical data."
-        }
-
-    z = (yesterday_val - mean) / std
-    p = 2 * norm.sf(abs(z))
-
-    t_multiplier = 1.96
-    pred_margin  = t_multiplier * std * np.sqrt(1 + 1/n)
-    lower        = mean - pred_margin
-    upper        = mean + pred_margin
-    is_outlier   = yesterday_val < lower or yesterday_val > upper
-
-    summary = (
-        f"Yesterday’s {yesterday_val:.2f} was "
-        f"{'unusually high' if z > 0 else 'unusually low'} "
-        f"vs historical mean {mean:.2f} (p={p:.4f})."
-    ) if is_outlier else "Yesterday’s value was within the expected range."
-
-    return {
-        "z_score":        round(z, 2),
-        "p_value":        round(p, 4),
-        "mean":           round(mean, 2),
-        "std":            round(std, 2),
-        "is_significant": is_outlier,
-        "insight":        summary
-    }
+def selects(selections: list, *path: str) -> bool:
+    """
+    True when the selection set requests the given field path, e.g.
+    selects(info.selected_fields[0].selections, "charts", "anomalies");
+    looks through fragments.
+    """
+    name, rest = path[0], path[1:]
+    for sel in selections:
+        if isinstance(sel, SelectedField):
+            if sel.name == name and (not rest or selects(sel.selections, *rest)):
+                return True
+        elif selects(sel.selections, *path):
+            return True
+    return False
 
 
 def build_chart_insight_prompt(
     chart_title: str,
     dimension_label: str,
     data_pairs: List[Tuple[str, float]],
-    stats: dict
+    anomalies: List[Optional[dict]]
 ) -> str:
     header = (
         f"You are a senior payments strategy analyst. Based on the **{chart_title}** chart below, "
@@ -140,11 +198,19 @@ def build_chart_insight_prompt(
 
     top_lines = "\n".join([f"{name}: {value:.2f}" for name, value in data_pairs[:5]])
 
-    stat_block = (
-        f"\n\nHistorical mean: {stats['mean']:.2f}, std: {stats['std']:.2f}\n"
-        f"Z-score: {stats['z_score']}, p-value: {stats['p_value']}\n"
-        f"{stats['insight']}\n\n"
-    )
+    # each category against its own daily history, not the other bars
+    scored  = [(name, a) for (name, _), a in zip(data_pairs, anomalies) if a]
+    flagged = [
+        f"{name}: {a['value']:.2f} on {a['day']} vs its daily mean {a['mean']:.2f} "
+        f"(z={a['z_score']}, p={a['p_value']}, expected {a['lower']:.2f}–{a['upper']:.2f})"
+        for name, a in scored if a["is_anomaly"]
+    ]
+    if flagged:
+        stat_block = "\n\nUnusual moves vs. each category's own history:\n" + "\n".join(flagged) + "\n\n"
+    elif scored:
+        stat_block = f"\n\nNo category deviated from its own history on {scored[0][1]['day']}.\n\n"
+    else:
+        stat_block = "\n\nNot enough history to score deviations.\n\n"
 
     guidance = (
         "In your insight:\n"
@@ -158,80 +224,273 @@ def build_chart_insight_prompt(
     return header + top_lines + stat_block + guidance
 
 
+def insight_range(filterType: FilterType, custom: Optional[CustomRange]) -> Optional[tuple]:
+    return (custom.start, custom.end) if (filterType == FilterType.CUSTOM and custom) else None
+
+
+async def chart_insight_prompts(
+    chartKeys:  List[ChartKey],
+    filterType: FilterType,
+    custom:     Optional[CustomRange],
+    loaders=None
+) -> List[Optional[str]]:
+    """
+    Builds the insight prompt for every chart from one dashboard fetch;
+    None for a chart with no data.
+    """
+    raw = await get_dashboard_data_async(
+        filterType.value,
+        insight_range(filterType, custom),
+        {},  # no drill for insight
+        loaders=loaders,
+        anomalies=True,
+    )
+    charts = {c["key"]: c for c in raw["charts"]}
+
+    prompts = []
+    for chartKey in chartKeys:
+        chart = charts.get(chartKey.value)
+        if not chart:
+            prompts.append(None)
+            continue
+        cfg        = chart_configs[chartKey.value]
+        data_pairs = list(zip(chart["x"], chart["y"]))
+        prompts.append(build_chart_insight_prompt(
+            chart_title=cfg["title"],
+            dimension_label=cfg["dimension_label"],
+            data_pairs=data_pairs,
+            anomalies=chart.get("anomalies") or [None] * len(data_pairs)
+        ))
+    return prompts
+
+
+async def chart_insight_prompt(
+    chartKey:   ChartKey,
+    filterType: FilterType,
+    custom:     Optional[CustomRange],
+    loaders=None
+) -> Optional[str]:
+    """Builds the insight prompt for one chart, or None if it has no data."""
+    return (await chart_insight_prompts([chartKey], filterType, custom, loaders))[0]
+
+
+async def generate_chart_insight(
+    chartKey:     ChartKey,
+    prompt:       Optional[str],
+    input_tokens: int,
+    ttl:          float,
+) -> ChartInsight:
+    """
+    The insight for one built prompt. LLM failures come back as the
+    insight text, so one chart failing never fails its siblings.
+    """
+    if prompt is None:
+        return ChartInsight(
+            insight=f"No data for chart `{chartKey.value}`.",
+            token_usage=TokenUsage(input_tokens=0, output_tokens=0, total_tokens=0),
+            chart_key=chartKey,
+        )
+
+    try:
+        # identical prompts (same chart / window / data) reuse the
+        # insight until the window's results would go stale
+        resp          = await INSIGHT_CACHE.get_or_generate(
+            prompt, MODEL, ttl,
+            lambda: generate_grok_insight_async(prompt, input_tokens),
+        )
+        text          = resp["text"]
+        usage         = resp["usage"]
+        output_tokens = usage.get("completion_tokens")
+        total_tokens  = usage.get("total_tokens")
+    except Exception as e:
+        text          = f"Insight generation failed: {e}"
+        output_tokens = None
+        total_tokens  = None
+
+    return ChartInsight(
+        insight=text,
+        token_usage=TokenUsage(
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            total_tokens=total_tokens
+        ),
+        chart_key=chartKey,
+    )
+
+
 # ── 5) Query Resolvers ───────────────────────────────────────────────
 
 @strawberry.type
 class Query:
 
     @strawberry.field
-    def dashboard(
+    async def dashboard(
         self,
+        info:       Info,
         filterType: FilterType,
         custom:     Optional[CustomRange] = None,
         drillKeys:  Optional[JSON]        = None,  # ← JSON scalar here
+        precision:  Precision             = Precision.EXACT,
     ) -> Dashboard:
-        raw = get_dashboard_data(
+        raw = await get_dashboard_data_async(
             filterType.value,
             (custom.start, custom.end) if custom else None,
-            drillKeys or {}
+            drillKeys or {},
+            loaders=info.context.get("loaders"),
+            anomalies=selects(info.selected_fields[0].selections, "charts", "anomalies"),
+            approximate=precision == Precision.APPROXIMATE,
         )
+        charts = [Chart.from_raw(c) for c in raw["charts"]]
         return Dashboard(
             metrics=[Metric(**m) for m in raw["metrics"]],
-            charts= [Chart(**c)    for c in raw["charts"   ]]
+            charts=charts,
+            precision=(
+                Precision.APPROXIMATE if any(c.sample_percent for c in charts)
+                else Precision.EXACT
+            ),
         )
 
     @strawberry.field
-    def chart_insight(
+    async def chart_insight(
         self,
+        info:       Info,
         chartKey:   ChartKey,
         filterType: FilterType,
         custom:     Optional[CustomRange] = None,
     ) -> ChartInsight:
-        raw = get_dashboard_data(
-            filterType.value,
-            (custom.start, custom.end) if (filterType == FilterType.CUSTOM and custom) else None,
-            {}  # no drill for insight
+        prompt = await chart_insight_prompt(
+            chartKey, filterType, custom, loaders=info.context.get("loaders")
+        )
+        return await generate_chart_insight(
+            chartKey, prompt,
+            count_tokens(prompt) if prompt is not None else 0,
+            window_ttl(filterType.value, insight_range(filterType, custom)),
         )
 
-        chart = next((c for c in raw["charts"] if c["key"] == chartKey.value), None)
-        if not chart:
-            return ChartInsight(
-                insight=f"No data for chart `{chartKey.value}`.",
+    @strawberry.field
+    async def chart_insights(
+        self,
+        info:       Info,
+        chartKeys:  List[ChartKey],
+        filterType: FilterType,
+        custom:     Optional[CustomRange] = None,
+    ) -> List[ChartInsight]:
+        """
+        Insights for several charts: one dashboard fetch, one batched token
+        count, then every LLM call at once (bounded by LLM_MAX_CONCURRENCY /
+        LLM_REQUESTS_PER_MINUTE). One result per distinct key, in chartKeys
+        order; a failed chart reports its error in its own insight text.
+        """
+        chartKeys = list(dict.fromkeys(chartKeys))
+        prompts   = await chart_insight_prompts(
+            chartKeys, filterType, custom, loaders=info.context.get("loaders")
+        )
+        counts = iter(count_tokens_batch([p for p in prompts if p is not None]))
+        ttl    = window_ttl(filterType.value, insight_range(filterType, custom))
+
+        return list(await asyncio.gather(*(
+            generate_chart_insight(key, prompt, next(counts) if prompt is not None else 0, ttl)
+            for key, prompt in zip(chartKeys, prompts)
+        )))
+
+
+# ── 6) Subscriptions ────────────────────────────────────────────────
+
+@strawberry.type
+class Subscription:
+
+    @strawberry.subscription
+    async def dashboard_live(
+        self,
+        filterType: FilterType,
+    ) -> AsyncGenerator[DashboardDelta, None]:
+        """
+        Live TODAY / MTD / YTD dashboard: a snapshot, then only the
+        metrics and base charts that changed, from one shared poller per
+        filter that aggregates new rows only.
+        """
+        async for message in subscribe_live(filterType.value):
+            yield DashboardDelta(
+                snapshot=message["snapshot"],
+                metrics=[Metric(**m) for m in message["metrics"]],
+                charts=[Chart.from_raw(c) for c in message["charts"]],
+                high_water_mark=message["high_water_mark"],
+                as_of=message["as_of"],
+            )
+
+    @strawberry.subscription
+    async def chart_insight_stream(
+        self,
+        chartKey:   ChartKey,
+        filterType: FilterType,
+        custom:     Optional[CustomRange] = None,
+    ) -> AsyncGenerator[InsightChunk, None]:
+        """
+        Streams chart_insight: one message per text piece as the model
+        produces it, then a final done=true message carrying token usage.
+        A cached insight arrives as a single text message.
+        """
+        # websocket contexts live as long as the connection, so don't
+        # reuse its loaders (their cache would never be invalidated)
+        prompt = await chart_insight_prompt(chartKey, filterType, custom)
+        if prompt is None:
+            yield InsightChunk(token=f"No data for chart `{chartKey.value}`.", done=False, token_usage=None)
+            yield InsightChunk(
+                token=None, done=True,
                 token_usage=TokenUsage(input_tokens=0, output_tokens=0, total_tokens=0)
             )
+            return
 
-        cfg         = chart_configs[chartKey.value]
-        data_pairs  = list(zip(chart["x"], chart["y"]))
-        yesterday   = data_pairs[0][1] if data_pairs else 0.0
-        history     = [v for _, v in data_pairs[1:]]
-        stats       = compare_to_historical_single_point(yesterday, history)
-        prompt      = build_chart_insight_prompt(
-            chart_title=cfg["title"],
-            dimension_label=cfg["dimension_label"],
-            data_pairs=data_pairs,
-            stats=stats
-        )
         input_tokens = count_tokens(prompt)
 
+        cached = INSIGHT_CACHE.get(prompt, MODEL)
+        if cached is not None:
+            usage = cached["usage"]
+            yield InsightChunk(token=cached["text"], done=False, token_usage=None)
+            yield InsightChunk(
+                token=None, done=True,
+                token_usage=TokenUsage(
+                    input_tokens=input_tokens,
+                    output_tokens=usage.get("completion_tokens"),
+                    total_tokens=usage.get("total_tokens")
+                )
+            )
+            return
+
+        pieces: List[str] = []
         try:
-            resp          = generate_grok_insight(prompt, return_usage=True)
-            text          = resp["text"]
-            usage         = resp["usage"]
-            output_tokens = usage.get("completion_tokens")
-            total_tokens  = usage.get("total_tokens")
+            async for piece in stream_grok_insight(prompt):
+                pieces.append(piece)
+                yield InsightChunk(token=piece, done=False, token_usage=None)
         except Exception as e:
-            text          = f"Insight generation failed: {e}"
-            output_tokens = None
-            total_tokens  = None
-
-        return ChartInsight(
-            insight=text,
+            # stream_grok_insight already counted it as outcome="error"
+            logger.exception("chart insight stream failed")
+            yield InsightChunk(token=f"Insight generation failed: {e}", done=False, token_usage=None)
+            yield InsightChunk(
+                token=None, done=True,
+                token_usage=TokenUsage(input_tokens=input_tokens, output_tokens=None, total_tokens=None)
+            )
+            return
+
+        text  = "".join(pieces).strip()
+        usage = token_usage(input_tokens, text)
+        record_llm_usage(usage)
+        INSIGHT_CACHE.set(
+            prompt, MODEL, {"text": text, "usage": usage},
+            window_ttl(filterType.value, insight_range(filterType, custom))
+        )
+        yield InsightChunk(
+            token=None, done=True,
             token_usage=TokenUsage(
                 input_tokens=input_tokens,
-                output_tokens=output_tokens,
-                total_tokens=total_tokens
+                output_tokens=usage["completion_tokens"],
+                total_tokens=usage["total_tokens"]
             )
         )
 
 
-schema = strawberry.Schema(query=Query)
+schema = strawberry.Schema(
+    query=Query,
+    subscription=Subscription,
+    extensions=[DocumentCache, ResolverTiming],
+)
@@ -1,8 +1,19 @@
-from fastapi import FastAPI
+import asyncio
+import os
+
+from fastapi import Depends, FastAPI, Header, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 from strawberry.asgi import GraphQL
 import app.db
+from app.db import get_engine, get_async_engine
 from app.gql_api.schema import schema
+from app.gql_api.loaders import RequestLoaders
+from app.gql_api.persisted_queries import PersistedQueryHTTPHandler
+from app.services import fetch_dashboard, index_check, matviews, rollups
+from app.utils.logger import get_logger
+from app.utils.metrics import CONTENT_TYPE, REGISTRY
+
+logger = get_logger(__name__)
 
 app = FastAPI(title="KPI Dashboard GraphQL")
 
@@ -16,10 +27,104 @@ app.add_middleware(
 )
 
 # 2) Mount GraphQL
-graphql_app = GraphQL(schema, graphiql=True)
+class DashboardGraphQL(GraphQL):
+    # automatic persisted queries (sha256 lookups) on HTTP
+    http_handler_class = PersistedQueryHTTPHandler
+
+    async def get_context(self, request, response=None):
+        # fresh DataLoaders per request so batching/caching never leaks
+        return {"request": request, "response": response, "loaders": RequestLoaders()}
+
+graphql_app = DashboardGraphQL(schema, graphiql=True)
 app.add_route("/graphql", graphql_app)
 app.add_websocket_route("/graphql", graphql_app)
 
+# 3) Daily rollup refresher (DASHBOARD_ROLLUPS=true)
+ROLLUP_REFRESH_SECONDS = float(os.getenv("DASHBOARD_ROLLUP_REFRESH_SECONDS", "300"))
+
+async def refresh_rollups_forever():
+    engine = get_engine()
+    while True:
+        try:
+            await asyncio.to_thread(rollups.refresh_rollups, engine)
+        except Exception:
+            logger.exception("rollup refresh failed")
+        await asyncio.sleep(ROLLUP_REFRESH_SECONDS)
+
+# 4) Hourly materialized-view refresher (DASHBOARD_MATVIEWS=true)
+MATVIEW_REFRESH_SECONDS = float(os.getenv("DASHBOARD_MATVIEW_REFRESH_SECONDS", "300"))
+
+async def refresh_matviews_forever():
+    engine = get_engine()
+    while True:
+        try:
+            await asyncio.to_thread(matviews.refresh_matviews, engine)
+        except Exception:
+            logger.exception("materialized view refresh failed")
+        await asyncio.sleep(MATVIEW_REFRESH_SECONDS)
+
+@app.on_event("startup")
+async def check_dashboard_indexes():
+    try:
+        await asyncio.to_thread(index_check.check_indexes, get_engine())
+    except Exception:
+        logger.exception("dashboard index check failed")
+
+@app.on_event("startup")
+async def precompile_dashboard_statements():
+    # metric / chart / drill text() constructs, built before the first request
+    fetch_dashboard.precompile_statements()
+
+@app.on_event("startup")
+async def start_rollup_refresher():
+    if fetch_dashboard.ROLLUPS_ENABLED:
+        await asyncio.to_thread(rollups.ensure_rollup_tables, get_engine())
+        app.state.rollup_task = asyncio.create_task(refresh_rollups_forever())
+
+@app.on_event("startup")
+async def start_matview_refresher():
+    if fetch_dashboard.MATVIEWS_ENABLED:
+        await asyncio.to_thread(matviews.ensure_matviews, get_engine())
+        app.state.matview_task = asyncio.create_task(refresh_matviews_forever())
+
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    async_engine = get_async_engine()
+    if async_engine is not None:
+        await async_engine.dispose()
+
 @app.get("/healthz")
 async def healthz():
     return {"status": "ok"}
+
+@app.get("/metrics")
+async def metrics():
+    # Prometheus text format: resolver, SQL and LLM timings, token counts.
+    # Set as a header: media_type="text/..." would get a second charset
+    return Response(REGISTRY.render(), headers={"Content-Type": CONTENT_TYPE})
+
+# 5) Admin: materialized-view staleness and refresh durations. Guarded by
+# the X-Admin-Token header when DASHBOARD_ADMIN_TOKEN is set.
+ADMIN_TOKEN = os.getenv("DASHBOARD_ADMIN_TOKEN")
+
+def require_admin(x_admin_token: str = Header(None)):
+    if ADMIN_TOKEN and x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="admin token required")
+
+@app.get("/admin/matviews", dependencies=[Depends(require_admin)])
+async def matview_status():
+    return {
+        "enabled":         fetch_dashboard.MATVIEWS_ENABLED,
+        "refresh_seconds": MATVIEW_REFRESH_SECONDS,
+        "views":           await asyncio.to_thread(matviews.matview_status, get_engine()),
+    }
+
+@app.post("/admin/matviews/refresh", dependencies=[Depends(require_admin)])
+async def refresh_matviews_now():
+    engine = get_engine()
+    await asyncio.to_thread(matviews.ensure_matviews, engine)
+    hwm = await asyncio.to_thread(matviews.refresh_matviews, engine)
+    return {
+        "covered_until": hwm.isoformat() if hwm else None,
+        "views":         await asyncio.to_thread(matviews.matview_status, engine),
+    }
@@ -20,10 +20,12 @@ chart_configs = {
         "type":            ChartType.PIE,
         "sql":             """
             SELECT t.transaction_currency AS name,
-                   SUM(t.usd_value)           AS value
+                   {value}                    AS value,
+                   {prev_value}               AS prev_value
               FROM live_transactions t
              {where}
              GROUP BY t.transaction_currency
+             {having}
         """,
         "metric":          "SUM(t.usd_value)",
         "drillable":       True,
@@ -38,22 +40,28 @@ chart_configs = {
         "title":           "Top 5 Acquirers by Volume",
         "type":            ChartType.BAR,
         "sql":             """
-            SELECT a.name       AS name,
-                   COUNT(*)      AS value
+            SELECT t.acquirer_id AS name,
+                   {value}       AS value,
+                   {prev_value}  AS prev_value
               FROM live_transactions t
-             {join}
              {where}
-             GROUP BY a.name
-             ORDER BY value DESC
-             LIMIT 5
+             GROUP BY t.acquirer_id
+             {having}
         """,
         "metric":          "COUNT(*)",
         "drillable":       True,
         "drill_field":     "a.name",
         "next_chart":      DRILL_LVL1,
+        # the base chart groups by id and resolves names through the
+        # acquirer lookup; drills on a.name get their join from
+        # drill_planner.JOINS
         "join":            "JOIN acquirer a ON t.acquirer_id = a.id",
-        "base_field":      "a.name",
+        "base_field":      "t.acquirer_id",
+        "label_lookup":    "acquirer",
         "dimension_label": "Acquirer",
+        # exactly the top 5, no "Other" bar (see query_planner.top_n_sql)
+        "top_n":           5,
+        "other":           False,
     },
 
     PAYMENT_METHOD_DISTRIBUTION: {
@@ -61,10 +69,12 @@ chart_configs = {
         "type":            ChartType.BAR,
         "sql":             """
             SELECT t.credit_card_type AS name,
-                   COUNT(*)            AS value
+                   {value}             AS value,
+                   {prev_value}        AS prev_value
               FROM live_transactions t
              {where}
              GROUP BY t.credit_card_type
+             {having}
         """,
         "metric":          "COUNT(*)",
         "drillable":       True,
@@ -75,40 +85,27 @@ chart_configs = {
         "dimension_label": "Payment Method",
     },
 
-    # Level 1 drill
+    # Drill levels. One chart per level of the drill path, all computed by
+    # one statement (see drill_planner); level 2 and deeper share the
+    # DRILL_LVL2 layout under keys DRILL_LVL<n>.
     DRILL_LVL1: {
-        "title":           "{dimension_label} breakdown for {base_value}",
+        "title":           "{dimension_label} breakdown for {parent_value}",
         "type":            ChartType.BAR,
-        "sql":             """
-            SELECT {dimension}    AS name,
-                   {metric}       AS value
-              FROM live_transactions t
-             {join}
-             {where}
-               AND {base_field} = :base_value
-             GROUP BY {dimension}
-        """,
-        "drillable":       True,
         "drill_field":     None,
-        "next_chart":      DRILL_LVL2,
     },
 
-    # Level 2 drill
     DRILL_LVL2: {
-        "title":           "{dimension_label} breakdown for {lvl1_value} ({lvl1_field_label})",
+        "title":           "{dimension_label} breakdown for {parent_value} ({parent_label})",
         "type":            ChartType.BAR,
-        "sql":             """
-            SELECT {dimension}    AS name,
-                   {metric}       AS value
-              FROM live_transactions t
-             {join}
-             {where}
-               AND {base_field} = :base_value
-               AND {lvl1_field} = :lvl1_value
-             GROUP BY {dimension}
-        """,
-        "drillable":       False,
         "drill_field":     None,
-        "next_chart":      None,
     },
 }
+
+
+def drill_chart_key(level: int) -> str:
+    """Chart key of drill level n (1-based): DRILL_LVL1, DRILL_LVL2, ..."""
+    return f"DRILL_LVL{level}"
+
+
+# Level 0 charts, in display order
+BASE_CHART_KEYS = [k for k in chart_configs if k not in (DRILL_LVL1, DRILL_LVL2)]
@@ -0,0 +1,171 @@
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import permutations
+from typing import Dict, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.sql.elements import TextClause
+
+from app.utils.exceptions import ValidationError
+from .chart_configs import (
+    chart_configs, BASE_CHART_KEYS, DRILL_LVL1, DRILL_LVL2, drill_chart_key
+)
+from .query_planner import (
+    BOTH_PERIODS, COMPARISON_PERIOD, CURRENT_PERIOD, filtered, folds_other, top_n_sql
+)
+
+# Drill dimensions: key sent by the client -> display label
+ALL_DIMS = {
+    "credit_card_type":     "Card Type",
+    "transaction_currency": "Currency",
+    "name":                 "Acquirer",
+    "merchant":             "Merchant",
+    "region":               "Region",
+    "funding_source":       "Funding Source",
+    "sca_type":             "SCA Type",
+    "issuer_country_code":  "Issuer Country",
+}
+
+QUALIFIED_FIELDS = {
+    "credit_card_type":     "t.credit_card_type",
+    "transaction_currency": "t.transaction_currency",
+    "name":                 "a.name",
+    "merchant":             "m.company_name",
+    "region":               "t.region",
+    "funding_source":       "t.funding_source",
+    "sca_type":             "t.sca_type",
+    "issuer_country_code":  "t.issuer_country_code",
+}
+
+# Table alias -> the join that brings it into a live_transactions t query
+JOINS = {
+    "a": "JOIN acquirer a ON t.acquirer_id = a.id",
+    "m": "JOIN merchant m ON t.merchant_id = m.id",
+}
+
+# Label of the NULL category of a nullable dimension (region, sca_type, ...);
+# drilling into it matches the NULL rows
+NULL_LABEL = "(none)"
+
+# Longest drill path accepted, in levels below the base chart
+MAX_DEPTH = min(int(os.getenv("DASHBOARD_MAX_DRILL_DEPTH", "4")), len(ALL_DIMS))
+
+
+@dataclass(frozen=True)
+class DrillPlan:
+    """
+    One validated drill path.
+
+    - statement: parameterized SELECT (expects the window params plus
+                 :base_value, :v1 ... :v<n-1> for the selected values and
+                 :top_n, one limit per level); rows are (level, name,
+                 value, prev_value, other, rank) as in query_planner.top_n_sql
+    - dims:      the path's dimensions, one per level
+    """
+    statement: TextClause
+    dims:      Tuple[str, ...]
+
+    @property
+    def level(self) -> int:
+        return len(self.dims)
+
+
+def _joins(*columns: str) -> str:
+    """Exactly the joins the qualified columns need, in JOINS order."""
+    aliases = {c.split(".", 1)[0] for c in columns}
+    return " ".join(sql for alias, sql in JOINS.items() if alias in aliases)
+
+
+def _compile(base_key: str, dims: Tuple[str, ...]) -> DrillPlan:
+    """
+    Every level of the path from one scan of the base chart's slice:
+    GROUPING SETS ((k1), (p2, k2), ..., (pn, kn)), where kn is level n's
+    dimension and pn flags rows on the path so far (k1 = :v1 AND ... AND
+    kn-1 = :vn-1). HAVING keeps level 1 and the on-path groups below it.
+    Keys are text with NULL as NULL_LABEL, so the NULL group gets a name
+    and stays drillable.
+    """
+    base_cfg = chart_configs[base_key]
+    columns  = [f"COALESCE({QUALIFIED_FIELDS[d]}::text, '{NULL_LABEL}')" for d in dims]
+    metric   = base_cfg["metric"]
+    keys     = [f"t.k{i}" for i in range(1, len(dims) + 1)]
+
+    inner = [f"{c} AS k{i}" for i, c in enumerate(columns, 1)] + [
+        "(" + " AND ".join(f"{columns[j]} = :v{j + 1}" for j in range(i - 1)) + f") AS p{i}"
+        for i in range(2, len(dims) + 1)
+    ]
+    sets   = [f"({keys[0]})"] + [f"(t.p{i}, {keys[i - 1]})" for i in range(2, len(dims) + 1)]
+    on_path = [f"GROUPING({keys[0]}) = 0"] + [f"t.p{i}" for i in range(2, len(dims) + 1)]
+
+    sql = f"""
+            SELECT CASE {" ".join(f"WHEN GROUPING({k}) = 0 THEN {i}" for i, k in enumerate(keys, 1))} END AS level,
+                   CASE {" ".join(f"WHEN GROUPING({k}) = 0 THEN {k}" for k in keys)} END AS name,
+                   {filtered(metric, CURRENT_PERIOD)}    AS value,
+                   {filtered(metric, COMPARISON_PERIOD)} AS prev_value
+              FROM (
+                    SELECT t.*, {", ".join(inner)}
+                      FROM live_transactions t
+                      {_joins(base_cfg["drill_field"], *(QUALIFIED_FIELDS[d] for d in dims))}
+                     {BOTH_PERIODS}
+                       AND {base_cfg["drill_field"]} = :base_value
+                   ) t
+             GROUP BY GROUPING SETS ({", ".join(sets)})
+            HAVING COUNT(*) FILTER (WHERE {CURRENT_PERIOD}) > 0
+               AND ({" OR ".join(on_path)})
+        """
+    return DrillPlan(text(top_n_sql(sql, folds_other(DRILL_LVL1, metric), by_level=True)), dims)
+
+
+@lru_cache(maxsize=1024)
+def _plan(base_key: str, dims: Tuple[str, ...]) -> DrillPlan:
+    return _compile(base_key, dims)
+
+
+@lru_cache(maxsize=1)
+def build_drill_plans() -> Dict[tuple, DrillPlan]:
+    """
+    The one- and two-level paths, keyed (base chart, dim1) and
+    (base chart, dim1, dim2), compiled up front; deeper paths compile
+    on first use.
+    """
+    plans = {}
+    for base_key in BASE_CHART_KEYS:
+        if not chart_configs[base_key]["drillable"]:
+            continue
+        for depth in range(1, min(2, MAX_DEPTH) + 1):
+            for dims in permutations(ALL_DIMS, depth):
+                plans[(base_key, *dims)] = _plan(base_key, dims)
+    return plans
+
+
+def drill_plan(base_key: str, *dims: str) -> DrillPlan:
+    """
+    The plan for drilling base_key along dims, or ValidationError for an
+    unknown or non-drillable chart, an unknown or repeated dimension, or
+    a path longer than MAX_DEPTH.
+    """
+    valid = (
+        isinstance(base_key, str)
+        and chart_configs.get(base_key, {}).get("drillable")
+        and all(isinstance(d, str) and d in ALL_DIMS for d in dims)
+        and len(set(dims)) == len(dims)
+    )
+    if not valid:
+        raise ValidationError(
+            "drillKeys",
+            f"cannot drill {base_key!r} by {' then '.join(map(repr, dims))}",
+        )
+    if not 1 <= len(dims) <= MAX_DEPTH:
+        raise ValidationError("drillKeys", f"drill paths hold 1 to {MAX_DEPTH} dimensions")
+    return _plan(base_key, tuple(dims))
+
+
+def drill_chart_config(level: int) -> dict:
+    """Config of the chart at drill level n (DRILL_LVL2's template below level 1)."""
+    cfg = chart_configs[DRILL_LVL1 if level == 1 else DRILL_LVL2]
+    return {
+        **cfg,
+        "drillable":  level < MAX_DEPTH,
+        "next_chart": drill_chart_key(level + 1) if level < MAX_DEPTH else None,
+    }
@@ -1,161 +1,759 @@
-from sqlalchemy import text
-from app.db import engine
-from app.services.utils.time_filters import get_date_ranges
-from .chart_configs import chart_configs, DRILL_LVL1, DRILL_LVL2
-
-ALL_DIMS = {
-    "credit_card_type":     "Card Type",
-    "transaction_currency": "Currency",
-    "name":                 "Acquirer",
-}
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import lru_cache, partial
+from typing import NamedTuple
+
+from sqlalchemy import bindparam, text
+from app.db import engine, get_async_engine
+from app.utils.cache import TTLCache
+from app.utils.exceptions import ValidationError
+from app.utils.instrumentation import query_tag
+from app.services.utils.stat_tests import score_rows
+from app.services.utils.time_filters import (
+    get_date_ranges, is_live_window, pct_diff, seconds_until_midnight
+)
+from .chart_configs import chart_configs, BASE_CHART_KEYS, drill_chart_key
+from .drill_planner import ALL_DIMS, build_drill_plans, drill_chart_config, drill_plan
+from .metric_configs import metric_configs
+from .query_planner import (
+    BOTH_PERIODS, CURRENT_PERIOD, COMPARISON_PERIOD, HAVING_CURRENT, OTHER_LABEL,
+    build_fused_plan, build_sampled_plan, build_series_plan, chart_top_n, filtered,
+    folds_other, rollup_supported, split_fused_rows, sql_text, top_n_sql
+)
+from .matviews import build_matviews, matview_window, matviews_supported
+from .rollups import high_water_mark, rollup_window
+from .sampling import sample_percent, split_sampled_rows
+
+# "fused"      – one GROUPING SETS statement for metrics + all base charts
+# "sequential" – one statement per metric / base chart
+EXECUTION_MODE = os.getenv("DASHBOARD_EXECUTION_MODE", "fused").lower()
+
+# Fan independent queries out over separate pooled connections, capped
+# per request so one dashboard cannot take the whole pool.
+CONCURRENT      = os.getenv("DASHBOARD_CONCURRENT", "false").lower() in ("1", "true", "yes")
+MAX_CONCURRENCY = max(1, int(os.getenv("DASHBOARD_MAX_CONCURRENCY", "4")))
+
+# Result cache in front of the query tasks. Closed windows are cached
+# until midnight; live windows (TODAY / MTD / YTD) for CACHE_LIVE_TTL.
+CACHE_ENABLED  = os.getenv("DASHBOARD_CACHE", "true").lower() in ("1", "true", "yes")
+CACHE_LIVE_TTL = float(os.getenv("DASHBOARD_CACHE_LIVE_TTL", "60"))
+
+# Answer full days of the fused base pass from the daily rollup
+# (see app/services/rollups.py); the partial current day stays raw.
+ROLLUPS_ENABLED = os.getenv("DASHBOARD_ROLLUPS", "false").lower() in ("1", "true", "yes")
+
+# Answer full hours of the metrics and base charts from the hourly
+# materialized views (see app/services/matviews.py); takes precedence
+# over EXECUTION_MODE for the base dashboard, edges stay raw.
+MATVIEWS_ENABLED = os.getenv("DASHBOARD_MATVIEWS", "false").lower() in ("1", "true", "yes")
+
+# Anomaly scoring: each base-chart category's value on the last full day
+# of the window vs. its own previous ANOMALY_HISTORY_DAYS days.
+ANOMALY_HISTORY_DAYS = int(os.getenv("DASHBOARD_ANOMALY_HISTORY_DAYS", "28"))
+ANOMALY_ALPHA        = float(os.getenv("DASHBOARD_ANOMALY_ALPHA", "0.05"))
+
+RESULT_CACHE = TTLCache(
+    max_entries=int(os.getenv("DASHBOARD_CACHE_MAX_ENTRIES", "1024")),
+    max_bytes=int(os.getenv("DASHBOARD_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+)
 
-QUALIFIED_FIELDS = {
-    "credit_card_type":     "t.credit_card_type",
-    "transaction_currency": "t.transaction_currency",
-    "name":                 "a.name",
+# Both periods are read in one scan; see query_planner
+PERIOD_SQL = {
+    "where":  BOTH_PERIODS,
+    "having": HAVING_CURRENT,
 }
 
-def get_dashboard_data(filter_type: str,
-                       custom:      tuple = None,
-                       drill_keys:  dict  = None) -> dict:
-    drill_keys = drill_keys or {}
-    start, end, _, _ = get_date_ranges(filter_type, custom)
-    where_clause     = "WHERE t.created_at BETWEEN :s AND :e"
-    base_params      = {"s": start, "e": end}
-
-    metrics = []
-    charts  = []
-
-    with engine.connect() as conn:
-        # ── Metrics ───────────────────────────────────────────
-        total_volume = conn.execute(
-            text("SELECT COALESCE(SUM(t.usd_value),0) FROM live_transactions t"),
-            base_params
-        ).scalar() or 0.0
-
-        avg_value = conn.execute(
-            text("SELECT COALESCE(AVG(t.usd_value),0) FROM live_transactions t"),
-            base_params
-        ).scalar() or 0.0
-
-        metrics = [
-            {"title": "Total Volume",     "value": round(total_volume, 2)},
-            {"title": "Average Value",    "value": round(avg_value,   2)},
+
+def _period_values(metric: str) -> dict:
+    return {
+        "value":      filtered(metric, CURRENT_PERIOD),
+        "prev_value": filtered(metric, COMPARISON_PERIOD),
+    }
+
+
+def _columns(result) -> tuple:
+    return _transpose(result.all())
+
+
+def _transpose(rows) -> tuple:
+    """
+    (name, value, prev_value[, other, rank]) rows -> (names, values,
+    prev_values, other) columns, transposed from plain row tuples instead
+    of building a mapping per row. A row flagged other (see top_n_sql)
+    becomes the OTHER_LABEL bar.
+    """
+    if not rows:
+        return [], [], [], False
+    names, values, prevs, *flags = zip(*rows)
+    other = bool(flags) and any(flags[0])
+    if other:
+        names = [OTHER_LABEL if f else n for n, f in zip(names, flags[0])]
+    return list(names), values, prevs, other
+
+
+def _chart(key: str, cfg: dict, columns: tuple, title: str = None) -> dict:
+    names, values, prevs, *other = columns
+    y    = [float(v or 0) for v in values]
+    prev = [float(v or 0) for v in prevs]
+    return {
+        "key":       key,
+        "title":     title or cfg["title"],
+        "type":      cfg["type"].value,
+        "x":         names,
+        "y":         y,
+        "previous":  prev,
+        "diff":      [pct_diff(c, p) for c, p in zip(y, prev)],
+        "drillable": cfg["drillable"],
+        "nextChart": cfg["next_chart"],
+        "other":     bool(other and other[0]),  # last bar folds the tail
+    }
+
+
+def _metrics(values) -> list:
+    """
+    values: (metric key, current period, comparison period) tuples.
+    """
+    return [
+        {
+            "title":    metric_configs[key]["title"],
+            "value":    round(value, 2),
+            "previous": round(previous, 2),
+            "diff":     pct_diff(value, previous),
+        }
+        for key, value, previous in values
+    ]
+
+
+def _merge(parts) -> dict:
+    metrics, charts, overlays = [], [], []
+    for part_metrics, part_charts in parts:
+        metrics.extend(dict(m) for m in part_metrics)
+        for c in part_charts:
+            # anomaly parts annotate charts produced by other parts
+            (overlays if "scores" in c else charts).append(dict(c))
+    _attach_anomalies(charts, overlays)
+    return {"metrics": metrics, "charts": charts}
+
+
+def _attach_anomalies(charts: list, overlays: list):
+    """Aligns per-category anomaly scores with each chart's bars."""
+    by_key = {o["key"]: o for o in overlays}
+    for c in charts:
+        overlay = by_key.get(c["key"])
+        if overlay is None:
+            continue
+        scores = {cat: score for cat, score in overlay["scores"]}
+        c["anomalies"] = [
+            {**scores[x], "day": overlay["day"]} if x in scores else None
+            for x in c["x"]
         ]
-        for m in metrics:
-            m.setdefault("diff", 0.0)
-
-        # ── Base charts ───────────────────────────────────────
-        for key, cfg in chart_configs.items():
-            if key in (DRILL_LVL1, DRILL_LVL2):
-                continue
-            sql = cfg["sql"].format(
-                join  = cfg.get("join", ""),
-                where = where_clause
-            )
-            rows = conn.execute(text(sql), base_params).mappings().all()
-            charts.append({
-                "key":       key,
-                "title":     cfg["title"],
-                "type":      cfg["type"].value,
-                "x":         [r["name"]         for r in rows],
-                "y":         [float(r["value"]) for r in rows],
-                "drillable": cfg["drillable"],
-                "nextChart": cfg["next_chart"],
-            })
-
-        # ── Drill: determine if base was clicked ─────────────
-        base_clicked = next(
-            (k for k in drill_keys.keys() if k not in (DRILL_LVL1, DRILL_LVL2)),
-            None
+
+
+# ── Query tasks ────────────────────────────────────────────────────
+# Each task is independent: it takes (conn, base_params) and returns a
+# (metrics, charts) pair, so tasks can share one connection or be fanned
+# out across pooled connections.
+
+def _fetch_base_fused(conn, base_params: dict):
+    split = None
+    if ROLLUPS_ENABLED and rollup_supported():
+        split = rollup_window(
+            base_params["s"], base_params["e"], base_params["cs"], base_params["ce"]
         )
-        if not base_clicked:
-            return {"metrics": metrics, "charts": charts}
-
-        base_cfg = chart_configs[base_clicked]
-        base_val = drill_keys[base_clicked]
-
-        # ── Level 1 Drill ─────────────────────────────────────
-        lvl1_info = drill_keys.get(DRILL_LVL1, {})
-        dim1      = lvl1_info.get("dimension")
-        if dim1:
-            join_parts = [base_cfg.get("join", "")]
-            if dim1 == "name" and "JOIN acquirer" not in join_parts[0]:
-                join_parts.append("JOIN acquirer a ON t.acquirer_id = a.id")
-            join_sql = " ".join(p for p in join_parts if p)
-
-            cfg1   = chart_configs[DRILL_LVL1]
-            col1   = QUALIFIED_FIELDS.get(dim1, f"t.{dim1}")
-            metric = base_cfg["metric"]
-
-            sql1 = cfg1["sql"].format(
-                join        = join_sql,
-                where       = where_clause,
-                dimension   = col1,
-                metric      = metric,
-                base_field  = base_cfg["drill_field"],
-            )
-            rows1 = conn.execute(
-                text(sql1),
-                {**base_params, "base_value": base_val}
-            ).mappings().all()
-
-            charts.append({
-                "key":       DRILL_LVL1,
-                "title":     cfg1["title"].format(
-                                 dimension_label=ALL_DIMS.get(dim1, dim1),
-                                 base_value=base_val
-                             ),
-                "type":      cfg1["type"].value,
-                "x":         [r["name"]         for r in rows1],
-                "y":         [float(r["value"]) for r in rows1],
-                "drillable": cfg1["drillable"],
-                "nextChart": cfg1["next_chart"],
-            })
-
-        # ── Level 2 Drill ─────────────────────────────────────
-        lvl1_val = lvl1_info.get("value")
-        dim2     = drill_keys.get(DRILL_LVL2, {}).get("dimension")
-        if dim1 and lvl1_val is not None and dim2:
-            join_parts = [base_cfg.get("join", "")]
-            if (dim1 == "name" or dim2 == "name") and "JOIN acquirer" not in join_parts[0]:
-                join_parts.append("JOIN acquirer a ON t.acquirer_id = a.id")
-            join_sql = " ".join(p for p in join_parts if p)
-
-            cfg2   = chart_configs[DRILL_LVL2]
-            col2   = QUALIFIED_FIELDS.get(dim2, f"t.{dim2}")
-            col1   = QUALIFIED_FIELDS.get(dim1, f"t.{dim1}")
-            metric = base_cfg["metric"]
-
-            sql2 = cfg2["sql"].format(
-                join        = join_sql,
-                where       = where_clause,
-                dimension   = col2,
-                metric      = metric,
-                base_field  = base_cfg["drill_field"],
-                lvl1_field  = col1,
-            )
-            rows2 = conn.execute(
-                text(sql2),
-                {
-                    **base_params,
-                    "base_value": base_val,
-                    "lvl1_value": lvl1_val
-                }
-            ).mappings().all()
-
-            charts.append({
-                "key":       DRILL_LVL2,
-                "title":     cfg2["title"].format(
-                                 dimension_label=ALL_DIMS.get(dim2, dim2),
-                                 lvl1_value=lvl1_val,
-                                 lvl1_field_label=ALL_DIMS.get(dim1, dim1)
-                             ),
-                "type":      cfg2["type"].value,
-                "x":         [r["name"]         for r in rows2],
-                "y":         [float(r["value"]) for r in rows2],
-                "drillable": cfg2["drillable"],
-                "nextChart": cfg2["next_chart"],
-            })
 
-    return {"metrics": metrics, "charts": charts}
+    if split:
+        plan   = build_fused_plan("rollup")
+        params = {**base_params, **split}
+    else:
+        plan   = build_fused_plan()
+        params = base_params
+
+    result = conn.execute(sql_text(plan.sql), params)
+    metric_values, chart_columns = split_fused_rows(plan, list(result.keys()), result.all())
+
+    charts = [
+        _chart(key, chart_configs[key], chart_columns[key])
+        for key in BASE_CHART_KEYS
+    ]
+    return _metrics(metric_values), charts
+
+
+def _fetch_base_matviews(conn, base_params: dict):
+    """
+    Metrics and base charts from the hourly views, one statement per view;
+    falls back to the fused pass when no materialized hour is in range.
+    """
+    split = None
+    if matviews_supported():
+        split = matview_window(
+            base_params["s"], base_params["e"], base_params["cs"], base_params["ce"]
+        )
+    if not split:
+        return _fetch_base_fused(conn, base_params)
+
+    params = {**base_params, **split}
+    metric_values, charts = [], []
+    for view in build_matviews().values():
+        if view.chart is None:
+            row = conn.execute(sql_text(view.read_sql), params).one()
+            metric_values = [
+                (key, float(row[2 * i] or 0.0), float(row[2 * i + 1] or 0.0))
+                for i, key in enumerate(view.specs)
+            ]
+            continue
+
+        rows = conn.execute(
+            sql_text(view.read_sql), {**params, "top_n": chart_top_n(view.chart)}
+        ).all()
+        charts.append(_chart(view.chart, chart_configs[view.chart], _transpose(rows)))
+
+    by_key = {c["key"]: c for c in charts}
+    return _metrics(metric_values), [by_key[key] for key in BASE_CHART_KEYS]
+
+
+def _fetch_base_sampled(conn, base_params: dict):
+    """
+    precision: APPROXIMATE. Metrics and base charts estimated from a
+    TABLESAMPLE SYSTEM page sample sized to the window, with an error
+    bound per value; windows too small to be worth sampling are answered
+    exactly instead (no sample_percent on the result).
+    """
+    pct = sample_percent(conn, base_params)
+    if pct is None:
+        exact = _fetch_base_matviews if MATVIEWS_ENABLED else _fetch_base_fused
+        return exact(conn, base_params)
+
+    plan   = build_sampled_plan()
+    result = conn.execute(sql_text(plan.sql), {**base_params, "pct": pct})
+    metric_values, chart_columns = split_sampled_rows(
+        plan, list(result.keys()), result.all(), pct
+    )
+
+    metrics = _metrics((key, value, prev) for key, value, prev, _ in metric_values)
+    for m, (_, _, _, error) in zip(metrics, metric_values):
+        m["error"] = round(error, 2)
+
+    charts = []
+    for key in BASE_CHART_KEYS:
+        names, values, prevs, errors, other = chart_columns[key]
+        chart = _chart(key, chart_configs[key], (names, values, prevs, other))
+        chart["error"]          = [float(e) for e in errors]
+        chart["sample_percent"] = pct
+        charts.append(chart)
+    return metrics, charts
+
+
+# ── Statements ─────────────────────────────────────────────────────
+# Built once per metric / chart and reused, so the templates are
+# formatted and their bind parameters parsed only once. Drill statements
+# come precompiled from drill_planner.
+
+@lru_cache(maxsize=None)
+def metric_statement(key: str):
+    periods = _period_values(metric_configs[key]["aggregate"])
+    return text(f"""
+            SELECT {periods["value"]}      AS value,
+                   {periods["prev_value"]} AS prev_value
+              FROM live_transactions t
+             {BOTH_PERIODS}
+        """)
+
+
+@lru_cache(maxsize=None)
+def base_chart_statement(key: str):
+    cfg = chart_configs[key]
+    return text(top_n_sql(cfg["sql"].format(
+        join  = cfg.get("join", ""),
+        **PERIOD_SQL,
+        **_period_values(cfg["metric"]),
+    ), folds_other(key)))
+
+
+def precompile_statements() -> int:
+    """
+    Builds every metric, base-chart and drill statement up front (called
+    at startup); returns how many were built.
+    """
+    for key in metric_configs:
+        metric_statement(key)
+    for key in BASE_CHART_KEYS:
+        base_chart_statement(key)
+    return (
+        metric_statement.cache_info().currsize
+        + base_chart_statement.cache_info().currsize
+        + len(build_drill_plans())
+    )
+
+
+def _fetch_metric(key: str, conn, base_params: dict):
+    row = conn.execute(metric_statement(key), base_params).mappings().one()
+    return _metrics([(
+        key,
+        float(row["value"] or 0.0),
+        float(row["prev_value"] or 0.0),
+    )]), []
+
+
+def _fetch_base_chart(key: str, conn, base_params: dict):
+    columns = _columns(conn.execute(
+        base_chart_statement(key), {**base_params, "top_n": chart_top_n(key)}
+    ))
+    return [], [_chart(key, chart_configs[key], columns)]
+
+
+def _fetch_drill_path(base_key: str, base_val, steps: tuple, conn, base_params: dict):
+    """
+    Every level of a drill path from one statement (see drill_planner).
+    steps: one (dimension, selected value, top_n) per level; the last
+    level's value is unused.
+    """
+    dims   = [d for d, _, _ in steps]
+    values = [base_val] + [v for _, v, _ in steps[:-1]]
+    rows   = conn.execute(
+        drill_plan(base_key, *dims).statement,
+        {
+            **base_params,
+            "base_value": base_val,
+            **{f"v{i}": v for i, v in enumerate(values[1:], 1)},
+            "top_n":      [n for _, _, n in steps],
+        }
+    ).all()
+
+    by_level = {}
+    for level, *row in rows:
+        by_level.setdefault(level, []).append(row)
+
+    charts = []
+    for level, dim in enumerate(dims, 1):
+        cfg = drill_chart_config(level)
+        charts.append(_chart(
+            drill_chart_key(level), cfg, _transpose(by_level.get(level, [])),
+            title=cfg["title"].format(
+                dimension_label=ALL_DIMS.get(dim, dim),
+                parent_value=values[level - 1],
+                parent_label=ALL_DIMS.get(dims[level - 2], "") if level > 1 else "",
+            ),
+        ))
+    return [], charts
+
+
+def _fetch_anomalies(conn, base_params: dict):
+    """
+    Scores every base-chart category on the last full day of the window
+    against its own daily history, from one series query and one
+    vectorized pass (see stat_tests.score_series).
+    """
+    he   = (base_params["e"] + timedelta(microseconds=1)).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+    hs   = he - timedelta(days=ANOMALY_HISTORY_DAYS + 1)
+    days = ANOMALY_HISTORY_DAYS + 1
+
+    hwm = high_water_mark()
+    if ROLLUPS_ENABLED and rollup_supported() and hwm is not None and hwm > hs:
+        plan   = build_series_plan("rollup")
+        params = {"hs": hs, "he": he, "hwm": hwm}
+    else:
+        plan   = build_series_plan()
+        params = {"hs": hs, "he": he}
+
+    rows = conn.execute(sql_text(plan.sql), params).mappings().all()
+
+    by_gid = {}
+    for r in rows:
+        by_gid.setdefault(r["gid"], []).append(r)
+
+    # one row per (chart, category); days without rows are 0 for sums and
+    # counts, missing (NaN) for averages
+    row_keys, matrix = [], []
+    for key, (gid, dim_col, val_col) in plan.charts.items():
+        fill   = float("nan") if chart_configs[key]["metric"].startswith("AVG(") else 0.0
+        series = {}
+        for r in by_gid.get(gid, []):
+            values = series.setdefault(r[dim_col], [fill] * days)
+            values[(r["day"] - hs.date()).days] = float(r[val_col] or 0)
+        for cat, values in series.items():
+            row_keys.append((key, cat))
+            matrix.append(values)
+
+    scores = score_rows(matrix, ANOMALY_ALPHA) if matrix else []
+
+    overlays = {}
+    for (key, cat), score in zip(row_keys, scores):
+        overlays.setdefault(key, []).append([cat, score])
+
+    day = (he - timedelta(days=1)).date().isoformat()
+    return [], [
+        {"key": key, "day": day, "scores": overlays.get(key, [])}
+        for key in plan.charts
+    ]
+
+
+def _drill_top_n(level: str, info: dict) -> int:
+    """The drill's optional "topN" (positive int), capped by chart_top_n."""
+    requested = info.get("topN")
+    if requested is not None and (
+        not isinstance(requested, int) or isinstance(requested, bool) or requested < 1
+    ):
+        raise ValidationError("drillKeys", f"{level}.topN must be a positive integer")
+    return chart_top_n(level, requested)
+
+
+def _drill_path(drill_keys: dict) -> list:
+    """
+    The drill's steps as {dimension, value, topN} dicts, from "path" or
+    the per-level DRILL_LVL1, DRILL_LVL2, ... keys, cut after the first
+    step without a selected value.
+    """
+    if "path" in drill_keys:
+        path = drill_keys["path"]
+    else:
+        path = []
+        while drill_chart_key(len(path) + 1) in drill_keys:
+            path.append(drill_keys[drill_chart_key(len(path) + 1)] or {})
+    if not isinstance(path, list) or not all(isinstance(i, dict) for i in path):
+        raise ValidationError("drillKeys", "drill steps must be {dimension, value, topN} objects")
+
+    steps = []
+    for info in path:
+        if not info.get("dimension"):
+            break
+        steps.append(info)
+        if info.get("value") is None:
+            break
+    return steps
+
+
+def _drill_tasks(drill_keys: dict) -> list:
+    # ── Drill: determine if base was clicked ─────────────
+    base_clicked = next(
+        (k for k in drill_keys.keys()
+         if k != "path" and not (isinstance(k, str) and k.startswith("DRILL_LVL"))),
+        None
+    )
+    if not base_clicked:
+        return []
+
+    base_val = drill_keys[base_clicked]
+    path     = _drill_path(drill_keys)
+    if not path:
+        return []
+
+    # ── One task for the whole path ───────────────────────
+    # drill_plan rejects unknown charts / dimensions and over-long paths
+    # before anything is queued or cached
+    drill_plan(base_clicked, *(info["dimension"] for info in path))
+    steps = tuple(
+        (info["dimension"], info.get("value"), _drill_top_n(drill_chart_key(level), info))
+        for level, info in enumerate(path, 1)
+    )
+    return [(
+        ("drill", base_clicked, base_val) + steps,
+        partial(_fetch_drill_path, base_clicked, base_val, steps),
+    )]
+
+
+def _plan_tasks(drill_keys: dict, anomalies: bool = False,
+                approximate: bool = False) -> list:
+    """
+    Returns the dashboard's (cache key, query task) pairs in output order.
+    approximate=True samples the base pass; drills stay exact.
+    """
+    if approximate:
+        tasks = [(("approx",), _fetch_base_sampled)]
+    elif MATVIEWS_ENABLED:
+        tasks = [(("base",), _fetch_base_matviews)]
+    elif EXECUTION_MODE == "fused":
+        tasks = [(("base",), _fetch_base_fused)]
+    else:
+        tasks = [
+            (("metric", key), partial(_fetch_metric, key))
+            for key in metric_configs
+        ]
+        tasks += [
+            (("chart", key), partial(_fetch_base_chart, key))
+            for key in BASE_CHART_KEYS
+        ]
+    if anomalies:
+        tasks.append((("anomalies", ANOMALY_HISTORY_DAYS, ANOMALY_ALPHA), _fetch_anomalies))
+    return tasks + _drill_tasks(drill_keys)
+
+
+# ── Result cache ───────────────────────────────────────────────────
+
+class Window(NamedTuple):
+    params:    dict    # SQL window params (:s / :e, comparison :cs / :ce)
+    cache_key: tuple   # stable key for the window
+    ttl:       float   # seconds a result for this window stays valid
+
+
+def _resolve_window(filter_type: str, custom: tuple) -> Window:
+    start, end, comp_start, comp_end = get_date_ranges(filter_type, custom)
+    params = {"s": start, "e": end, "cs": comp_start, "ce": comp_end}
+    if is_live_window(filter_type, end):
+        # end is "now" (or a CUSTOM end reaching today): bucket the ends on
+        # their date so repeat loads share an entry until the short live
+        # TTL runs out
+        return Window(
+            params,
+            (filter_type.upper(), "live", start.isoformat(), end.date().isoformat(),
+             comp_start.isoformat(), comp_end.date().isoformat()),
+            CACHE_LIVE_TTL,
+        )
+    return Window(
+        params,
+        (start.isoformat(), end.isoformat(), comp_start.isoformat(), comp_end.isoformat()),
+        seconds_until_midnight(),
+    )
+
+
+def window_ttl(filter_type: str, custom: tuple = None) -> float:
+    """Seconds a result computed for this filter window stays valid."""
+    return _resolve_window(filter_type, custom).ttl
+
+
+def _task_tag(task_key: tuple) -> dict:
+    """query_tag labels (part, chart key, drill level) for a task key."""
+    kind = task_key[0]
+    if kind == "drill":
+        return {"part": "drill", "chart": task_key[1], "drill_level": len(task_key) - 3}
+    chart = task_key[1] if kind in ("metric", "chart") else ""
+    return {"part": kind, "chart": chart, "drill_level": 0}
+
+
+class PartRef:
+    """
+    One query task bound to a resolved window.
+
+    Hashes and compares on its cache key, so identical tasks requested by
+    sibling GraphQL fields collapse into one load.
+    """
+    __slots__ = ("key", "task", "params", "ttl", "tag")
+
+    def __init__(self, window: Window, task_key: tuple, task):
+        self.key    = window.cache_key + (json.dumps(task_key, default=str),)
+        self.task   = task
+        self.params = window.params
+        self.ttl    = window.ttl
+        self.tag    = _task_tag(task_key)
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __eq__(self, other):
+        return isinstance(other, PartRef) and self.key == other.key
+
+
+def plan_parts(filter_type: str, custom: tuple = None, drill_keys: dict = None,
+               anomalies: bool = False, approximate: bool = False) -> list:
+    """
+    Returns the dashboard's PartRefs in output order.
+    """
+    window = _resolve_window(filter_type, custom)
+    return [
+        PartRef(window, task_key, task)
+        for task_key, task in _plan_tasks(drill_keys or {}, anomalies, approximate)
+    ]
+
+
+def _cached_parts(refs: list):
+    """
+    Looks every ref up in RESULT_CACHE; returns (found, pending refs).
+    """
+    found, pending = {}, []
+    for ref in dict.fromkeys(refs):
+        part = RESULT_CACHE.get(ref.key) if CACHE_ENABLED else None
+        if part is None:
+            pending.append(ref)
+        else:
+            found[ref] = part
+    return found, pending
+
+
+def _store_parts(found: dict, pending: list, fresh: list):
+    for ref, part in zip(pending, fresh):
+        found[ref] = part
+        if CACHE_ENABLED:
+            RESULT_CACHE.set(ref.key, part, ref.ttl)
+
+
+# ── Executors ──────────────────────────────────────────────────────
+
+def _run_ref(conn, ref: PartRef):
+    with query_tag(**ref.tag):
+        return ref.task(conn, ref.params)
+
+
+def _run_refs(conn, refs: list) -> list:
+    return [_run_ref(conn, ref) for ref in refs]
+
+
+def _run_refs_concurrently(refs: list) -> list:
+    """
+    Runs each task on its own pooled connection, at most
+    MAX_CONCURRENCY at a time; results keep task order.
+    """
+    def run(ref):
+        with engine.connect() as conn:
+            return _run_ref(conn, ref)
+
+    with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENCY, len(refs))) as pool:
+        return list(pool.map(run, refs))
+
+
+async def _run_refs_concurrently_async(async_engine, refs: list) -> list:
+    limit = asyncio.Semaphore(MAX_CONCURRENCY)
+
+    async def run(ref):
+        async with limit:
+            async with async_engine.connect() as conn:
+                return await conn.run_sync(_run_ref, ref)
+
+    return list(await asyncio.gather(*(run(r) for r in refs)))
+
+
+def load_parts(refs: list) -> dict:
+    """
+    Resolves PartRefs to (metrics, charts) parts: cached ones from
+    RESULT_CACHE, the rest in one connection checkout (or fanned out).
+    """
+    found, pending = _cached_parts(refs)
+    if pending:
+        if CONCURRENT and len(pending) > 1:
+            fresh = _run_refs_concurrently(pending)
+        else:
+            with engine.connect() as conn:
+                fresh = _run_refs(conn, pending)
+        _store_parts(found, pending, fresh)
+    return found
+
+
+async def load_parts_async(refs: list) -> dict:
+    """
+    Non-blocking load_parts. Also serves as the batch function behind the
+    per-request dashboard-parts DataLoader.
+
+    With DB_ASYNC enabled the same query code runs on the asyncpg engine
+    through AsyncConnection.run_sync (greenlet-based, no thread per call).
+    Otherwise the blocking version is pushed to a worker thread so the
+    event loop stays free.
+    """
+    async_engine = get_async_engine()
+    if async_engine is None:
+        return await asyncio.to_thread(load_parts, refs)
+
+    found, pending = _cached_parts(refs)
+    if pending:
+        if CONCURRENT and len(pending) > 1:
+            fresh = await _run_refs_concurrently_async(async_engine, pending)
+        else:
+            async with async_engine.connect() as conn:
+                fresh = await conn.run_sync(_run_refs, pending)
+        _store_parts(found, pending, fresh)
+    return found
+
+
+# ── Label lookups ──────────────────────────────────────────────────
+# Charts with a "label_lookup" group by an id and resolve display names
+# afterwards, instead of joining the lookup table over every window row.
+
+_ACQUIRER_NAMES = text(
+    "SELECT a.id, a.name FROM acquirer a WHERE a.id IN :ids"
+).bindparams(bindparam("ids", expanding=True))
+
+
+def fetch_acquirer_names(conn, ids) -> dict:
+    with query_tag("labels"):
+        rows = conn.execute(_ACQUIRER_NAMES, {"ids": list(ids)}).all()
+    return {r[0]: r[1] for r in rows}
+
+
+async def run_with_connection_async(fn, *args):
+    """
+    Runs fn(conn, *args) without blocking the event loop: on the asyncpg
+    engine through run_sync when DB_ASYNC is enabled, otherwise on a pooled
+    connection in a worker thread.
+    """
+    async_engine = get_async_engine()
+    if async_engine is None:
+        def run():
+            with engine.connect() as conn:
+                return fn(conn, *args)
+        return await asyncio.to_thread(run)
+
+    async with async_engine.connect() as conn:
+        return await conn.run_sync(fn, *args)
+
+
+async def fetch_acquirer_names_async(ids) -> dict:
+    return await run_with_connection_async(fetch_acquirer_names, ids)
+
+
+def _label_ids(charts: list) -> set:
+    return {
+        x
+        for c in charts if chart_configs.get(c["key"], {}).get("label_lookup") == "acquirer"
+        for x in (c["x"][:-1] if c["other"] else c["x"]) if x is not None
+    }
+
+
+def _apply_labels(charts: list, names: dict):
+    for c in charts:
+        if chart_configs.get(c["key"], {}).get("label_lookup") == "acquirer":
+            ids    = c["x"][:-1] if c["other"] else c["x"]
+            c["x"] = [names.get(x, str(x)) if x is not None else x for x in ids] + c["x"][len(ids):]
+
+
+def get_dashboard_data(filter_type: str,
+                       custom:      tuple = None,
+                       drill_keys:  dict  = None,
+                       anomalies:   bool  = False,
+                       approximate: bool  = False) -> dict:
+    refs   = plan_parts(filter_type, custom, drill_keys, anomalies, approximate)
+    found  = load_parts(refs)
+    result = _merge(found[r] for r in refs)
+
+    ids = _label_ids(result["charts"])
+    if ids:
+        with engine.connect() as conn:
+            _apply_labels(result["charts"], fetch_acquirer_names(conn, ids))
+    return result
+
+
+async def get_dashboard_data_async(filter_type: str,
+                                   custom:      tuple = None,
+                                   drill_keys:  dict  = None,
+                                   loaders            = None,
+                                   anomalies:   bool  = False,
+                                   approximate: bool  = False) -> dict:
+    """
+    Non-blocking variant of get_dashboard_data.
+
+    When the request's loaders (app.gql_api.loaders) are passed, query
+    parts and acquirer names go through its DataLoaders, so sibling fields
+    in one GraphQL document share a single batched load.
+
+    anomalies=True adds per-bar anomaly scores to the base charts.
+    approximate=True estimates metrics and base charts from a sample (see
+    _fetch_base_sampled).
+    """
+    refs = plan_parts(filter_type, custom, drill_keys, anomalies, approximate)
+    if loaders is not None:
+        parts = await loaders.dashboard_parts.load_many(refs)
+    else:
+        found = await load_parts_async(refs)
+        parts = [found[r] for r in refs]
+    result = _merge(parts)
+
+    ids = _label_ids(result["charts"])
+    if ids:
+        if loaders is not None:
+            ids   = list(ids)
+            names = dict(zip(ids, await loaders.acquirer_names.load_many(ids)))
+        else:
+            names = await fetch_acquirer_names_async(ids)
+        _apply_labels(result["charts"], names)
+    return result
@@ -0,0 +1,82 @@
+import os
+from typing import List, Tuple
+
+from sqlalchemy import text
+
+from app.utils.logger import get_logger
+from .chart_configs import chart_configs, BASE_CHART_KEYS
+
+logger = get_logger(__name__)
+
+# Create missing indexes at startup instead of only warning about them
+CREATE_MISSING = os.getenv("DASHBOARD_CREATE_INDEXES", "false").lower() in ("1", "true", "yes")
+
+
+def required_indexes() -> List[Tuple[str, Tuple[str, ...]]]:
+    """
+    (table, leading columns) pairs the dashboard queries rely on: the
+    created_at window on live_transactions, plus (created_at, <dim>) for
+    every base chart grouped directly on a live_transactions column.
+    """
+    required = [("live_transactions", ("created_at",))]
+    for key in BASE_CHART_KEYS:
+        field = chart_configs[key]["base_field"]
+        if field.startswith("t."):
+            cols = ("created_at", field[2:])
+            if ("live_transactions", cols) not in required:
+                required.append(("live_transactions", cols))
+    return required
+
+
+_EXISTING_INDEXES = """
+    SELECT i.relname                                  AS index_name,
+           array_agg(a.attname::text ORDER BY k.ord)  AS columns
+      FROM pg_index x
+      JOIN pg_class c ON c.oid = x.indrelid
+      JOIN pg_class i ON i.oid = x.indexrelid
+      CROSS JOIN LATERAL unnest(x.indkey::int2[]) WITH ORDINALITY AS k(attnum, ord)
+      JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum = k.attnum
+     WHERE c.relname = :table
+     GROUP BY i.relname
+"""
+
+
+def missing_indexes(conn) -> List[Tuple[str, Tuple[str, ...]]]:
+    """
+    Returns the required indexes with no existing index whose leading
+    columns match.
+    """
+    existing = {}
+    missing  = []
+    for table, cols in required_indexes():
+        if table not in existing:
+            rows = conn.execute(text(_EXISTING_INDEXES), {"table": table}).all()
+            existing[table] = [tuple(r[1]) for r in rows]
+        if not any(idx[:len(cols)] == cols for idx in existing[table]):
+            missing.append((table, cols))
+    return missing
+
+
+def create_index_sql(table: str, cols: Tuple[str, ...]) -> str:
+    name = f"ix_{table}_{'_'.join(cols)}"
+    return f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({', '.join(cols)})"
+
+
+def check_indexes(engine) -> List[str]:
+    """
+    Startup check: logs a warning for every missing dashboard index, or
+    creates it (CONCURRENTLY, outside a transaction) when
+    DASHBOARD_CREATE_INDEXES is enabled. Returns the statements involved.
+    """
+    with engine.connect() as conn:
+        missing = missing_indexes(conn)
+
+    statements = [create_index_sql(table, cols) for table, cols in missing]
+    for sql in statements:
+        if CREATE_MISSING:
+            logger.info("creating dashboard index", extra={"sql": sql})
+            with engine.connect() as conn:
+                conn.execution_options(isolation_level="AUTOCOMMIT").execute(text(sql))
+        else:
+            logger.warning("missing dashboard index", extra={"sql": sql})
+    return statements
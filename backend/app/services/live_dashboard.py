@@ -0,0 +1,238 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, List, Optional
+
+from app.utils.instrumentation import query_tag
+from app.utils.logger import get_logger
+from app.services.utils.time_filters import LIVE_FILTERS, get_date_ranges
+from .chart_configs import chart_configs, BASE_CHART_KEYS
+from .fetch_dashboard import (
+    _apply_labels, _chart, _label_ids, _metrics,
+    fetch_acquirer_names_async, run_with_connection_async
+)
+from .query_planner import LivePlan, bar_columns, build_live_plan, live_supported, sql_text
+
+logger = get_logger(__name__)
+
+# Seconds between delta polls of one shared poller
+POLL_SECONDS   = float(os.getenv("DASHBOARD_LIVE_POLL_SECONDS", "5"))
+# Full re-aggregation interval; corrects rows committed out of id order
+RESYNC_SECONDS = float(os.getenv("DASHBOARD_LIVE_RESYNC_SECONDS", "300"))
+# Messages buffered per subscriber before it is reset to a snapshot
+QUEUE_SIZE     = int(os.getenv("DASHBOARD_LIVE_QUEUE_SIZE", "16"))
+
+
+def _fetch_delta(conn, sql: str, params: dict) -> tuple:
+    with query_tag("live"):
+        result = conn.execute(sql_text(sql), params)
+        return list(result.keys()), [tuple(r) for r in result.all()]
+
+
+def _finalize(values: List[float], spec: tuple) -> float:
+    if len(spec) == 1:
+        return values[spec[0]]
+    total, count = (values[i] for i in spec)
+    return total / count if count else 0.0
+
+
+class RunningAggregates:
+    """
+    Additive components (see query_planner.additive_components) for the
+    current and comparison period, kept for the empty grouping set and for
+    every category of every base-chart field.
+
+    - last_id:  highest live_transactions.id folded into the current period
+    - cmp_from: comparison rows up to this instant are folded in
+    """
+    def __init__(self, plan: LivePlan, cmp_from: datetime):
+        self.plan     = plan
+        self.width    = 1 + max(
+            [i for spec in plan.metrics.values() for i in spec]
+            + [i for _, _, spec in plan.charts.values() for i in spec]
+            + [plan.rows]
+        )
+        self.totals   = [0.0] * (2 * self.width)
+        self.groups: Dict[int, dict] = {}
+        self.last_id  = 0
+        self.cmp_from = cmp_from
+        self._dims    = {gid: dim_col for gid, dim_col, _ in plan.charts.values()}
+
+    def apply(self, keys: List[str], rows: list):
+        col = {k: i for i, k in enumerate(keys)}
+        cur = [col[f"c{i}"] for i in range(self.width)]
+        cmp = [col[f"q{i}"] for i in range(self.width)]
+
+        for r in rows:
+            gid = r[col["gid"]]
+            if gid == self.plan.totals:
+                target = self.totals
+                if r[col["max_id"]] is not None:
+                    self.last_id = max(self.last_id, r[col["max_id"]])
+            elif gid in self._dims:
+                target = self.groups.setdefault(gid, {}).setdefault(
+                    r[col[self._dims[gid]]], [0.0] * (2 * self.width)
+                )
+            else:
+                continue
+            for i in range(self.width):
+                target[i]              += float(r[cur[i]] or 0)
+                target[self.width + i] += float(r[cmp[i]] or 0)
+
+    def snapshot(self) -> dict:
+        """Current metrics and base charts, shaped like get_dashboard_data."""
+        w       = self.width
+        metrics = _metrics([
+            (key, _finalize(self.totals[:w], spec), _finalize(self.totals[w:], spec))
+            for key, spec in self.plan.metrics.items()
+        ])
+
+        charts = []
+        for key in BASE_CHART_KEYS:
+            gid, _, spec = self.plan.charts[key]
+            cfg  = chart_configs[key]
+            rows = [
+                (cat, _finalize(v[:w], spec), _finalize(v[w:], spec))
+                for cat, v in self.groups.get(gid, {}).items()
+                if v[self.plan.rows] > 0
+            ]
+            charts.append(_chart(key, cfg, bar_columns(key, rows)))
+
+        return {"metrics": metrics, "charts": charts}
+
+
+class LivePoller:
+    """
+    One poller per live filter, shared by all of its subscribers.
+
+    Each poll aggregates only rows added since the previous one (current
+    period by id high-water mark, comparison period by time) and folds them
+    into RunningAggregates. Subscribers get a snapshot when they join, then
+    only the metrics / charts that changed.
+    """
+    def __init__(self, filter_type: str):
+        self.filter_type  = filter_type
+        self.subscribers: List[asyncio.Queue] = []
+        self.task: Optional[asyncio.Task] = None
+        self.state: Optional[RunningAggregates] = None
+        self.window_start = None
+        self.synced_at    = 0.0
+        self.names: dict  = {}
+        self.metrics: Dict[str, dict] = {}
+        self.charts:  Dict[str, dict] = {}
+        self.as_of: Optional[datetime] = None
+
+    # ── Subscribers ──────────────────────────────────────────────
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.subscribers.append(queue)
+        if self.as_of is not None:
+            queue.put_nowait(self._snapshot_message())
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.remove(queue)
+        if not self.subscribers:
+            LIVE_POLLERS.pop(self.filter_type, None)
+            if self.task is not None:
+                self.task.cancel()
+
+    def _message(self, metrics: list, charts: list, snapshot: bool) -> dict:
+        return {
+            "snapshot":        snapshot,
+            "metrics":         metrics,
+            "charts":          charts,
+            "high_water_mark": self.state.last_id if self.state else 0,
+            "as_of":           self.as_of.isoformat(),
+        }
+
+    def _snapshot_message(self) -> dict:
+        return self._message(list(self.metrics.values()), list(self.charts.values()), True)
+
+    def _publish(self, message: dict):
+        for queue in self.subscribers:
+            if queue.full():
+                # slow consumer: drop its backlog and resend the full state
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(self._snapshot_message())
+            else:
+                queue.put_nowait(message)
+
+    # ── Polling ──────────────────────────────────────────────────
+    async def _run(self):
+        while True:
+            try:
+                await self.poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("live dashboard poll failed")
+            await asyncio.sleep(POLL_SECONDS)
+
+    async def poll(self):
+        start, end, comp_start, comp_end = get_date_ranges(self.filter_type)
+        plan   = build_live_plan()
+        resync = (
+            self.state is None
+            or start != self.window_start
+            or time.monotonic() - self.synced_at >= RESYNC_SECONDS
+            or not live_supported()
+        )
+        state = (
+            RunningAggregates(plan, comp_start - timedelta(microseconds=1))
+            if resync else self.state
+        )
+
+        keys, rows = await run_with_connection_async(_fetch_delta, plan.sql, {
+            "s": start, "e": end, "ce": comp_end,
+            "last_id": state.last_id, "cmp_from": state.cmp_from,
+        })
+        state.apply(keys, rows)
+        state.cmp_from = comp_end
+
+        if resync:
+            self.state, self.window_start, self.synced_at = state, start, time.monotonic()
+        self.as_of = end
+
+        payload = state.snapshot()
+        missing = _label_ids(payload["charts"]) - self.names.keys()
+        if missing:
+            self.names.update(await fetch_acquirer_names_async(missing))
+        _apply_labels(payload["charts"], self.names)
+
+        first   = not self.metrics
+        metrics = [m for m in payload["metrics"] if self.metrics.get(m["title"]) != m]
+        charts  = [c for c in payload["charts"]  if self.charts.get(c["key"]) != c]
+        self.metrics.update((m["title"], m) for m in metrics)
+        self.charts.update((c["key"], c) for c in charts)
+
+        if metrics or charts:
+            self._publish(self._message(metrics, charts, first))
+
+
+LIVE_POLLERS: Dict[str, LivePoller] = {}
+
+
+async def subscribe_live(filter_type: str) -> AsyncIterator[dict]:
+    """
+    Yields live dashboard messages for TODAY / MTD / YTD: a snapshot
+    (snapshot=True, every metric and base chart), then deltas holding
+    only what changed since the previous message.
+    """
+    ft = filter_type.lower()
+    if ft not in LIVE_FILTERS:
+        raise ValueError(f"dashboardLive supports {', '.join(f.upper() for f in LIVE_FILTERS)}")
+
+    poller = LIVE_POLLERS.get(ft)
+    if poller is None:
+        poller = LIVE_POLLERS[ft] = LivePoller(ft)
+    queue  = poller.subscribe()
+    try:
+        while True:
+            yield await queue.get()
+    finally:
+        poller.unsubscribe(queue)
@@ -0,0 +1,314 @@
+import hashlib
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import lru_cache, partial
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.utils.instrumentation import query_tag
+from app.utils.metrics import REGISTRY
+from .chart_configs import chart_configs, BASE_CHART_KEYS
+from .metric_configs import metric_configs
+from .query_planner import additive_components, component_spec, folds_other, top_n_sql
+
+# Hourly materialized views of live_transactions: one per base chart,
+# keyed (hour, chart field), plus one of the metric totals keyed (hour).
+# Each view holds the additive components of its aggregates (c0, c1, ...)
+# so full hours re-sum exactly; the open hour is never materialized.
+STATE_TABLE  = "matview_state"
+TOTALS_VIEW  = "mv_dashboard_totals_hourly"
+
+# Hours kept in the views, counted back from the last full hour
+RETENTION_DAYS = int(os.getenv("DASHBOARD_MATVIEW_RETENTION_DAYS", "800"))
+
+# pg advisory lock id so only one worker refreshes at a time
+_REFRESH_LOCK_ID = 74_260_002
+
+REFRESH_SECONDS = REGISTRY.histogram(
+    "dashboard_matview_refresh_duration_seconds",
+    "Time spent refreshing each dashboard materialized view.",
+    ("view",),
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0),
+)
+
+STATE_DDL = f"""
+    CREATE TABLE IF NOT EXISTS {STATE_TABLE} (
+        name            TEXT PRIMARY KEY,
+        high_water_mark TIMESTAMP        NOT NULL,
+        refreshed_at    TIMESTAMP        NOT NULL,
+        refresh_seconds DOUBLE PRECISION NOT NULL
+    )
+"""
+
+# Current / comparison periods: full hours [:rs, :re) and [:crs, :cre)
+# from the view, edges from raw rows.
+_RAW_CUR = "(t.created_at BETWEEN :s AND :e AND NOT (t.created_at >= :rs AND t.created_at < :re))"
+_RAW_CMP = "(t.created_at BETWEEN :cs AND :ce AND NOT (t.created_at >= :crs AND t.created_at < :cre))"
+_MV_CUR  = "(m.hour >= :rs AND m.hour < :re)"
+_MV_CMP  = "(m.hour >= :crs AND m.hour < :cre)"
+
+
+@dataclass(frozen=True)
+class MatView:
+    """
+    One app-owned materialized view and the statement reading it.
+
+    - name:       view name
+    - chart:      base chart key, or None for the metric totals
+    - create_sql: CREATE MATERIALIZED VIEW ... WITH NO DATA
+    - index_sql:  the unique index REFRESH ... CONCURRENTLY requires
+    - read_sql:   window statement (expects :s / :e, :cs / :ce and the
+                  matview_window params); rows are (v*, p*) for the totals,
+                  top_n_sql rows for a chart (expects :top_n)
+    - specs:      chart key or metric key -> spec, (i,) for SUM / COUNT
+                  (value = component i) or (i, j) for AVG (i / j)
+    """
+    name:       str
+    chart:      Optional[str]
+    create_sql: str
+    index_sql:  str
+    read_sql:   str
+    specs:      Dict[str, Tuple[int, ...]]
+
+    @property
+    def definition_hash(self) -> str:
+        return hashlib.sha256((self.create_sql + self.index_sql).encode()).hexdigest()[:16]
+
+
+def _view_name(chart_key: str) -> str:
+    snake = "".join("_" + c.lower() if c.isupper() else c for c in chart_key)
+    return f"mv_{snake}_hourly"
+
+
+def _final(spec: Tuple[int, ...], period: str) -> str:
+    parts = [f"SUM(u.c{i}) FILTER (WHERE u.{period})" for i in spec]
+    return parts[0] if len(parts) == 1 else f"{parts[0]} / NULLIF({parts[1]}, 0)"
+
+
+def _build(name: str, chart: Optional[str], field: Optional[str],
+           aggregates: Dict[str, str]) -> MatView:
+    components: List[str] = []
+    spec = partial(component_spec, components)
+
+    specs = {key: spec(a) for key, a in aggregates.items()}
+    rows  = spec("COUNT(*)")[0]
+
+    comps    = ", ".join(f"{c} AS c{i}" for i, c in enumerate(components))
+    mv_comps = ", ".join(f"m.c{i}" for i in range(len(components)))
+    group    = ["name"] if field else []
+    dim      = f"{field} AS name, " if field else ""
+    mv_dim   = "m.name, " if field else ""
+    n        = len(components) + len(group)
+
+    create_sql = f"""
+        CREATE MATERIALIZED VIEW {name} AS
+        SELECT date_trunc('hour', t.created_at) AS hour, {dim}{comps}
+          FROM live_transactions t
+         WHERE t.created_at <  date_trunc('hour', now())
+           AND t.created_at >= date_trunc('hour', now()) - interval '{RETENTION_DAYS} days'
+         GROUP BY {", ".join(str(i) for i in range(1, len(group) + 2))}
+          WITH NO DATA
+    """
+    index_sql = f"CREATE UNIQUE INDEX IF NOT EXISTS ux_{name} ON {name} (hour{''.join(', ' + g for g in group)})"
+
+    columns = ", ".join(
+        f"{_final(s, 'cur')} AS v{i}, {_final(s, 'cmp')} AS p{i}"
+        for i, s in enumerate(specs.values())
+    ) if not field else f"{_final(specs[chart], 'cur')} AS value, {_final(specs[chart], 'cmp')} AS prev_value"
+    read_sql = f"""
+        SELECT {"u.name, " if field else ""}{columns}
+          FROM (
+                SELECT {mv_dim}{mv_comps}, {_MV_CUR} AS cur, {_MV_CMP} AS cmp
+                  FROM {name} m
+                 WHERE {_MV_CUR} OR {_MV_CMP}
+                 UNION ALL
+                SELECT {dim}{comps}, {_RAW_CUR} AS cur, {_RAW_CMP} AS cmp
+                  FROM live_transactions t
+                 WHERE {_RAW_CUR} OR {_RAW_CMP}
+                 GROUP BY {", ".join(str(i) for i in range(1, len(group) + 1)) + ", " if group else ""}{n + 1}, {n + 2}
+             ) u
+        {"GROUP BY u.name HAVING SUM(u.c%d) FILTER (WHERE u.cur) > 0" % rows if field else ""}
+    """
+    if field:
+        read_sql = top_n_sql(read_sql, folds_other(chart))
+    return MatView(name, chart, create_sql, index_sql, read_sql, specs)
+
+
+@lru_cache(maxsize=1)
+def matviews_supported() -> bool:
+    """True when every metric and base-chart aggregate re-sums from hours."""
+    return all(
+        additive_components(a) is not None
+        for a in [m["aggregate"] for m in metric_configs.values()]
+                 + [chart_configs[k]["metric"] for k in BASE_CHART_KEYS]
+    )
+
+
+@lru_cache(maxsize=1)
+def build_matviews() -> Dict[str, MatView]:
+    """The totals view plus one view per base chart, keyed by view name."""
+    views = [_build(
+        TOTALS_VIEW, None, None,
+        {key: m["aggregate"] for key, m in metric_configs.items()},
+    )]
+    # label_lookup charts group by id; names are resolved after the read
+    views += [
+        _build(_view_name(key), key, chart_configs[key]["base_field"],
+               {key: chart_configs[key]["metric"]})
+        for key in BASE_CHART_KEYS
+    ]
+    return {v.name: v for v in views}
+
+
+# ── Refresh ────────────────────────────────────────────────────────
+
+# Process-local copy of the high-water mark (None until first refresh)
+_high_water_mark: Optional[datetime] = None
+
+
+def high_water_mark() -> Optional[datetime]:
+    return _high_water_mark
+
+
+def ensure_matviews(engine):
+    """
+    Creates the state table and every view with its unique index. A view
+    whose definition changed (chart_configs edits) is dropped and rebuilt;
+    the definition hash is kept in the view's comment.
+    """
+    with engine.begin() as conn:
+        conn.execute(text(STATE_DDL))
+        for view in build_matviews().values():
+            current = conn.execute(
+                text("SELECT obj_description(to_regclass(:n), 'pg_class')"), {"n": view.name}
+            ).scalar()
+            if current == view.definition_hash:
+                continue
+            conn.execute(text(f"DROP MATERIALIZED VIEW IF EXISTS {view.name}"))
+            conn.execute(text(f"DELETE FROM {STATE_TABLE} WHERE name = :n"), {"n": view.name})
+            conn.execute(text(view.create_sql))
+            conn.execute(text(view.index_sql))
+            conn.execute(text(f"COMMENT ON MATERIALIZED VIEW {view.name} IS '{view.definition_hash}'"))
+
+
+def refresh_matviews(engine) -> Optional[datetime]:
+    """
+    Refreshes every view in one transaction, CONCURRENTLY once populated so
+    dashboard reads are never blocked, and records each view's duration.
+    All views share now(), so they cover the same hours: up to the start
+    of the current hour, which becomes the high-water mark.
+
+    Returns the high-water mark now in effect (another worker's, when it
+    holds the refresh lock).
+    """
+    global _high_water_mark
+
+    views = build_matviews()
+    with engine.begin() as conn, query_tag("matview_refresh"):
+        locked = conn.execute(
+            text("SELECT pg_try_advisory_xact_lock(:id)"), {"id": _REFRESH_LOCK_ID}
+        ).scalar()
+
+        if locked:
+            hwm = conn.execute(text("SELECT date_trunc('hour', now())::timestamp")).scalar()
+            populated = dict(conn.execute(
+                text("SELECT matviewname, ispopulated FROM pg_matviews WHERE matviewname = ANY(:n)"),
+                {"n": list(views)}
+            ).all())
+            for view in views.values():
+                concurrently = "CONCURRENTLY " if populated.get(view.name) else ""
+                started = time.perf_counter()
+                conn.execute(text(f"REFRESH MATERIALIZED VIEW {concurrently}{view.name}"))
+                elapsed = time.perf_counter() - started
+                REFRESH_SECONDS.observe(elapsed, view=view.name)
+                conn.execute(
+                    text(f"""
+                        INSERT INTO {STATE_TABLE} (name, high_water_mark, refreshed_at, refresh_seconds)
+                        VALUES (:n, :hwm, clock_timestamp()::timestamp, :sec)
+                        ON CONFLICT (name) DO UPDATE
+                           SET high_water_mark = EXCLUDED.high_water_mark,
+                               refreshed_at    = EXCLUDED.refreshed_at,
+                               refresh_seconds = EXCLUDED.refresh_seconds
+                    """),
+                    {"n": view.name, "hwm": hwm, "sec": elapsed}
+                )
+        else:
+            # the lock holder's marks; a view never refreshed holds all back
+            hwm = conn.execute(
+                text(f"""
+                    SELECT CASE WHEN COUNT(*) = :n THEN MIN(high_water_mark) END
+                      FROM {STATE_TABLE} WHERE name = ANY(:names)
+                """),
+                {"n": len(views), "names": list(views)}
+            ).scalar()
+
+    _high_water_mark = hwm
+    return hwm
+
+
+def matview_status(engine) -> List[dict]:
+    """Per view: coverage, staleness, last refresh time and duration, size."""
+    views = build_matviews()
+    with engine.connect() as conn, query_tag("matview_status"):
+        rows = conn.execute(
+            text(f"""
+                SELECT v.name, mv.ispopulated, s.high_water_mark, s.refreshed_at,
+                       s.refresh_seconds, pg_total_relation_size(to_regclass(v.name)),
+                       localtimestamp
+                  FROM unnest(CAST(:names AS text[])) AS v(name)
+                  LEFT JOIN pg_matviews mv ON mv.matviewname = v.name
+                  LEFT JOIN {STATE_TABLE} s ON s.name = v.name
+            """),
+            {"names": list(views)}
+        ).all()
+
+    status = []
+    for name, populated, hwm, refreshed_at, seconds, size, now in rows:
+        status.append({
+            "view":                 name,
+            "chart":                views[name].chart,
+            "populated":            bool(populated),
+            "covered_from":         (hwm - timedelta(days=RETENTION_DAYS)).isoformat() if hwm else None,
+            "covered_until":        hwm.isoformat() if hwm else None,
+            "staleness_seconds":    round((now - hwm).total_seconds(), 1) if hwm else None,
+            "refreshed_at":         refreshed_at.isoformat() if refreshed_at else None,
+            "refresh_seconds":      round(seconds, 3) if seconds is not None else None,
+            "since_refresh_seconds": round((now - refreshed_at).total_seconds(), 1) if refreshed_at else None,
+            "size_bytes":           size,
+        })
+    return status
+
+
+# ── Reads ──────────────────────────────────────────────────────────
+
+def _full_hours(start: datetime, end: datetime, low: datetime, hwm: datetime) -> tuple:
+    """[first, last) materialized full hours inside an inclusive [start, end]."""
+    first = max(start.replace(minute=0, second=0, microsecond=0), low)
+    if first < start:
+        first += timedelta(hours=1)
+    # BETWEEN is inclusive: an hour ending at :59:59.999999 is complete
+    last = (end + timedelta(microseconds=1)).replace(minute=0, second=0, microsecond=0)
+    last = min(last, hwm)
+    return (first, last) if first < last else (start, start)
+
+
+def matview_window(start: datetime, end: datetime,
+                   comp_start: datetime, comp_end: datetime) -> Optional[dict]:
+    """
+    Splits the current and comparison windows into materialized full hours
+    plus raw edges. Returns the extra params for MatView.read_sql, or None
+    when neither window contains a materialized hour.
+    """
+    hwm = _high_water_mark
+    if hwm is None:
+        return None
+
+    low = hwm - timedelta(days=RETENTION_DAYS)
+    rs,  re  = _full_hours(start, end, low, hwm)
+    crs, cre = _full_hours(comp_start, comp_end, low, hwm)
+    if rs == re and crs == cre:
+        return None
+    return {"rs": rs, "re": re, "crs": crs, "cre": cre}
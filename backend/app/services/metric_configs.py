@@ -0,0 +1,18 @@
+# Headline metric keys
+TOTAL_VOLUME  = "totalVolume"
+AVERAGE_VALUE = "averageValue"
+
+# Each KPI declares one aggregate over live_transactions t. The aggregate
+# is always evaluated over the request window (and the comparison window
+# for diffs), never over the whole table.
+metric_configs = {
+    TOTAL_VOLUME: {
+        "title":     "Total Volume",
+        "aggregate": "SUM(t.usd_value)",
+    },
+
+    AVERAGE_VALUE: {
+        "title":     "Average Value",
+        "aggregate": "AVG(t.usd_value)",
+    },
+}
@@ -0,0 +1,526 @@
+import os
+import re
+from dataclasses import dataclass
+from functools import lru_cache, partial
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.sql.elements import TextClause
+
+from .chart_configs import chart_configs, BASE_CHART_KEYS
+from .metric_configs import metric_configs
+from .rollups import (
+    ROLLUP_WINDOW_SOURCE, ROLLUP_SERIES_SOURCE, ROLLUP_AGGREGATES, ROLLUP_FIELDS
+)
+
+# ── Window predicates ──────────────────────────────────────────────
+# Current (:s/:e) and comparison (:cs/:ce) periods are read in the same
+# scan; each aggregate is split with FILTER (WHERE <period>).
+CURRENT_PERIOD    = "t.created_at BETWEEN :s AND :e"
+COMPARISON_PERIOD = "t.created_at BETWEEN :cs AND :ce"
+BOTH_PERIODS      = f"WHERE ({CURRENT_PERIOD} OR {COMPARISON_PERIOD})"
+HAVING_CURRENT    = f"HAVING COUNT(*) FILTER (WHERE {CURRENT_PERIOD}) > 0"
+
+# Live deltas (see live_dashboard): current-period rows past the last
+# seen id, comparison-period rows past the last comparison end.
+LIVE_CURRENT    = "t.id > :last_id AND t.created_at BETWEEN :s AND :e"
+LIVE_COMPARISON = "t.created_at > :cmp_from AND t.created_at <= :ce"
+
+# ── Top-N ──────────────────────────────────────────────────────────
+# Every chart is sorted by value (desc) and capped at its top_n bars,
+# at most MAX_BARS; the remaining categories fold into one OTHER_LABEL bar
+# unless the chart opts out ("other": False) or its metric cannot be
+# summed across categories (AVG).
+MAX_BARS    = max(1, int(os.getenv("DASHBOARD_MAX_BARS", "25")))
+OTHER_LABEL = "Other"
+
+_AGGREGATE_CALL = re.compile(r"\b(SUM|COUNT|AVG|MIN|MAX)\(([^()]*)\)")
+_ADDITIVE_CALL  = re.compile(r"^(SUM|COUNT|AVG)\(([^()]*)\)$")
+
+
+def filtered(aggregate: str, predicate: str) -> str:
+    """
+    Adds FILTER (WHERE predicate) to every aggregate call in an expression,
+    e.g. SUM(t.x) / NULLIF(SUM(t.n), 0) -> both SUMs filtered.
+    """
+    return _AGGREGATE_CALL.sub(rf"\1(\2) FILTER (WHERE {predicate})", aggregate)
+
+
+@dataclass(frozen=True)
+class FusedPlan:
+    """
+    One statement answering every metric and level-0 chart.
+
+    - sql:    the fused statement (expects :s / :e and :cs / :ce window
+              params, plus the rollup_window params for the rollup source)
+    - charts: chart key -> (grouping id, dimension column, value column)
+    - totals: grouping id of the empty set carrying the metrics
+    """
+    sql:    str
+    charts: Dict[str, Tuple[int, str, str]]
+    totals: int
+
+
+@dataclass(frozen=True)
+class SeriesPlan:
+    """
+    One statement returning the daily series of every base chart category.
+
+    - sql:    the series statement (expects :hs / :he, plus :hwm for the
+              rollup source); rows are (gid, day, d*, m*)
+    - charts: chart key -> (grouping id, dimension column, value column)
+    """
+    sql:    str
+    charts: Dict[str, Tuple[int, str, str]]
+
+
+@dataclass(frozen=True)
+class LivePlan:
+    """
+    One statement aggregating only the rows added since the last poll.
+
+    - sql:     the delta statement (expects :s / :e, :last_id, :cmp_from /
+               :ce); each additive component is emitted as c* (current) and
+               q* (comparison), plus max_id of the rows read
+    - metrics: metric key -> spec
+    - charts:  chart key -> (grouping id, dimension column, spec)
+    - totals:  grouping id of the empty set carrying the metrics
+    - rows:    component counting current rows (a category is shown once
+               it has any, as with the fused plan's HAVING)
+
+    spec is (i,) for SUM / COUNT (value = component i) or (i, j) for AVG
+    (value = component i / component j).
+    """
+    sql:     str
+    metrics: Dict[str, Tuple[int, ...]]
+    charts:  Dict[str, Tuple[int, str, Tuple[int, ...]]]
+    totals:  int
+    rows:    int
+
+
+@dataclass(frozen=True)
+class SampledPlan:
+    """
+    One statement estimating every metric and level-0 chart from a page
+    sample.
+
+    - sql:     the sampled statement (expects the window params and :pct);
+               per component i and period (c current, q comparison) rows
+               carry the sampled total ci, the sum of squared page totals
+               cis, and for AVG specs (i, j) the cross product cixj
+    - metrics: metric key -> spec
+    - charts:  chart key -> (grouping id, dimension column, spec)
+    - totals:  grouping id of the empty set carrying the metrics
+    - rows:    component counting rows
+
+    spec as in LivePlan.
+    """
+    sql:     str
+    metrics: Dict[str, Tuple[int, ...]]
+    charts:  Dict[str, Tuple[int, str, Tuple[int, ...]]]
+    totals:  int
+    rows:    int
+
+
+def additive_components(aggregate: str):
+    """
+    Splits an aggregate into components that can be summed across deltas:
+    SUM(x) / COUNT(x) -> [itself], AVG(x) -> [SUM(x), COUNT(x)].
+    Returns None for anything else (MIN / MAX, expressions).
+    """
+    m = _ADDITIVE_CALL.match(aggregate.strip())
+    if not m:
+        return None
+    fn, arg = m.groups()
+    return [f"SUM({arg})", f"COUNT({arg})"] if fn == "AVG" else [aggregate]
+
+
+def component_spec(components: List[str], aggregate: str) -> Tuple[int, ...]:
+    """
+    Indexes of the aggregate's additive components within components,
+    appending the ones not seen yet: (i,) for SUM / COUNT, (i, j) for AVG.
+    """
+    idx = []
+    for c in additive_components(aggregate):
+        if c not in components:
+            components.append(c)
+        idx.append(components.index(c))
+    return tuple(idx)
+
+
+def chart_top_n(key: str, requested: Optional[int] = None) -> int:
+    """Bars to keep: the request's, else the chart's top_n, capped at MAX_BARS."""
+    return min(requested or chart_configs.get(key, {}).get("top_n") or MAX_BARS, MAX_BARS)
+
+
+def folds_other(key: str, metric: Optional[str] = None) -> bool:
+    """
+    True when a chart's tail folds into an "Other" bar. Drill charts pass
+    their base chart's metric.
+    """
+    cfg    = chart_configs.get(key, {})
+    metric = metric or cfg["metric"]
+    return cfg.get("other", True) and additive_components(metric) == [metric]
+
+
+def top_n_sql(sql: str, fold_other: bool, by_level: bool = False) -> str:
+    """
+    Wraps a (name, value, prev_value) statement so the database ranks the
+    groups with ROW_NUMBER(), returns the top :top_n sorted by value and,
+    with fold_other, one more row summing the rest. Rows gain an `other`
+    flag (1 on the folded row, whose name is NULL) and their rank.
+
+    Ties break on the name's text in byte order, as in rank_bars (a plain
+    ORDER BY name would sort enum categories in declaration order).
+
+    by_level: the statement leads with a `level` column (drill paths);
+    groups are ranked per level and :top_n is an array indexed by level.
+    """
+    level = "r.level, " if by_level else ""
+    group = "g.level, " if by_level else ""
+    limit = "(CAST(:top_n AS integer[]))[r.level]" if by_level else ":top_n"
+    other = f"""
+         UNION ALL
+        SELECT {level}NULL, SUM(r.value), SUM(r.prev_value), 1, NULL
+          FROM ranked r
+         WHERE r.rn > {limit}
+        {"GROUP BY r.level" if by_level else "HAVING COUNT(*) > 0"}""" if fold_other else ""
+    return f"""
+        WITH grouped AS ({sql}),
+        ranked AS (
+            SELECT {group}g.name, g.value, g.prev_value,
+                   ROW_NUMBER() OVER (
+                       {"PARTITION BY g.level " if by_level else ""}ORDER BY g.value DESC NULLS LAST,
+                                g.name IS NULL, g.name::text COLLATE "C"
+                   ) AS rn
+              FROM grouped g
+        )
+        SELECT {level}r.name, r.value, r.prev_value, 0 AS other, r.rn
+          FROM ranked r
+         WHERE r.rn <= {limit}{other}
+         ORDER BY {"level, " if by_level else ""}other, rn
+    """
+
+
+def rank_bars(rows: list, top_n: int) -> Tuple[list, list]:
+    """
+    Python counterpart of top_n_sql for plans that return every group in
+    one pass (fused, sampled, live): (name, value, prev_value, ...) rows
+    sorted by value (NULLs last), ties by name, split into (top, tail).
+    """
+    rows = sorted(rows, key=lambda r: (r[1] is None, -(r[1] or 0), r[0] is None, str(r[0])))
+    return rows[:top_n], rows[top_n:]
+
+
+def bar_columns(key: str, rows: list) -> tuple:
+    """
+    (name, value, prev_value) rows -> (names, values, prev_values, other)
+    columns for chart key, top-N applied and the tail folded.
+    """
+    top, tail = rank_bars(rows, chart_top_n(key))
+    other     = bool(tail) and folds_other(key)
+    if other:
+        top.append((OTHER_LABEL, sum(r[1] or 0 for r in tail), sum(r[2] or 0 for r in tail)))
+    return (
+        [r[0] for r in top],
+        [r[1] or 0 for r in top],
+        [r[2] or 0 for r in top],
+        other,
+    )
+
+
+@lru_cache(maxsize=256)
+def sql_text(sql: str) -> TextClause:
+    """
+    One text() construct per distinct statement, so bind parameters are
+    parsed once and SQLAlchemy's compiled cache is hit on a stable key.
+    """
+    return text(sql)
+
+
+@lru_cache(maxsize=1)
+def live_supported() -> bool:
+    return all(
+        additive_components(a) is not None
+        for a in [m["aggregate"] for m in metric_configs.values()]
+                 + [chart_configs[k]["metric"] for k in BASE_CHART_KEYS]
+    )
+
+
+@lru_cache(maxsize=1)
+def build_live_plan() -> LivePlan:
+    """
+    Builds the delta statement behind the live dashboard: the same
+    GROUPING SETS layout as the fused plan, restricted to new rows, with
+    every aggregate split into additive components so running totals can
+    be updated in place.
+    """
+    fields, aggs, joins, layout = _base_chart_layout(
+        [m["aggregate"] for m in metric_configs.values()]
+    )
+    full_mask = (1 << len(fields)) - 1
+
+    components: List[str] = []
+    spec = partial(component_spec, components)
+
+    metrics = {key: spec(m["aggregate"]) for key, m in metric_configs.items()}
+    charts  = {
+        key: (gid, dim_col, spec(aggs[int(val_col[1:])]))
+        for key, (gid, dim_col, val_col) in layout.items()
+    }
+    rows    = spec("COUNT(*)")[0]
+
+    dim_cols  = ", ".join(f"{f} AS d{i}" for i, f in enumerate(fields))
+    comp_cols = ",\n               ".join(
+        f"{filtered(c, LIVE_CURRENT)} AS c{i}, {filtered(c, LIVE_COMPARISON)} AS q{i}"
+        for i, c in enumerate(components)
+    )
+    sets      = ", ".join(["()"] + [f"({f})" for f in fields])
+
+    sql = f"""
+        SELECT GROUPING({", ".join(fields)}) AS gid,
+               {dim_cols},
+               {comp_cols},
+               MAX(t.id) FILTER (WHERE {LIVE_CURRENT}) AS max_id
+          FROM live_transactions t
+         {" ".join(joins)}
+         WHERE ({LIVE_CURRENT}) OR ({LIVE_COMPARISON})
+         GROUP BY GROUPING SETS ({sets})
+    """
+    return LivePlan(sql=sql, metrics=metrics, charts=charts, totals=full_mask, rows=rows)
+
+
+@lru_cache(maxsize=1)
+def build_sampled_plan() -> SampledPlan:
+    """
+    Builds the approximate statement behind precision: APPROXIMATE: the
+    fused GROUPING SETS layout over TABLESAMPLE SYSTEM (:pct), with every
+    aggregate split into additive components.
+
+    SYSTEM samples whole heap pages, so the inner pass also groups by page
+    and the outer pass sums each component's page totals and their
+    squares (plus the SUM x COUNT cross product behind an AVG); with
+    pages as sampling units those give unbiased scaled totals and their
+    variance (see app/services/sampling.py).
+    """
+    fields, aggs, joins, layout = _base_chart_layout(
+        [m["aggregate"] for m in metric_configs.values()]
+    )
+    full_mask = (1 << len(fields)) - 1
+
+    components: List[str] = []
+    spec = partial(component_spec, components)
+
+    metrics = {key: spec(m["aggregate"]) for key, m in metric_configs.items()}
+    charts  = {
+        key: (gid, dim_col, spec(aggs[int(val_col[1:])]))
+        for key, (gid, dim_col, val_col) in layout.items()
+    }
+    rows    = spec("COUNT(*)")[0]
+    ratios  = sorted({s for s in [*metrics.values(), *(c[2] for c in charts.values())] if len(s) == 2})
+
+    page      = "(t.ctid::text::point)[0]"
+    dim_cols  = ", ".join(f"{f} AS d{i}" for i, f in enumerate(fields))
+    page_cols = ",\n                       ".join(
+        f"{filtered(c, CURRENT_PERIOD)} AS c{i}, {filtered(c, COMPARISON_PERIOD)} AS q{i}"
+        for i, c in enumerate(components)
+    )
+    sums = []
+    for p in ("c", "q"):
+        for i in range(len(components)):
+            sums += [f"SUM(s.{p}{i}) AS {p}{i}", f"SUM(s.{p}{i} * s.{p}{i}) AS {p}{i}s"]
+        sums += [f"SUM(s.{p}{i} * s.{p}{j}) AS {p}{i}x{j}" for i, j in ratios]
+    sum_cols = ",\n               ".join(sums)
+    dims     = ", ".join(f"s.d{i}" for i in range(len(fields)))
+    sets     = ", ".join([f"({page})"] + [f"({page}, {f})" for f in fields])
+
+    sql = f"""
+        SELECT s.gid, {dims},
+               {sum_cols}
+          FROM (
+                SELECT GROUPING({", ".join(fields)}) AS gid,
+                       {dim_cols},
+                       {page_cols}
+                  FROM live_transactions t TABLESAMPLE SYSTEM (CAST(:pct AS real))
+                 {" ".join(joins)}
+                 {BOTH_PERIODS}
+                 GROUP BY GROUPING SETS ({sets})
+             ) s
+         GROUP BY s.gid, {dims}
+        HAVING SUM(s.c{rows}) > 0 OR s.gid = {full_mask}
+    """
+    return SampledPlan(sql=sql, metrics=metrics, charts=charts, totals=full_mask, rows=rows)
+
+
+@lru_cache(maxsize=1)
+def rollup_supported() -> bool:
+    """
+    True when every base chart and metric can be answered from the daily
+    rollup (its field is a rollup dimension and its aggregate re-sums).
+    """
+    return all(
+        chart_configs[key]["base_field"] in ROLLUP_FIELDS
+        and chart_configs[key]["metric"] in ROLLUP_AGGREGATES
+        for key in BASE_CHART_KEYS
+    ) and all(m["aggregate"] in ROLLUP_AGGREGATES for m in metric_configs.values())
+
+
+@lru_cache(maxsize=2)
+def build_fused_plan(source: str = "raw") -> FusedPlan:
+    """
+    Builds the single-pass statement for the base dashboard.
+
+    Every base chart groups the same filtered window by one field, so the
+    window is scanned once and GROUPING SETS produces each chart's groups
+    side by side; the empty set () carries the metrics. GROUPING(...) tags
+    each row with the set it belongs to. Each aggregate is emitted twice,
+    for the current (m*) and comparison (p*) period. Charts added to
+    chart_configs join the pass automatically.
+
+    source="rollup" reads full days from the daily rollup and only the
+    partial edge days from live_transactions (see rollup_supported).
+    """
+    if source == "rollup":
+        window_from  = ROLLUP_WINDOW_SOURCE
+        window_where = ""
+        current      = "t.cur"
+        comparison   = "t.cmp"
+        rewrite      = ROLLUP_AGGREGATES.__getitem__
+    else:
+        window_from  = "live_transactions t"
+        window_where = BOTH_PERIODS
+        current      = CURRENT_PERIOD
+        comparison   = COMPARISON_PERIOD
+        rewrite      = str
+
+    fields, aggs, joins, charts = _base_chart_layout(
+        [m["aggregate"] for m in metric_configs.values()]
+    )
+    full_mask = (1 << len(fields)) - 1
+
+    dim_cols = ", ".join(f"{f} AS d{i}" for i, f in enumerate(fields))
+    agg_cols = ",\n               ".join(
+        f"{filtered(rewrite(a), current)} AS m{i}, {filtered(rewrite(a), comparison)} AS p{i}"
+        for i, a in enumerate(aggs)
+    )
+    sets     = ", ".join(["()"] + [f"({f})" for f in fields])
+
+    sql = f"""
+        SELECT GROUPING({", ".join(fields)}) AS gid,
+               {dim_cols},
+               {agg_cols}
+          FROM {window_from}
+         {" ".join(joins)}
+         {window_where}
+         GROUP BY GROUPING SETS ({sets})
+        HAVING COUNT(*) FILTER (WHERE {current}) > 0
+            OR GROUPING({", ".join(fields)}) = {full_mask}
+         ORDER BY gid
+    """
+    return FusedPlan(sql=sql, charts=charts, totals=full_mask)
+
+
+@lru_cache(maxsize=2)
+def build_series_plan(source: str = "raw") -> SeriesPlan:
+    """
+    Builds the statement behind anomaly scoring: every base chart's value
+    per category per day over [:hs, :he), with GROUPING SETS
+    ((day, f0), (day, f1), ...) so the history is scanned once for all
+    charts.
+
+    source="rollup" reads days before :hwm from the daily rollup and the
+    rest from live_transactions.
+    """
+    if source == "rollup":
+        window_from = ROLLUP_SERIES_SOURCE
+        day         = "t.day"
+        rewrite     = ROLLUP_AGGREGATES.__getitem__
+    else:
+        window_from = "live_transactions t"
+        day         = "t.created_at::date"
+        rewrite     = str
+
+    fields, aggs, joins, charts = _base_chart_layout([])
+
+    dim_cols = ", ".join(f"{f} AS d{i}" for i, f in enumerate(fields))
+    agg_cols = ", ".join(f"{rewrite(a)} AS m{i}" for i, a in enumerate(aggs))
+    sets     = ", ".join(f"({day}, {f})" for f in fields)
+    where    = "" if source == "rollup" else "WHERE t.created_at >= :hs AND t.created_at < :he"
+
+    sql = f"""
+        SELECT GROUPING({", ".join(fields)}) AS gid,
+               {day} AS day,
+               {dim_cols},
+               {agg_cols}
+          FROM {window_from}
+         {" ".join(joins)}
+         {where}
+         GROUP BY GROUPING SETS ({sets})
+    """
+    return SeriesPlan(sql=sql, charts=charts)
+
+
+def _base_chart_layout(aggs: List[str]) -> tuple:
+    """
+    Collects the distinct grouping fields, aggregates and joins of the base
+    charts (aggs seeds the aggregate list). Returns (fields, aggs, joins,
+    charts), charts mapping key -> (grouping id, d column, m column).
+    """
+    fields: List[str] = []
+    aggs:   List[str] = list(aggs)
+    joins:  List[str] = []
+    layout: Dict[str, Tuple[int, int]] = {}
+
+    for key in BASE_CHART_KEYS:
+        cfg = chart_configs[key]
+        if cfg["base_field"] not in fields:
+            fields.append(cfg["base_field"])
+        if cfg["metric"] not in aggs:
+            aggs.append(cfg["metric"])
+        # label_lookup charts group by id and skip their join
+        if cfg.get("join") and not cfg.get("label_lookup") and cfg["join"] not in joins:
+            joins.append(cfg["join"])
+        layout[key] = (fields.index(cfg["base_field"]), aggs.index(cfg["metric"]))
+
+    # GROUPING(f0, ..., fn) sets bit (n - 1 - i) when fi is not grouped
+    full_mask = (1 << len(fields)) - 1
+    charts = {
+        key: (full_mask & ~(1 << (len(fields) - 1 - f)), f"d{f}", f"m{m}")
+        for key, (f, m) in layout.items()
+    }
+    return fields, aggs, joins, charts
+
+
+def split_fused_rows(plan: FusedPlan, keys: List[str], rows: list) -> Tuple[list, Dict[str, tuple]]:
+    """
+    Splits fused result rows (plain tuples, column names in keys) back into
+    metric values and per-chart (names, values, prev_values, other)
+    columns, applying each chart's top-N (see bar_columns).
+
+    Metrics come back as (metric key, current, previous) tuples.
+    """
+    col = {k: i for i, k in enumerate(keys)}
+    gid = col["gid"]
+
+    by_gid: Dict[int, list] = {}
+    for r in rows:
+        by_gid.setdefault(r[gid], []).append(r)
+
+    totals  = by_gid.get(plan.totals)
+    metrics = [
+        (
+            key,
+            float((totals[0][col[f"m{i}"]] if totals else None) or 0.0),
+            float((totals[0][col[f"p{i}"]] if totals else None) or 0.0),
+        )
+        for i, key in enumerate(metric_configs)
+    ]
+
+    chart_columns = {}
+    for key, (chart_gid, dim_col, val_col) in plan.charts.items():
+        d, v, p = col[dim_col], col[val_col], col["p" + val_col[1:]]
+        chart_columns[key] = bar_columns(
+            key, [(r[d], r[v], r[p]) for r in by_gid.get(chart_gid, [])]
+        )
+
+    return metrics, chart_columns
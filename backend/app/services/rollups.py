@@ -0,0 +1,201 @@
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import text
+
+# Daily summary of live_transactions, keyed by
+# (day, transaction_currency, credit_card_type, acquirer_id).
+ROLLUP_TABLE = "daily_txn_rollup"
+STATE_TABLE  = "rollup_state"
+
+# Closed days re-aggregated on every refresh to pick up late-arriving rows
+LOOKBACK_DAYS = int(os.getenv("DASHBOARD_ROLLUP_LOOKBACK_DAYS", "1"))
+
+# pg advisory lock id so only one worker refreshes at a time
+_REFRESH_LOCK_ID = 74_260_001
+
+ROLLUP_DDL = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {ROLLUP_TABLE} (
+        day                  DATE           NOT NULL,
+        transaction_currency TEXT           NOT NULL,
+        credit_card_type     TEXT,
+        acquirer_id          INTEGER        NOT NULL,
+        usd_value            NUMERIC(20, 2) NOT NULL,
+        txn_count            BIGINT         NOT NULL
+    )
+    """,
+    f"CREATE INDEX IF NOT EXISTS ix_{ROLLUP_TABLE}_day ON {ROLLUP_TABLE} (day)",
+    f"""
+    CREATE TABLE IF NOT EXISTS {STATE_TABLE} (
+        name            TEXT PRIMARY KEY,
+        high_water_mark TIMESTAMP NOT NULL
+    )
+    """,
+]
+
+# ── Fused-plan source ──────────────────────────────────────────────
+# Exposes the rollup columns under alias `t`, so the base-chart fields
+# (t.transaction_currency, t.credit_card_type, t.acquirer_id -> a.name)
+# resolve unchanged. usd_value holds partial sums, txn_count row counts.
+
+# Current / comparison periods: full days [:rs, :re) and [:crs, :cre) from
+# the rollup, edges from raw rows. cur / cmp flag which period a row feeds.
+_RAW_CUR = "(t.created_at BETWEEN :s AND :e AND NOT (t.created_at >= :rs AND t.created_at < :re))"
+_RAW_CMP = "(t.created_at BETWEEN :cs AND :ce AND NOT (t.created_at >= :crs AND t.created_at < :cre))"
+
+ROLLUP_WINDOW_SOURCE = f"""(
+                SELECT r.transaction_currency, r.credit_card_type, r.acquirer_id,
+                       r.usd_value, r.txn_count,
+                       (r.day >= :rs  AND r.day < :re)  AS cur,
+                       (r.day >= :crs AND r.day < :cre) AS cmp
+                  FROM {ROLLUP_TABLE} r
+                 WHERE (r.day >= :rs AND r.day < :re) OR (r.day >= :crs AND r.day < :cre)
+                 UNION ALL
+                SELECT t.transaction_currency::text, t.credit_card_type::text, t.acquirer_id,
+                       t.usd_value, 1,
+                       {_RAW_CUR} AS cur,
+                       {_RAW_CMP} AS cmp
+                  FROM live_transactions t
+                 WHERE {_RAW_CUR} OR {_RAW_CMP}
+             ) t"""
+
+# Daily series for anomaly scoring: days [:hs, :hwm) from the rollup, the
+# rest of [:hs, :he) from raw rows; `day` replaces created_at::date. The
+# LEAST / GREATEST arguments are cast: untyped params there resolve as text.
+ROLLUP_SERIES_SOURCE = f"""(
+                SELECT r.day, r.transaction_currency, r.credit_card_type, r.acquirer_id,
+                       r.usd_value, r.txn_count
+                  FROM {ROLLUP_TABLE} r
+                 WHERE r.day >= :hs
+                   AND r.day < CAST(LEAST(CAST(:hwm AS timestamp), CAST(:he AS timestamp)) AS date)
+                 UNION ALL
+                SELECT t.created_at::date, t.transaction_currency::text, t.credit_card_type::text,
+                       t.acquirer_id, t.usd_value, 1
+                  FROM live_transactions t
+                 WHERE t.created_at >= GREATEST(CAST(:hs AS timestamp), CAST(:hwm AS timestamp))
+                   AND t.created_at < :he
+             ) t"""
+
+# Aggregates over raw rows -> equivalent aggregates over partial sums
+ROLLUP_AGGREGATES = {
+    "SUM(t.usd_value)": "SUM(t.usd_value)",
+    "COUNT(*)":         "SUM(t.txn_count)",
+    "AVG(t.usd_value)": "SUM(t.usd_value) / NULLIF(SUM(t.txn_count), 0)",
+}
+
+ROLLUP_FIELDS = {"t.transaction_currency", "t.credit_card_type", "t.acquirer_id", "a.name"}
+
+# Process-local copy of the high-water mark (None until first refresh)
+_high_water_mark: Optional[datetime] = None
+
+
+def high_water_mark() -> Optional[datetime]:
+    return _high_water_mark
+
+
+def ensure_rollup_tables(engine):
+    """Creates the rollup and state tables if missing."""
+    with engine.begin() as conn:
+        for ddl in ROLLUP_DDL:
+            conn.execute(text(ddl))
+
+
+def refresh_rollups(engine) -> Optional[datetime]:
+    """
+    Incrementally folds completed days into the rollup.
+
+    Days from (high-water mark - LOOKBACK_DAYS) up to today's midnight are
+    re-aggregated from live_transactions in one transaction, then the
+    high-water mark moves to today's midnight. The current day is never
+    rolled up; reads take it from raw rows.
+
+    Returns the high-water mark now in effect.
+    """
+    global _high_water_mark
+
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    with engine.begin() as conn:
+        locked = conn.execute(
+            text("SELECT pg_try_advisory_xact_lock(:id)"), {"id": _REFRESH_LOCK_ID}
+        ).scalar()
+
+        hwm = conn.execute(
+            text(f"SELECT high_water_mark FROM {STATE_TABLE} WHERE name = :n"),
+            {"n": ROLLUP_TABLE}
+        ).scalar()
+
+        if locked:
+            from_day = None if hwm is None else hwm - timedelta(days=LOOKBACK_DAYS)
+            since    = "" if from_day is None else "AND t.created_at >= :from_day"
+            params   = {"to_day": today, "from_day": from_day}
+
+            conn.execute(
+                text(f"""
+                    DELETE FROM {ROLLUP_TABLE}
+                     WHERE day < :to_day
+                       {"" if from_day is None else "AND day >= :from_day"}
+                """),
+                params
+            )
+            conn.execute(
+                text(f"""
+                    INSERT INTO {ROLLUP_TABLE}
+                           (day, transaction_currency, credit_card_type,
+                            acquirer_id, usd_value, txn_count)
+                    SELECT t.created_at::date,
+                           t.transaction_currency::text,
+                           t.credit_card_type::text,
+                           t.acquirer_id,
+                           SUM(t.usd_value),
+                           COUNT(*)
+                      FROM live_transactions t
+                     WHERE t.created_at < :to_day
+                       {since}
+                     GROUP BY 1, 2, 3, 4
+                """),
+                params
+            )
+            conn.execute(
+                text(f"""
+                    INSERT INTO {STATE_TABLE} (name, high_water_mark)
+                    VALUES (:n, :hwm)
+                    ON CONFLICT (name) DO UPDATE SET high_water_mark = EXCLUDED.high_water_mark
+                """),
+                {"n": ROLLUP_TABLE, "hwm": today}
+            )
+            hwm = today
+
+    _high_water_mark = hwm
+    return hwm
+
+
+def _full_days(start: datetime, end: datetime, hwm: datetime) -> tuple:
+    """[first, last) full rolled-up days inside an inclusive [start, end]."""
+    first = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    if first < start:
+        first += timedelta(days=1)
+    # BETWEEN is inclusive: a day ending at 23:59:59.999999 is complete
+    last = (end + timedelta(microseconds=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    last = min(last, hwm)
+    return (first, last) if first < last else (start, start)
+
+
+def rollup_window(start: datetime, end: datetime,
+                  comp_start: datetime, comp_end: datetime) -> Optional[dict]:
+    """
+    Splits the current and comparison windows into rolled-up full days
+    plus raw edges. Returns the extra params for the rollup source, or
+    None when neither window contains a full rolled-up day.
+    """
+    hwm = _high_water_mark
+    if hwm is None:
+        return None
+
+    rs,  re  = _full_days(start, end, hwm)
+    crs, cre = _full_days(comp_start, comp_end, hwm)
+    if rs == re and crs == cre:
+        return None
+    return {"rs": rs, "re": re, "crs": crs, "cre": cre}
@@ -0,0 +1,129 @@
+import json
+import math
+import os
+from statistics import NormalDist
+from typing import Dict, List, Optional, Tuple
+
+from .metric_configs import metric_configs
+from .query_planner import (
+    COMPARISON_PERIOD, CURRENT_PERIOD, OTHER_LABEL, SampledPlan, chart_top_n, folds_other,
+    rank_bars, sql_text
+)
+
+# Sampled rows aimed for per period; the sample percent follows from the
+# planner's estimate of the window's row count.
+TARGET_ROWS = int(os.getenv("DASHBOARD_APPROX_TARGET_ROWS", "100000"))
+# Windows needing a larger sample than this are answered exactly
+MAX_PERCENT = float(os.getenv("DASHBOARD_APPROX_MAX_PERCENT", "20"))
+MIN_PERCENT = float(os.getenv("DASHBOARD_APPROX_MIN_PERCENT", "0.01"))
+# Error bounds are +/- this two-sided confidence
+CONFIDENCE  = float(os.getenv("DASHBOARD_APPROX_CONFIDENCE", "0.95"))
+
+_Z = NormalDist().inv_cdf(0.5 + CONFIDENCE / 2)
+
+
+def _estimated_rows(conn, period: str, params: dict) -> float:
+    plan = conn.execute(
+        sql_text(f"EXPLAIN (FORMAT JSON) SELECT 1 FROM live_transactions t WHERE {period}"),
+        params
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return float(plan[0]["Plan"]["Plan Rows"])
+
+
+def sample_percent(conn, base_params: dict) -> Optional[float]:
+    """
+    TABLESAMPLE SYSTEM percent that leaves about TARGET_ROWS sampled rows
+    in the smaller of the two periods, from the planner's row estimates
+    (no scan). None when that would exceed MAX_PERCENT: the window is
+    small enough to answer exactly.
+    """
+    rows = min(
+        _estimated_rows(conn, CURRENT_PERIOD, base_params),
+        _estimated_rows(conn, COMPARISON_PERIOD, base_params),
+    )
+    pct = 100.0 * TARGET_ROWS / max(rows, 1.0)
+    if pct > MAX_PERCENT:
+        return None
+    return round(max(pct, MIN_PERCENT), 4)
+
+
+def estimate(row, col: Dict[str, int], period: str, spec: Tuple[int, ...],
+             fraction: float) -> Tuple[float, float]:
+    """
+    (estimate, error bound) of one aggregate from page-sampled totals.
+
+    Pages are kept independently with probability f, so a SUM / COUNT
+    scales by 1 / f with variance (1 - f) / f^2 * sum(page total^2); an
+    AVG is the ratio of two such totals, with the linearized variance
+    (1 - f) * sum((s_p - r * n_p)^2) / n^2.
+    """
+    def get(name):
+        return float(row[col[name]] or 0.0)
+
+    if len(spec) == 1:
+        i = spec[0]
+        total, squares = get(f"{period}{i}"), get(f"{period}{i}s")
+        var = (1 - fraction) / fraction ** 2 * squares
+        return total / fraction, _Z * math.sqrt(max(var, 0.0))
+
+    i, j  = spec
+    s, n  = get(f"{period}{i}"), get(f"{period}{j}")
+    if n == 0:
+        return 0.0, 0.0
+    r     = s / n
+    resid = get(f"{period}{i}s") - 2 * r * get(f"{period}{i}x{j}") + r * r * get(f"{period}{j}s")
+    var   = (1 - fraction) * resid / n ** 2
+    return r, _Z * math.sqrt(max(var, 0.0))
+
+
+def split_sampled_rows(plan: SampledPlan, keys: List[str], rows: list,
+                       pct: float) -> Tuple[list, Dict[str, tuple]]:
+    """
+    Sampled rows -> scaled metric values and per-chart columns, with
+    each chart's top-N applied to the estimates.
+
+    Metrics come back as (metric key, current, previous, error) tuples,
+    chart columns as (names, values, prev_values, errors, other); errors
+    bound the current period. The folded "Other" bar's error treats the
+    tail's estimates as independent.
+    """
+    col      = {k: i for i, k in enumerate(keys)}
+    fraction = pct / 100.0
+
+    by_gid: Dict[int, list] = {}
+    for r in rows:
+        by_gid.setdefault(r[col["gid"]], []).append(r)
+
+    totals  = (by_gid.get(plan.totals) or [None])[0]
+    metrics = []
+    for key in metric_configs:
+        spec = plan.metrics[key]
+        if totals is None:
+            metrics.append((key, 0.0, 0.0, 0.0))
+            continue
+        value, error = estimate(totals, col, "c", spec, fraction)
+        previous, _  = estimate(totals, col, "q", spec, fraction)
+        metrics.append((key, value, previous, error))
+
+    chart_columns = {}
+    for key, (chart_gid, dim_col, spec) in plan.charts.items():
+        bars = []
+        for r in by_gid.get(chart_gid, []):
+            value, error = estimate(r, col, "c", spec, fraction)
+            previous, _  = estimate(r, col, "q", spec, fraction)
+            bars.append((r[col[dim_col]], value, previous, error))
+        bars, tail = rank_bars(bars, chart_top_n(key))
+        other      = bool(tail) and folds_other(key)
+        if other:
+            bars.append((
+                OTHER_LABEL,
+                sum(b[1] for b in tail),
+                sum(b[2] for b in tail),
+                math.sqrt(sum(b[3] ** 2 for b in tail)),
+            ))
+        columns = tuple(list(c) for c in zip(*bars)) if bars else ([], [], [], [])
+        chart_columns[key] = columns + (other,)
+
+    return metrics, chart_columns
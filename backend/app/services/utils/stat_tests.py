@@ -1,44 +1,119 @@
-from scipy.stats import norm
-import numpy as np
+from typing import TYPE_CHECKING, Dict, List, Sequence
 
-def compare_to_historical_single_point(yesterday_val: float, historical_values: list[float], alpha=0.05) -> dict:
+# numpy / scipy are imported inside the functions so importing this module
+# (and the API) stays cheap; they load on the first scoring call.
+if TYPE_CHECKING:
+    import numpy
+
+
+def score_series(series: Sequence[Sequence[float]], alpha: float = 0.05) -> Dict[str, "numpy.ndarray"]:
     """
-    Perform z-test and prediction interval check to compare yesterday's value to historical distribution.
+    Scores the last point of every row against that row's own history, in
+    one vectorized pass.
+
+    - series: k x (n + 1) matrix, one row per (chart, category) daily series;
+              the first n columns are history, the last is the day scored.
+              NaN marks a day with no value (e.g. an average over no rows)
+              and is left out of that row's statistics.
+    - alpha:  two-sided significance level for the prediction interval.
+
+    Returns arrays of length k: value, mean, std, z_score, p_value, lower,
+    upper, is_anomaly. Rows with fewer than two history points or zero
+    variance get NaN statistics and is_anomaly False.
     """
-    n = len(historical_values)
-    mean = np.mean(historical_values)
-    std = np.std(historical_values, ddof=1) 
-    if std == 0:
-        return {
-        "z_score": None,
-        "p_value": None,
-        "mean": round(mean, 2),
-        "std": round(std, 2),
-        "is_significant": False,
-        "insight": "No variation in historical data."
+    import numpy as np
+    from scipy.stats import norm
+
+    values  = np.atleast_2d(np.asarray(series, dtype=float))
+    history = values[:, :-1]
+    latest  = values[:, -1]
+
+    n = np.sum(~np.isnan(history), axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.where(n > 0, np.nansum(history, axis=1) / n, np.nan)
+        var  = np.where(
+            n > 1,
+            np.nansum((history - mean[:, None]) ** 2, axis=1) / (n - 1),
+            np.nan
+        )
+        std  = np.sqrt(var)
+        ok   = (std > 0) & ~np.isnan(latest)
+
+        z      = np.where(ok, (latest - mean) / std, np.nan)
+        p      = 2 * norm.sf(np.abs(z))
+        margin = norm.isf(alpha / 2) * std * np.sqrt(1 + 1 / n)
+
+    lower = mean - margin
+    upper = mean + margin
+    return {
+        "value":      latest,
+        "mean":       mean,
+        "std":        std,
+        "z_score":    z,
+        "p_value":    p,
+        "lower":      lower,
+        "upper":      upper,
+        "is_anomaly": ok & ((latest < lower) | (latest > upper)),
+    }
+
+
+def score_rows(series: Sequence[Sequence[float]], alpha: float = 0.05) -> List[dict]:
+    """
+    score_series, transposed into one plain dict per row (rounded, NaN ->
+    None) so results can be cached and serialized.
+    """
+    scores = score_series(series, alpha)
+
+    def clean(v, digits):
+        return None if v != v else round(float(v), digits)
+
+    return [
+        {
+            "value":      clean(scores["value"][i], 2),
+            "mean":       clean(scores["mean"][i], 2),
+            "std":        clean(scores["std"][i], 2),
+            "z_score":    clean(scores["z_score"][i], 2),
+            "p_value":    clean(scores["p_value"][i], 4),
+            "lower":      clean(scores["lower"][i], 2),
+            "upper":      clean(scores["upper"][i], 2),
+            "is_anomaly": bool(scores["is_anomaly"][i]),
         }
+        for i in range(len(scores["value"]))
+    ]
 
 
-    # Z-test
-    z = (yesterday_val - mean) / std
-    p = 2 * norm.sf(abs(z)) 
+def compare_to_historical_single_point(
+    yesterday_val: float,
+    historical_values: List[float],
+    alpha: float = 0.05
+) -> dict:
+    """
+    Z-test and prediction-interval check of one value against its history;
+    a single-row score_series.
+    """
+    score = score_rows([list(historical_values) + [yesterday_val]], alpha)[0]
 
-    t_multiplier = 1.96 
-    pred_margin = t_multiplier * std * np.sqrt(1 + 1/n)
-    lower_bound = mean - pred_margin
-    upper_bound = mean + pred_margin
-    is_outlier = yesterday_val < lower_bound or yesterday_val > upper_bound
+    if score["z_score"] is None:
+        return {
+            "z_score":        None,
+            "p_value":        None,
+            "mean":           score["mean"] or 0.0,
+            "std":            score["std"] or 0.0,
+            "is_significant": False,
+            "insight":        "No variation in historical data."
+        }
 
     summary = (
-        f"Yesterday’s payment method diversity was {'unusually high' if z > 0 else 'unusually low'} "
-        f"compared to the historical average ({mean:.2f}, p = {p:.4f})."
-    ) if is_outlier else "Yesterday’s payment method diversity was within the expected range."
+        f"Yesterday’s {yesterday_val:.2f} was "
+        f"{'unusually high' if score['z_score'] > 0 else 'unusually low'} "
+        f"vs historical mean {score['mean']:.2f} (p={score['p_value']:.4f})."
+    ) if score["is_anomaly"] else "Yesterday’s value was within the expected range."
 
     return {
-        "z_score": round(z, 2),
-        "p_value": round(p, 4),
-        "mean": round(mean, 2),
-        "std": round(std, 2),
-        "is_significant": is_outlier,
-        "insight": summary,
-    }
\ No newline at end of file
+        "z_score":        score["z_score"],
+        "p_value":        score["p_value"],
+        "mean":           score["mean"],
+        "std":            score["std"],
+        "is_significant": score["is_anomaly"],
+        "insight":        summary
+    }
@@ -93,6 +93,34 @@ def get_date_ranges(
     return start, end, comp_start, comp_end
 
 
+# Filters whose window ends "now" and keeps growing during the day
+LIVE_FILTERS = ('today', 'mtd', 'ytd')
+
+
+def is_live_window(filter_type: str, end: datetime) -> bool:
+    """
+    True when the window is still receiving rows (TODAY / MTD / YTD, or a
+    CUSTOM range reaching into today); False for closed historical windows.
+    """
+    ft = filter_type.lower()
+    if ft in LIVE_FILTERS:
+        return True
+    if ft == 'custom':
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        return end >= today
+    return False
+
+
+def seconds_until_midnight(now: Optional[datetime] = None) -> float:
+    """
+    Seconds left until the next local midnight, when every closed window
+    produced by get_date_ranges rolls over.
+    """
+    now = now or datetime.now()
+    midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (midnight - now).total_seconds()
+
+
 def fetch_one(conn, sql: str, params: dict) -> float:
     """
     Executes a scalar SQL query and returns its single numeric result.
@@ -1,59 +1,74 @@
-from collections import defaultdict
-from typing import Callable, Iterable, Any, Dict, Optional
+from typing import Awaitable, Callable, Any, Dict, List, Optional, Tuple
 import asyncio
 
 class DataLoader:
     """
     A simple DataLoader for batching and caching keys to values.
 
+    Keys requested during the same event-loop tick are collected and
+    passed to one call of the async batch_load_fn. Each key gets its own
+    future, so a key missing from the batch result resolves to None
+    without affecting the others, and a failed batch only fails (and
+    evicts) the keys it was loading.
+
     Example:
-        def batch_load_fn(keys: List[int]) -> Dict[int, User]:
+        async def batch_load_fn(keys: List[int]) -> Dict[int, User]:
             # perform one SQL query: SELECT * FROM user WHERE id IN (:keys)
             return {u.id: u for u in users}
 
         loader = DataLoader(batch_load_fn)
         user = await loader.load(123)
     """
-    def __init__(self, batch_load_fn: Callable[[Iterable[Any]], Dict[Any, Any]]):
-        self.batch_load_fn = batch_load_fn
-        self._cache: Dict[Any, Any] = {}
-        self._queue: Optional[asyncio.Future] = None
-        self._keys: list = []
+    def __init__(self,
+                 batch_load_fn: Callable[[List[Any]], Awaitable[Dict[Any, Any]]],
+                 max_batch_size: Optional[int] = None):
+        self.batch_load_fn  = batch_load_fn
+        self.max_batch_size = max_batch_size
+        self._cache: Dict[Any, asyncio.Future] = {}
+        self._queue: List[Tuple[Any, asyncio.Future]] = []
+        self.batches = 0
 
     async def load(self, key: Any) -> Any:
-        # Return from cache if available
-        if key in self._cache:
-            return self._cache[key]
+        # Return from cache (resolved or in flight) if available
+        future = self._cache.get(key)
+        if future is None:
+            loop   = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._cache[key] = future
+
+            # Schedule dispatch once per batch, after sibling resolvers
+            # have had a chance to queue their keys
+            if not self._queue:
+                loop.call_soon(lambda: loop.create_task(self._dispatch()))
+            self._queue.append((key, future))
 
-        # Queue up the key
-        if self._queue is None:
-            loop = asyncio.get_event_loop()
-            self._queue = loop.create_future()
-            # Schedule dispatch on next loop iteration
-            loop.call_soon(self._dispatch)
+        return await future
 
-        self._keys.append(key)
-        await self._queue
-        return self._cache.get(key)
+    async def load_many(self, keys: List[Any]) -> List[Any]:
+        return list(await asyncio.gather(*(self.load(k) for k in keys)))
 
-    def _dispatch(self):
-        # Called in event loop to batch load
-        keys = list(set(self._keys))
-        self._keys.clear()
+    async def _dispatch(self):
+        queue, self._queue = self._queue, []
+        size = self.max_batch_size or len(queue)
+        await asyncio.gather(*(
+            self._load_batch(queue[i:i + size]) for i in range(0, len(queue), size)
+        ))
 
+    async def _load_batch(self, batch: List[Tuple[Any, asyncio.Future]]):
+        self.batches += 1
         try:
-            results = self.batch_load_fn(keys)
+            results = await self.batch_load_fn([k for k, _ in batch])
         except Exception as exc:
-            # Fail all pending
-            self._queue.set_exception(exc)
-            self._queue = None
+            # Fail this batch and drop it from the cache so it can be retried
+            for key, future in batch:
+                self._cache.pop(key, None)
+                if not future.done():
+                    future.set_exception(exc)
             return
 
-        # Populate cache and resolve
-        for k, v in results.items():
-            self._cache[k] = v
-        self._queue.set_result(True)
-        self._queue = None
+        for key, future in batch:
+            if not future.done():
+                future.set_result(results.get(key))
 
     def clear(self, key: Any):
         """Clears a specific key from the cache."""
@@ -61,4 +76,4 @@ class DataLoader:
 
     def clear_all(self):
         """Clears the entire cache."""
-        self._cache.clear() 
\ No newline at end of file
+        self._cache.clear()
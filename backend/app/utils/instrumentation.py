@@ -0,0 +1,123 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+from app.utils.cache import TTLCache
+from app.utils.logger import get_logger
+from app.utils.metrics import REGISTRY
+
+logger = get_logger(__name__)
+
+# Queries slower than this are logged with their EXPLAIN plan (0 = off)
+SLOW_QUERY_MS          = float(os.getenv("DB_SLOW_QUERY_MS", "500"))
+# The same statement is EXPLAINed at most once per interval
+SLOW_QUERY_EXPLAIN_TTL = float(os.getenv("DB_SLOW_QUERY_EXPLAIN_INTERVAL", "300"))
+
+GRAPHQL_RESOLVER_SECONDS = REGISTRY.histogram(
+    "graphql_resolver_duration_seconds",
+    "Time spent in root GraphQL resolvers.",
+    ("field", "outcome"),
+)
+SQL_QUERY_SECONDS = REGISTRY.histogram(
+    "dashboard_sql_duration_seconds",
+    "Time spent executing SQL statements, by dashboard part.",
+    ("part", "chart", "drill_level"),
+)
+SLOW_QUERIES = REGISTRY.counter(
+    "dashboard_sql_slow_total",
+    "SQL statements over DB_SLOW_QUERY_MS.",
+    ("part", "chart", "drill_level"),
+)
+LLM_REQUEST_SECONDS = REGISTRY.histogram(
+    "llm_request_duration_seconds",
+    "LLM insight latency (streams: until the last chunk).",
+    ("mode", "outcome"),
+)
+LLM_TOKENS = REGISTRY.counter(
+    "llm_tokens_total",
+    "LLM tokens spent on insights.",
+    ("kind",),
+)
+
+_QUERY_TAG: ContextVar[dict] = ContextVar("query_tag", default={})
+_EXPLAINED = TTLCache(max_entries=256, max_bytes=1024 * 1024)
+
+
+@contextmanager
+def query_tag(part: str, chart: str = "", drill_level: int = 0):
+    """
+    Labels every SQL statement executed inside the block (same thread or
+    greenlet) with the dashboard part, chart key and drill level.
+    """
+    token = _QUERY_TAG.set({"part": part, "chart": chart or "", "drill_level": drill_level})
+    try:
+        yield
+    finally:
+        _QUERY_TAG.reset(token)
+
+
+def record_llm_usage(usage: dict):
+    LLM_TOKENS.inc(usage.get("prompt_tokens", 0),     kind="prompt")
+    LLM_TOKENS.inc(usage.get("completion_tokens", 0), kind="completion")
+
+
+# ── SQL timing ─────────────────────────────────────────────────────
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    tag     = _QUERY_TAG.get() or {"part": "untagged", "chart": "", "drill_level": 0}
+    SQL_QUERY_SECONDS.observe(elapsed, **tag)
+
+    if SLOW_QUERY_MS <= 0 or elapsed * 1000 < SLOW_QUERY_MS:
+        return
+    SLOW_QUERIES.inc(**tag)
+    _log_slow_query(conn, statement, parameters, executemany, elapsed, tag)
+
+
+def _handle_error(context):
+    # failed statements never reach after_cursor_execute
+    starts = context.connection.info.get("query_start") if context.connection else None
+    if starts:
+        starts.pop()
+
+
+def _log_slow_query(conn, statement, parameters, executemany, elapsed, tag):
+    plan = None
+    explainable = (
+        not executemany
+        and statement.lstrip()[:6].upper().startswith(("SELECT", "WITH"))
+        and _EXPLAINED.get(statement) is None
+    )
+    if explainable:
+        _EXPLAINED.set(statement, True, SLOW_QUERY_EXPLAIN_TTL)
+        try:
+            # raw DBAPI cursor: bypasses these events and the pending result
+            cursor = conn.connection.cursor()
+            try:
+                cursor.execute("EXPLAIN " + statement, parameters)
+                plan = "\n".join(str(r[0]) for r in cursor.fetchall())
+            finally:
+                cursor.close()
+        except Exception as e:
+            plan = f"EXPLAIN failed: {e}"
+
+    logger.warning("slow query", extra={
+        **tag,
+        "duration_ms": round(elapsed * 1000, 1),
+        "sql":         statement,
+        "plan":        plan,
+    })
+
+
+def instrument_engine(engine):
+    """Times every statement on a (sync) Engine; pass async_engine.sync_engine."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
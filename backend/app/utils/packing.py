@@ -0,0 +1,33 @@
+import base64
+import sys
+from array import array
+from typing import Any, List, Sequence, Tuple
+
+# 4-byte unsigned typecode for label codes ("I" on every mainstream platform)
+_UINT32 = "I" if array("I").itemsize == 4 else "L"
+
+
+def _b64(arr: array) -> str:
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return base64.b64encode(arr.tobytes()).decode("ascii")
+
+
+def pack_float64(values: Sequence[float]) -> str:
+    """Base64 of the values as a packed little-endian float64 array."""
+    return _b64(array("d", values))
+
+
+def pack_uint32(values: Sequence[int]) -> str:
+    """Base64 of the values as a packed little-endian uint32 array."""
+    return _b64(array(_UINT32, values))
+
+
+def dictionary_encode(labels: Sequence[Any]) -> Tuple[List[Any], List[int]]:
+    """
+    Splits labels into (distinct labels in first-seen order, one code per
+    label indexing into them).
+    """
+    index: dict = {}
+    codes = [index.setdefault(label, len(index)) for label in labels]
+    return list(index), codes
@@ -0,0 +1,6 @@
+"""
+Benchmarks for the KPI Dashboard backend.
+
+Run from the backend directory against a configured database (.env), e.g.
+    python -m benchmarks.dataloader_queries
+"""
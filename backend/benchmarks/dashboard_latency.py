@@ -0,0 +1,323 @@
+"""
+Dashboard latency scenarios with p50 / p95 / p99, throughput and a baseline.
+
+    python -m benchmarks.dashboard_latency --save-baseline baseline.json
+    python -m benchmarks.dashboard_latency --baseline baseline.json --tolerance 0.15
+    python -m benchmarks.dashboard_latency --scenarios 'drill*' --concurrency 8
+    python -m benchmarks.dashboard_latency --url http://localhost:8023/graphql
+
+Scenarios (load data first with benchmarks.synthetic_data):
+
+- filter:<FilterType>  get_dashboard_data for every FilterType (CUSTOM = last 30 days)
+- approx:<FilterType>  the same with approximate=True (sampled base pass)
+- chart:<key>          each base chart's own statement for --filter
+- drill<n>:<key>       n-level drill path (1 .. DASHBOARD_MAX_DRILL_DEPTH)
+                       through the largest category at each level
+- graphql:<FilterType> the frontend's Dashboard query, in process (or over
+                       HTTP against a running server with --url)
+
+The result cache is disabled unless --cache is given, so every iteration
+hits the database. With --baseline, any scenario whose p95 is more than
+--tolerance slower than the baseline fails the run (exit 1).
+"""
+import argparse
+import asyncio
+import fnmatch
+import inspect
+import json
+import math
+import os
+import platform
+import sys
+import time
+import urllib.request
+from datetime import date, timedelta
+from typing import Callable, Dict, List, NamedTuple
+
+from sqlalchemy import text
+
+from app.db import ASYNC_DB, get_engine
+from app.gql_api.loaders import RequestLoaders
+from app.gql_api.schema import FilterType, schema
+from app.services import fetch_dashboard
+from app.services.chart_configs import BASE_CHART_KEYS, chart_configs, drill_chart_key
+from app.services.drill_planner import MAX_DEPTH
+
+DASHBOARD_QUERY = """
+query Dashboard($filterType: FilterType!, $custom: CustomRange, $drillKeys: JSON) {
+  dashboard(filterType: $filterType, custom: $custom, drillKeys: $drillKeys) {
+    metrics { title value diff }
+    charts { key title type x y drillable nextChart }
+  }
+}
+"""
+
+
+class Scenario(NamedTuple):
+    name: str
+    run:  Callable   # no-arg callable or coroutine function
+
+
+def _custom_range() -> tuple:
+    end = date.today() - timedelta(days=1)
+    return end - timedelta(days=29), end
+
+
+def _filter_args(filter_type: str) -> tuple:
+    return (filter_type, _custom_range() if filter_type == "CUSTOM" else None)
+
+
+def _drill_dims(base_key: str) -> List[str]:
+    """ALL_DIMS other than the base chart's own field, in order."""
+    own = chart_configs[base_key]["drill_field"].split(".", 1)[1]
+    return [d for d in fetch_dashboard.ALL_DIMS if d != own]
+
+
+def _largest(chart: dict):
+    """The largest real category (never the folded "Other" bar)."""
+    bars = list(zip(chart["y"], chart["x"]))
+    if chart["other"]:
+        bars = bars[:-1]
+    return max(bars, key=lambda p: p[0])[1] if bars else None
+
+
+def drill_keys(filter_type: str, base_key: str, level: int):
+    """
+    Drill keys reaching `level` below base_key through the largest category
+    at each step, or None when the window has no data to drill into.
+    """
+    ft, custom = _filter_args(filter_type)
+    base = next(c for c in fetch_dashboard.get_dashboard_data(ft, custom)["charts"]
+                if c["key"] == base_key)
+    value = _largest(base)
+    if value is None:
+        return None
+
+    dims = _drill_dims(base_key)[:level]
+    keys = {base_key: value, drill_chart_key(1): {"dimension": dims[0]}}
+    for n, dim in enumerate(dims[1:], 2):
+        parent = fetch_dashboard.get_dashboard_data(ft, custom, keys)["charts"][-1]
+        value  = _largest(parent)
+        if value is None:
+            return None
+        keys[drill_chart_key(n - 1)]["value"] = value
+        keys[drill_chart_key(n)] = {"dimension": dim}
+    return keys
+
+
+def _graphql_variables(filter_type: str, keys: dict = None) -> dict:
+    ft, custom = _filter_args(filter_type)
+    variables  = {"filterType": ft, "drillKeys": keys}
+    if custom:
+        variables["custom"] = {"start": custom[0].isoformat(), "end": custom[1].isoformat()}
+    return variables
+
+
+def _graphql_scenario(filter_type: str, url: str = None) -> Callable:
+    variables = _graphql_variables(filter_type)
+
+    if url:
+        body = json.dumps({"query": DASHBOARD_QUERY, "variables": variables}).encode()
+
+        def over_http():
+            request = urllib.request.Request(
+                url, data=body, headers={"Content-Type": "application/json"}
+            )
+            with urllib.request.urlopen(request) as response:
+                payload = json.loads(response.read())
+            if payload.get("errors"):
+                raise RuntimeError(payload["errors"])
+        return over_http
+
+    async def in_process():
+        result = await schema.execute(
+            DASHBOARD_QUERY, variable_values=variables,
+            context_value={"loaders": RequestLoaders()},
+        )
+        if result.errors:
+            raise RuntimeError(result.errors)
+    return in_process
+
+
+def _chart_scenario(filter_type: str, key: str) -> Callable:
+    window = fetch_dashboard._resolve_window(*_filter_args(filter_type))
+
+    def run():
+        with get_engine().connect() as conn:
+            fetch_dashboard._fetch_base_chart(key, conn, window.params)
+    return run
+
+
+def build_scenarios(filter_type: str, url: str = None) -> List[Scenario]:
+    scenarios = [
+        Scenario(f"filter:{ft.value}", lambda a=_filter_args(ft.value): fetch_dashboard.get_dashboard_data(*a))
+        for ft in FilterType
+    ]
+    scenarios += [
+        Scenario(f"approx:{ft.value}",
+                 lambda a=_filter_args(ft.value): fetch_dashboard.get_dashboard_data(*a, approximate=True))
+        for ft in FilterType
+    ]
+    scenarios += [
+        Scenario(f"chart:{key}", _chart_scenario(filter_type, key))
+        for key in BASE_CHART_KEYS
+    ]
+    for level in range(1, MAX_DEPTH + 1):
+        for key in BASE_CHART_KEYS:
+            keys = drill_keys(filter_type, key, level)
+            if keys is None:
+                print(f"skipping drill{level}:{key}: no data for {filter_type}", file=sys.stderr)
+                continue
+            args = _filter_args(filter_type) + (keys,)
+            scenarios.append(Scenario(
+                f"drill{level}:{key}",
+                lambda a=args: fetch_dashboard.get_dashboard_data(*a),
+            ))
+    scenarios += [
+        Scenario(f"graphql:{ft.value}", _graphql_scenario(ft.value, url))
+        for ft in FilterType
+    ]
+    return scenarios
+
+
+# ── Measurement ────────────────────────────────────────────────────
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Linear-interpolated percentile (q in 0..100) of sorted values."""
+    if not sorted_values:
+        return math.nan
+    pos = (len(sorted_values) - 1) * q / 100
+    lo  = math.floor(pos)
+    hi  = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+async def measure(run: Callable, iterations: int, warmup: int, concurrency: int) -> dict:
+    """
+    Runs `run` warmup + iterations times, at most `concurrency` at once.
+    Blocking callables go to worker threads; coroutine functions share the
+    event loop (so the async engine's pool stays on one loop).
+    """
+    is_async = inspect.iscoroutinefunction(run)
+
+    async def call() -> float:
+        started = time.perf_counter()
+        if is_async:
+            await run()
+        else:
+            await asyncio.to_thread(run)
+        return time.perf_counter() - started
+
+    for _ in range(warmup):
+        await call()
+
+    limit = asyncio.Semaphore(concurrency)
+
+    async def limited() -> float:
+        async with limit:
+            return await call()
+
+    started   = time.perf_counter()
+    latencies = sorted(await asyncio.gather(*(limited() for _ in range(iterations))))
+    wall      = time.perf_counter() - started
+
+    ms = [t * 1000 for t in latencies]
+    return {
+        "p50_ms":         round(percentile(ms, 50), 2),
+        "p95_ms":         round(percentile(ms, 95), 2),
+        "p99_ms":         round(percentile(ms, 99), 2),
+        "mean_ms":        round(sum(ms) / len(ms), 2),
+        "throughput_rps": round(iterations / wall, 2),
+    }
+
+
+def environment() -> dict:
+    with get_engine().connect() as conn:
+        rows = conn.execute(text(
+            "SELECT reltuples::bigint FROM pg_class WHERE relname = 'live_transactions'"
+        )).scalar()
+    return {
+        "rows_estimate":  rows,
+        "execution_mode": fetch_dashboard.EXECUTION_MODE,
+        "rollups":        fetch_dashboard.ROLLUPS_ENABLED,
+        "matviews":       fetch_dashboard.MATVIEWS_ENABLED,
+        "concurrent":     fetch_dashboard.CONCURRENT,
+        "async_db":       ASYNC_DB,
+        "python":         platform.python_version(),
+    }
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """Prints the p50 / p95 / p99 change per scenario; returns regressed names."""
+    regressed = []
+    print(f"\n{'scenario':<40} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<40} {'(new)':>9}")
+            continue
+        changes = [
+            (stats[k] - base[k]) / base[k] * 100 if base[k] else 0.0
+            for k in ("p50_ms", "p95_ms", "p99_ms")
+        ]
+        flag = ""
+        if changes[1] > tolerance * 100:
+            regressed.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<40} " + " ".join(f"{c:>+8.1f}%" for c in changes) + flag)
+    return regressed
+
+
+async def run_all(args) -> Dict[str, dict]:
+    scenarios = [
+        s for s in await asyncio.to_thread(build_scenarios, args.filter, args.url)
+        if any(fnmatch.fnmatch(s.name, p) for p in args.scenarios)
+    ]
+
+    results = {}
+    print(f"{'scenario':<40} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9}")
+    for scenario in scenarios:
+        stats = await measure(scenario.run, args.iterations, args.warmup, args.concurrency)
+        results[scenario.name] = stats
+        print(f"{scenario.name:<40} {stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} "
+              f"{stats['p99_ms']:>9.1f} {stats['throughput_rps']:>9.1f}", flush=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--filter", default="YESTERDAY",
+                        help="window for the chart / drill scenarios")
+    parser.add_argument("--scenarios", nargs="+", default=["*"], help="name globs")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--url", help="GraphQL endpoint for the graphql:* scenarios")
+    parser.add_argument("--cache", action="store_true", help="keep the result cache on")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--save-baseline", help="write these results as JSON")
+    parser.add_argument("--tolerance", type=float,
+                        default=float(os.getenv("BENCHMARK_TOLERANCE", "0.10")),
+                        help="allowed p95 slowdown vs. the baseline (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    fetch_dashboard.CACHE_ENABLED = args.cache
+    results = asyncio.run(run_all(args))
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({"environment": environment(), "iterations": args.iterations,
+                       "concurrency": args.concurrency, "scenarios": results}, f, indent=2)
+        print(f"\nsaved baseline to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            saved = json.load(f)
+        regressed = compare(results, saved["scenarios"], args.tolerance)
+        if regressed:
+            print(f"\nFAIL: p95 regressed over {args.tolerance:.0%}: {', '.join(regressed)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
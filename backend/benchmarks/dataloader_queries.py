@@ -0,0 +1,93 @@
+"""
+Compares SQL statement counts for one GraphQL document with N sibling
+fields, with and without the per-request DataLoaders.
+
+    python -m benchmarks.dataloader_queries --fields 6 --filter YESTERDAY
+
+The result cache is disabled for the run so every statement is counted.
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import event
+
+from app.db import get_engine, get_async_engine
+from app.gql_api.loaders import RequestLoaders
+from app.gql_api.schema import schema
+from app.services import fetch_dashboard
+
+
+def build_document(fields: int, filter_type: str) -> str:
+    """
+    N sibling dashboard fields; odd ones drill into USD -> card type -> acquirer
+    (passed as $drill), so batched runs share the base pass between them.
+    """
+    selections = []
+    for i in range(fields):
+        drill = ", drillKeys: $drill" if i % 2 else ""
+        selections.append(
+            f"d{i}: dashboard(filterType: {filter_type}{drill}) "
+            "{ metrics { title value } charts { key x y } }"
+        )
+    return "query ($drill: JSON) {\n  " + "\n  ".join(selections) + "\n}"
+
+
+class StatementCounter:
+    def __init__(self, engine):
+        self.count  = 0
+        self.engine = engine
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+
+async def run(document: str, variables: dict, batched: bool) -> tuple:
+    async_engine = get_async_engine()
+    engine       = async_engine.sync_engine if async_engine is not None else get_engine()
+    context      = {"loaders": RequestLoaders()} if batched else {}
+
+    with StatementCounter(engine) as counter:
+        started = time.perf_counter()
+        result  = await schema.execute(
+            document, variable_values=variables, context_value=context
+        )
+        elapsed = time.perf_counter() - started
+
+    if result.errors:
+        raise RuntimeError(result.errors)
+    return counter.count, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--fields", type=int, default=6)
+    parser.add_argument("--filter", default="YESTERDAY")
+    args = parser.parse_args()
+
+    fetch_dashboard.CACHE_ENABLED = False
+    document = build_document(args.fields, args.filter)
+
+    variables = {"drill": {
+        "revenueByCurrency": "USD",
+        "DRILL_LVL1": {"dimension": "credit_card_type", "value": "VISA"},
+        "DRILL_LVL2": {"dimension": "name"},
+    }}
+
+    unbatched = asyncio.run(run(document, variables, batched=False))
+    batched   = asyncio.run(run(document, variables, batched=True))
+
+    print(f"sibling fields: {args.fields}")
+    print(f"unbatched: {unbatched[0]:4d} statements  {unbatched[1] * 1000:8.1f} ms")
+    print(f"batched:   {batched[0]:4d} statements  {batched[1] * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Import-time budget for the API process.
+
+    python -m benchmarks.import_time --budget-ms 1500
+
+Imports app.main in a fresh interpreter under `-X importtime`, prints the
+slowest modules and fails (exit 1) when the cumulative import time is over
+budget or when an insight-only dependency is loaded at startup. Needs no
+database or LLM credentials. tests/test_import_time.py enforces the same
+budget (IMPORT_BUDGET_MS) in the test suite.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+# Loaded on first insight request only (see app/LLM and gql_api/schema.py)
+LAZY_MODULES = ("tiktoken", "scipy", "numpy", "xai_sdk", "grpc")
+
+
+def measure(module: str) -> list:
+    """
+    Returns (cumulative µs, self µs, module name) for every module imported
+    by `import module` in a fresh interpreter. Raises RuntimeError with
+    the interpreter's stderr when the import fails.
+    """
+    env = dict(os.environ)
+    # app.db builds its engine URL from these at import; values are unused
+    for name, value in (("DB_USER", "x"), ("DB_PASSWORD", "x"), ("DB_HOST", "localhost"),
+                        ("DB_PORT", "5432"), ("DB_NAME", "x")):
+        env.setdefault(name, value)
+
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr}")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), name.strip()))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--budget-ms", type=float,
+                        default=float(os.getenv("IMPORT_BUDGET_MS", "1500")))
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    try:
+        rows = measure(args.module)
+    except RuntimeError as e:
+        sys.exit(str(e))
+    total = next((c for c, _, name in rows if name == args.module), 0) / 1000
+
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative_us, self_us, name in sorted(rows, reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+
+    eager = sorted({
+        name.split(".")[0] for _, _, name in rows
+        if name.split(".")[0] in LAZY_MODULES
+    })
+
+    print(f"\nimport {args.module}: {total:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    failed = False
+    if total > args.budget_ms:
+        print("FAIL: over budget")
+        failed = True
+    if eager:
+        print(f"FAIL: loaded at startup: {', '.join(eager)}")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
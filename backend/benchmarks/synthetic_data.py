@@ -0,0 +1,363 @@
+"""
+Synthetic acquirer / merchant / live_transactions data for benchmarks.
+
+    python -m benchmarks.synthetic_data --rows 1000000 --reset
+    python -m benchmarks.synthetic_data --rows 100000000 --days 800 --chunk 500000
+
+Creates the tables from app.models when missing and bulk-loads them with
+COPY ... FROM STDIN through the configured (pg8000) engine, chunk by chunk,
+so memory stays flat at any scale. Point DB_* at a local, disposable
+database: --reset drops and recreates the three tables.
+
+Distributions follow the enums in app/models/enums.py: skewed card, currency
+and acquirer shares, log-normal amounts, weekly and intraday seasonality and
+slow growth over --days days ending now (so every FilterType, including the
+YTD comparison year, has data). Transaction chunks are generated by --workers
+processes, each chunk from its own seed, so the same --seed gives the same
+data (relative to the day it is loaded) whatever the worker count.
+"""
+import argparse
+import io
+import math
+import os
+import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional, Sequence
+
+from sqlalchemy import text
+
+from app.db import get_engine
+from app.models.acquirer import Acquirer
+from app.models.base import Base
+from app.models.enums import (
+    CountryCodeEnum, CreationTypeEnum, CreditCardTypeEnum, CurrencyEnum,
+    FundingSourceEnum, GenderEnum, IndustryCategoryEnum, LegalEntityTypeEnum,
+    ScaTypeEnum, StatusEnum, TransactionTypeEnum, AnnualTurnoverEnumGBP,
+    BusinessStructureEnum, ProductServiceEnum
+)
+from app.models.live_transaction import LiveTransaction
+from app.models.merchant import Merchant
+
+TABLES = [Acquirer.__table__, Merchant.__table__, LiveTransaction.__table__]
+
+ACQUIRER_NAMES = [
+    "Adyen", "Worldpay", "Stripe", "Checkout.com", "Fiserv", "Global Payments",
+    "Nuvei", "Elavon", "Barclaycard", "PayU", "dLocal", "Cielo",
+]
+
+# (member, weight) pairs; unlisted enum members are not generated
+CARD_TYPES = [
+    (CreditCardTypeEnum.VISA, 46), (CreditCardTypeEnum.MASTERCARD, 31),
+    (CreditCardTypeEnum.AMEX, 7), (CreditCardTypeEnum.MAESTRO, 5),
+    (CreditCardTypeEnum.DISCOVER, 3), (CreditCardTypeEnum.UNIONPAY, 3),
+    (CreditCardTypeEnum.JCB, 2), (CreditCardTypeEnum.DINERS, 2),
+    (CreditCardTypeEnum.MIR, 1),
+]
+# currency -> (weight, USD per unit, issuing country)
+CURRENCIES = {
+    CurrencyEnum.USD: (30, 1.0,     CountryCodeEnum.US),
+    CurrencyEnum.EUR: (22, 1.08,    CountryCodeEnum.RO),
+    CurrencyEnum.GBP: (14, 1.27,    CountryCodeEnum.GB),
+    CurrencyEnum.INR: (6,  0.012,   CountryCodeEnum.IN),
+    CurrencyEnum.BRL: (5,  0.20,    CountryCodeEnum.BR),
+    CurrencyEnum.MXN: (4,  0.058,   CountryCodeEnum.MX),
+    CurrencyEnum.PLN: (3,  0.25,    CountryCodeEnum.PL),
+    CurrencyEnum.CZK: (2,  0.043,   CountryCodeEnum.CZ),
+    CurrencyEnum.HUF: (2,  0.0028,  CountryCodeEnum.HU),
+    CurrencyEnum.RON: (2,  0.22,    CountryCodeEnum.RO),
+    CurrencyEnum.BGN: (2,  0.55,    CountryCodeEnum.BG),
+    CurrencyEnum.UAH: (2,  0.025,   CountryCodeEnum.UA),
+    CurrencyEnum.RUB: (1,  0.011,   CountryCodeEnum.RU),
+    CurrencyEnum.CLP: (1,  0.0011,  CountryCodeEnum.CL),
+    CurrencyEnum.COP: (1,  0.00025, CountryCodeEnum.CO),
+    CurrencyEnum.PEN: (1,  0.27,    CountryCodeEnum.PE),
+    CurrencyEnum.ARS: (1,  0.0011,  CountryCodeEnum.AR),
+}
+FUNDING_SOURCES = [(FundingSourceEnum.CREDIT, 55), (FundingSourceEnum.DEBIT, 40),
+                   (FundingSourceEnum.PREPAID, 5)]
+CREATION_TYPES  = [(CreationTypeEnum.ECOM, 70), (CreationTypeEnum.RECURRING, 20),
+                   (CreationTypeEnum.STORED_ACCOUNT, 10)]
+SCA_TYPES       = [(ScaTypeEnum.THREEDS_2_0, 55), (ScaTypeEnum.NO_SCA, 20),
+                   (ScaTypeEnum.TRA, 15), (ScaTypeEnum.EXEMPTION_LOW_VALUE, 10)]
+GENDERS         = [(GenderEnum.FEMALE, 48), (GenderEnum.MALE, 48), (GenderEnum.OTHER, 4)]
+EU_COUNTRIES    = {CountryCodeEnum.BG, CountryCodeEnum.RO, CountryCodeEnum.HU,
+                   CountryCodeEnum.CZ, CountryCodeEnum.PL}
+# Transactions per hour of day, relative
+HOURLY = [2, 1, 1, 1, 1, 2, 4, 6, 8, 9, 10, 10, 11, 10, 10, 10, 10, 11, 12, 12, 11, 8, 5, 3]
+WEEKLY = [1.0, 1.0, 1.02, 1.05, 1.15, 1.25, 0.9]  # Monday .. Sunday
+
+
+def _cumulative(weights: Sequence[float]) -> List[float]:
+    total, out = 0.0, []
+    for w in weights:
+        total += w
+        out.append(total)
+    return out
+
+
+def _zipf(n: int, s: float = 1.1) -> List[float]:
+    return _cumulative([1 / (i + 1) ** s for i in range(n)])
+
+
+class _Weighted:
+    """(member, weight) pairs prepared for repeated random.choices draws."""
+    def __init__(self, pairs):
+        pairs        = list(pairs)
+        self.members = [m for m, _ in pairs]
+        self.cum     = _cumulative([w for _, w in pairs])
+
+    def pick(self, rng: random.Random):
+        return rng.choices(self.members, cum_weights=self.cum)[0]
+
+
+def _copy(conn, table: str, columns: Sequence[str], data: bytes):
+    """COPY one chunk of tab-separated lines into table."""
+    buf    = io.BytesIO(data)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            f"COPY {table} ({', '.join(columns)}) FROM STDIN", stream=buf
+        )
+    finally:
+        cursor.close()
+
+
+class Generator:
+    """
+    Deterministic row generator; days are weighted by growth, weekday and
+    (for today) the part of the day already elapsed.
+    """
+    def __init__(self, days: int, acquirers: int, merchants: int, seed: int,
+                 now: Optional[datetime] = None):
+        self.seed      = seed
+        self.rng       = random.Random(seed)
+        self.now       = (now or datetime.now()).replace(microsecond=0)
+        self.today     = self.now.replace(hour=0, minute=0, second=0)
+        self.acquirers = acquirers
+        self.merchants = merchants
+
+        self.days = [self.today - timedelta(days=d) for d in range(days - 1, -1, -1)]
+        elapsed   = (self.now - self.today).total_seconds() / 86400
+        weights   = [
+            (1 + 0.5 * i / max(days - 1, 1)) * WEEKLY[day.weekday()]
+            for i, day in enumerate(self.days)
+        ]
+        weights[-1] *= elapsed
+        self.day_cum  = _cumulative(weights)
+        self.hour_cum = _cumulative(HOURLY)
+
+        self.acquirer_cum = _zipf(acquirers, 0.9)
+        self.merchant_cum = _zipf(merchants)
+        self.merchant_country = [
+            self.rng.choice(list(CountryCodeEnum)) for _ in range(merchants)
+        ]
+
+        self.currency = _Weighted((c, w) for c, (w, _, _) in CURRENCIES.items())
+        self.card     = _Weighted(CARD_TYPES)
+        self.funding  = _Weighted(FUNDING_SOURCES)
+        self.creation = _Weighted(CREATION_TYPES)
+        self.sca      = _Weighted(SCA_TYPES)
+        self.gender   = _Weighted(GENDERS)
+
+    def _timestamp(self) -> datetime:
+        rng = self.rng
+        day = rng.choices(self.days, cum_weights=self.day_cum)[0]
+        if day == self.today:
+            return day + timedelta(seconds=rng.random() * (self.now - day).total_seconds())
+        hour = rng.choices(range(24), cum_weights=self.hour_cum)[0]
+        return day + timedelta(hours=hour, seconds=rng.randrange(3600))
+
+    def acquirer_lines(self) -> Iterator[str]:
+        first = self.days[0] - timedelta(days=30)
+        for i in range(self.acquirers):
+            name = ACQUIRER_NAMES[i] if i < len(ACQUIRER_NAMES) else f"Acquirer {i + 1}"
+            yield f"{i + 1}\t{name}\t{first}\n"
+
+    def merchant_lines(self) -> Iterator[str]:
+        rng   = self.rng
+        first = self.days[0] - timedelta(days=30)
+        for i in range(self.merchants):
+            yield "\t".join((
+                str(i + 1),
+                f"Merchant {i + 1:06d}",
+                self.merchant_country[i].name,
+                f"merchant{i + 1}@example.com",
+                rng.choice(list(AnnualTurnoverEnumGBP)).name,
+                str(first + timedelta(days=rng.randrange(30))),
+                rng.choice(list(IndustryCategoryEnum)).name,
+                rng.choice(list(ProductServiceEnum)).name,
+                rng.choice(list(BusinessStructureEnum)).name,
+                rng.choice(list(LegalEntityTypeEnum)).name,
+            )) + "\n"
+
+    def transaction_chunk(self, first_id: int, count: int) -> bytes:
+        """Rows first_id .. first_id + count - 1, from a seed of their own."""
+        self.rng = random.Random(f"{self.seed}:{first_id}")
+        return "".join(self.transaction_lines(first_id, count)).encode("utf-8")
+
+    def transaction_lines(self, first_id: int, count: int) -> Iterator[str]:
+        rng = self.rng
+        for tx_id in range(first_id, first_id + count):
+            created  = self._timestamp()
+            currency = self.currency.pick(rng)
+            _, usd_rate, issuer = CURRENCIES[currency]
+            if rng.random() < 0.15:
+                issuer = rng.choice(list(CountryCodeEnum))
+
+            merchant = rng.choices(range(self.merchants), cum_weights=self.merchant_cum)[0]
+            country  = self.merchant_country[merchant]
+            if issuer == country:
+                region = "DOMESTIC"
+            elif issuer in EU_COUNTRIES and country in EU_COUNTRIES:
+                region = "INTRA"
+            else:
+                region = "INTER"
+
+            usd    = max(0.01, round(math.exp(rng.gauss(3.6, 1.1)), 2))
+            amount = max(0.01, round(usd / usd_rate, 2))
+            fraud  = rng.random() < 0.003
+            score  = min(1.0, rng.betavariate(8, 2) if fraud else rng.betavariate(1, 30))
+
+            yield "\t".join((
+                str(tx_id),
+                str(merchant + 1),
+                str(created - timedelta(seconds=rng.randrange(1, 30))),
+                f"{amount:.2f}",
+                self.gender.pick(rng).name,
+                issuer.name,
+                self.card.pick(rng).name,
+                self.funding.pick(rng).name,
+                self.creation.pick(rng).name,
+                self.sca.pick(rng).name,
+                currency.name,
+                f"{usd:.2f}",
+                str(created),
+                str(rng.choices(range(1, self.acquirers + 1), cum_weights=self.acquirer_cum)[0]),
+                StatusEnum.PAY_SETTLED.name,
+                TransactionTypeEnum.PAYMENT.name,
+                "t" if fraud else "f",
+                "t" if score > 0.5 else "f",
+                f"{score:.4f}",
+                "TRUE" if rng.random() < 0.95 else "FALSE",
+                f"{usd * 0.012:.4f}",
+                country.name,
+                region,
+            )) + "\n"
+
+
+MERCHANT_COLUMNS = (
+    "id", "company_name", "country", "email", "annual_turnover", "created_at",
+    "industry_category", "product_description", "business_structure", "legal_entity_type",
+)
+TRANSACTION_COLUMNS = (
+    "id", "merchant_id", "date_time", "amount", "gender", "issuer_country_code",
+    "credit_card_type", "funding_source", "creation_type", "sca_type",
+    "transaction_currency", "usd_value", "created_at", "acquirer_id", "status",
+    "transaction_type", "fraud", "pred_fraud", "fraud_score", "payment_successful",
+    "gateway_fee", "country_code", "region",
+)
+
+
+_WORKER_GENERATOR: Optional[Generator] = None
+
+
+def _init_worker(*args):
+    global _WORKER_GENERATOR
+    _WORKER_GENERATOR = Generator(*args)
+
+
+def _worker_chunk(first_id: int, count: int) -> bytes:
+    return _WORKER_GENERATOR.transaction_chunk(first_id, count)
+
+
+def _transaction_chunks(gen: Generator, rows: int, chunk: int, workers: int) -> Iterator[tuple]:
+    """(rows done, encoded chunk) in id order, at most 2 x workers chunks ahead."""
+    spans = [(first, min(chunk, rows - first + 1)) for first in range(1, rows + 1, chunk)]
+    if workers <= 1:
+        for first, count in spans:
+            yield first + count - 1, gen.transaction_chunk(first, count)
+        return
+
+    init = (len(gen.days), gen.acquirers, gen.merchants, gen.seed, gen.now)
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=init) as pool:
+        pending = deque()
+        for first, count in spans:
+            pending.append((first + count - 1, pool.submit(_worker_chunk, first, count)))
+            if len(pending) >= 2 * workers:
+                done, future = pending.popleft()
+                yield done, future.result()
+        while pending:
+            done, future = pending.popleft()
+            yield done, future.result()
+
+
+def load(rows: int, days: int, acquirers: int, merchants: int, chunk: int,
+         seed: int, reset: bool, workers: int = 1):
+    engine = get_engine()
+    if reset:
+        Base.metadata.drop_all(engine, tables=TABLES[::-1])
+    Base.metadata.create_all(engine, tables=TABLES)
+
+    with engine.connect() as conn:
+        filled = [
+            t.name for t in TABLES
+            if conn.execute(text(f"SELECT EXISTS (SELECT 1 FROM {t.name})")).scalar()
+        ]
+    if filled:
+        raise SystemExit(f"{', '.join(filled)} already hold rows; pass --reset to replace them")
+
+    gen = Generator(days, acquirers, merchants, seed)
+    raw = engine.raw_connection()
+    try:
+        _copy(raw, "acquirer", ("id", "name", "created_at"),
+              "".join(gen.acquirer_lines()).encode("utf-8"))
+        _copy(raw, "merchant", MERCHANT_COLUMNS,
+              "".join(gen.merchant_lines()).encode("utf-8"))
+        raw.commit()
+
+        started = time.perf_counter()
+        for done, data in _transaction_chunks(gen, rows, chunk, workers):
+            _copy(raw, "live_transactions", TRANSACTION_COLUMNS, data)
+            raw.commit()
+            elapsed = time.perf_counter() - started
+            print(f"{done:>12,d} / {rows:,d} rows  {done / elapsed:>10,.0f} rows/s", flush=True)
+
+        cursor = raw.cursor()
+        for table in ("acquirer", "merchant", "live_transactions"):
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                f"(SELECT MAX(id) FROM {table}))"
+            )
+        cursor.execute("ANALYZE acquirer, merchant, live_transactions")
+        cursor.close()
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=800,
+                        help="history length; >= 730 covers the YTD comparison year")
+    parser.add_argument("--acquirers", type=int, default=len(ACQUIRER_NAMES))
+    parser.add_argument("--merchants", type=int, default=None,
+                        help="default: one per 5,000 rows, 100..50,000")
+    parser.add_argument("--chunk", type=int, default=200_000, help="rows per COPY")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="processes generating transaction chunks")
+    parser.add_argument("--reset", action="store_true",
+                        help="drop and recreate acquirer / merchant / live_transactions")
+    args = parser.parse_args()
+
+    merchants = args.merchants or min(50_000, max(100, args.rows // 5000))
+    load(args.rows, args.days, args.acquirers, merchants, args.chunk, args.seed, args.reset,
+         args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+import os
+
+import pytest
+
+# app.db builds its engine URL from DB_* at import. Set TEST_DB_NAME (plus
+# DB_USER / DB_PASSWORD / DB_HOST / DB_PORT) to a disposable database to
+# run the database tests: the `database` fixture drops and reloads its
+# tables. Without it the values below are placeholders and those tests
+# are skipped.
+TEST_DB_NAME = os.getenv("TEST_DB_NAME")
+if TEST_DB_NAME:
+    os.environ["DB_NAME"] = TEST_DB_NAME
+for name, value in (("DB_USER", "x"), ("DB_PASSWORD", "x"), ("DB_HOST", "localhost"),
+                    ("DB_PORT", "5432"), ("DB_NAME", "x")):
+    os.environ.setdefault(name, value)
+
+
+@pytest.fixture(scope="session")
+def database():
+    """The sync engine over a small synthetic data set (60 days, 20k rows)."""
+    if not TEST_DB_NAME:
+        pytest.skip("set TEST_DB_NAME to a disposable database to run database tests")
+
+    from app.db import get_engine
+    from benchmarks.synthetic_data import load
+
+    load(rows=20_000, days=60, acquirers=12, merchants=100, chunk=20_000,
+         seed=7, reset=True)
+    return get_engine()
@@ -0,0 +1,134 @@
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import pytest
+
+from app.services import fetch_dashboard
+from app.services.fetch_dashboard import PartRef, _resolve_window, load_parts
+from app.utils import cache as cache_module
+from app.utils.cache import TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_get_returns_a_copy_until_the_ttl_runs_out(clock):
+    cache = TTLCache()
+    cache.set("k", {"x": [1]}, ttl=10)
+
+    value = cache.get("k")
+    value["x"].append(2)
+    assert cache.get("k") == {"x": [1]}
+
+    clock[0] += 10
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_non_positive_ttl_is_not_cached():
+    cache = TTLCache()
+    cache.set("k", 1, ttl=0)
+    assert cache.get("k") is None
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = TTLCache(max_entries=2)
+    cache.set("a", 1, ttl=60)
+    cache.set("b", 2, ttl=60)
+    cache.get("a")
+    cache.set("c", 3, ttl=60)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_byte_bound_evicts_and_rejects_oversized_values():
+    cache = TTLCache(max_bytes=20)
+    cache.set("a", "x" * 8, ttl=60)   # 10 bytes as JSON
+    cache.set("b", "y" * 8, ttl=60)
+    cache.set("c", "z" * 8, ttl=60)
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] <= 20
+
+    cache.set("big", "w" * 50, ttl=60)
+    assert cache.get("big") is None
+
+
+def test_stats_count_hits_and_misses():
+    cache = TTLCache()
+    cache.set("k", 1, ttl=60)
+    cache.get("k")
+    cache.get("missing")
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hit_ratio"] == 0.5
+
+
+# ── RESULT_CACHE keying ───────────────────────────────────────────
+
+class _Engine:
+    @contextmanager
+    def connect(self):
+        yield None
+
+
+@pytest.fixture
+def result_cache(monkeypatch):
+    monkeypatch.setattr(fetch_dashboard, "CACHE_ENABLED", True)
+    monkeypatch.setattr(fetch_dashboard, "CONCURRENT", False)
+    monkeypatch.setattr(fetch_dashboard, "RESULT_CACHE", TTLCache())
+    monkeypatch.setattr(fetch_dashboard, "engine", _Engine())
+
+
+def _load(filter_type: str, custom: tuple = None, task_key: tuple = ("base",)):
+    """Loads one task for the window; returns the params it ran with (or was cached with)."""
+    def task(conn, params):
+        return dict(params)
+    ref = PartRef(_resolve_window(filter_type, custom), task_key, task)
+    return load_parts([ref])[ref]
+
+
+WINDOWS = [
+    ("TODAY", None), ("YESTERDAY", None), ("DAILY", None), ("WEEKLY", None),
+    ("MTD", None), ("MONTHLY", None), ("YTD", None),
+    ("CUSTOM", (date.today() - timedelta(days=7), date.today() - timedelta(days=1))),
+    ("CUSTOM", (date.today() - timedelta(days=3), date.today())),
+    ("CUSTOM", (date.today(), date.today())),
+]
+
+
+@pytest.mark.parametrize("filter_type, custom", WINDOWS)
+def test_each_window_is_served_its_own_periods(result_cache, filter_type, custom):
+    for other_type, other_custom in WINDOWS:
+        _load(other_type, other_custom)
+
+    expected = _resolve_window(filter_type, custom).params
+    served   = _load(filter_type, custom)
+    assert (served["s"], served["cs"]) == (expected["s"], expected["cs"])
+    # live ends move with now between the two loads
+    assert abs(served["e"] - expected["e"]) < timedelta(seconds=5)
+    assert abs(served["ce"] - expected["ce"]) < timedelta(seconds=5)
+
+
+def test_repeat_loads_hit_the_cache(result_cache):
+    calls = []
+
+    def task(conn, params):
+        calls.append(1)
+        return [], []
+
+    for _ in range(3):
+        ref = PartRef(_resolve_window("TODAY", None), ("base",), task)
+        load_parts([ref])
+    assert len(calls) == 1
+
+
+def test_task_keys_are_part_of_the_cache_key(result_cache):
+    window = _resolve_window("WEEKLY", None)
+    assert PartRef(window, ("chart", "a"), None).key != PartRef(window, ("chart", "b"), None).key
+    assert PartRef(window, ("chart", "a"), None) == PartRef(window, ("chart", "a"), None)
@@ -0,0 +1,86 @@
+import asyncio
+import importlib
+
+import pytest
+
+from app.LLM.insight_cache import InsightCache, MemoryInsightStore
+
+# the module, not the app.gql_api.schema attribute (the Schema instance)
+gql = importlib.import_module("app.gql_api.schema")
+
+QUERY = """
+query ($keys: [ChartKey!]!) {
+  chartInsights(chartKeys: $keys, filterType: MONTHLY) {
+    chartKey
+    insight
+    tokenUsage { inputTokens outputTokens }
+  }
+}
+"""
+
+PROMPTS = {
+    "revenueByCurrency":         "prompt: revenue",
+    "top5Acquirers":             "prompt: acquirers",
+    "paymentMethodDistribution": None,  # no data
+}
+# the first chart finishes last, so gather order != completion order
+DELAYS = {"prompt: revenue": 0.03, "prompt: acquirers": 0.0}
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    calls = []
+
+    async def prompts(chartKeys, filterType, custom, loaders=None):
+        return [PROMPTS[k.value] for k in chartKeys]
+
+    async def generate(prompt, prompt_tokens=None):
+        calls.append(prompt)
+        await asyncio.sleep(DELAYS[prompt])
+        if prompt in llm_failures:
+            raise RuntimeError("rate limited")
+        return {"text": f"insight for {prompt}",
+                "usage": {"completion_tokens": 5, "total_tokens": prompt_tokens + 5}}
+
+    llm_failures = set()
+    monkeypatch.setattr(gql, "chart_insight_prompts", prompts)
+    monkeypatch.setattr(gql, "generate_grok_insight_async", generate)
+    monkeypatch.setattr(gql, "count_tokens_batch", lambda ps: [len(p) for p in ps])
+    monkeypatch.setattr(gql, "INSIGHT_CACHE", InsightCache(MemoryInsightStore()))
+    return calls, llm_failures
+
+
+def _insights(keys):
+    result = asyncio.run(gql.schema.execute(QUERY, variable_values={"keys": keys}, context_value={}))
+    assert result.errors is None
+    return result.data["chartInsights"]
+
+
+def test_results_follow_the_requested_order(llm):
+    keys     = ["REVENUE_BY_CURRENCY", "PAYMENT_METHOD_DISTRIBUTION", "TOP_5_ACQUIRERS"]
+    insights = _insights(keys + ["REVENUE_BY_CURRENCY"])  # duplicates collapse
+
+    assert [i["chartKey"] for i in insights] == keys
+    assert insights[0]["insight"] == "insight for prompt: revenue"
+    assert insights[1]["insight"] == "No data for chart `paymentMethodDistribution`."
+    assert insights[2]["insight"] == "insight for prompt: acquirers"
+    assert insights[2]["tokenUsage"] == {"inputTokens": len("prompt: acquirers"), "outputTokens": 5}
+
+
+def test_one_failed_chart_leaves_the_others_intact(llm):
+    calls, failures = llm
+    failures.add("prompt: revenue")
+
+    insights = _insights(["REVENUE_BY_CURRENCY", "TOP_5_ACQUIRERS"])
+
+    assert [i["chartKey"] for i in insights] == ["REVENUE_BY_CURRENCY", "TOP_5_ACQUIRERS"]
+    assert insights[0]["insight"] == "Insight generation failed: rate limited"
+    assert insights[0]["tokenUsage"]["outputTokens"] is None
+    assert insights[1]["insight"] == "insight for prompt: acquirers"
+
+    # the failure was not cached: the next request retries it
+    failures.clear()
+    insights = _insights(["REVENUE_BY_CURRENCY", "TOP_5_ACQUIRERS"])
+    assert insights[0]["insight"] == "insight for prompt: revenue"
+    assert calls.count("prompt: revenue") == 2
+    assert calls.count("prompt: acquirers") == 1
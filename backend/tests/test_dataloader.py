@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+from app.gql_api import loaders as loaders_module
+from app.gql_api.loaders import RequestLoaders
+from app.gql_api.schema import schema
+from app.services.chart_configs import chart_configs
+from app.services.fetch_dashboard import _chart, plan_parts
+from app.utils.dataloader import DataLoader
+
+
+def _recording_loader(results=None, fail_first=False, **kwargs):
+    batches = []
+
+    async def batch_load(keys):
+        batches.append(list(keys))
+        if fail_first and len(batches) == 1:
+            raise RuntimeError("boom")
+        return {k: (results or {}).get(k, k * 10) for k in keys}
+
+    return DataLoader(batch_load, **kwargs), batches
+
+
+def test_keys_loaded_in_one_tick_share_one_batch():
+    async def run():
+        loader, batches = _recording_loader()
+        values = await asyncio.gather(loader.load(1), loader.load(2), loader.load(1))
+        return values, batches
+
+    values, batches = asyncio.run(run())
+    assert values == [10, 20, 10]
+    assert batches == [[1, 2]]
+
+
+def test_loaded_keys_are_cached_across_ticks():
+    async def run():
+        loader, batches = _recording_loader()
+        await loader.load(1)
+        await loader.load_many([1, 2])
+        return batches
+
+    assert asyncio.run(run()) == [[1], [2]]
+
+
+def test_keys_missing_from_the_batch_resolve_to_none():
+    async def run():
+        async def batch_load(keys):
+            return {1: "one"}
+        return await DataLoader(batch_load).load_many([1, 2])
+
+    assert asyncio.run(run()) == ["one", None]
+
+
+def test_failed_batch_is_evicted_and_can_be_retried():
+    async def run():
+        loader, batches = _recording_loader(fail_first=True)
+        with pytest.raises(RuntimeError):
+            await loader.load(1)
+        return await loader.load(1), batches
+
+    value, batches = asyncio.run(run())
+    assert value == 10
+    assert batches == [[1], [1]]
+
+
+def test_max_batch_size_splits_batches():
+    async def run():
+        loader, batches = _recording_loader(max_batch_size=2)
+        await loader.load_many([1, 2, 3, 4, 5])
+        return batches
+
+    assert asyncio.run(run()) == [[1, 2], [3, 4], [5]]
+
+
+QUERY = """
+query {
+  a: dashboard(filterType: WEEKLY) { charts { key x } }
+  b: dashboard(filterType: WEEKLY) { charts { key x } }
+  c: dashboard(filterType: MONTHLY) { charts { key x } }
+}
+"""
+
+
+def test_sibling_dashboard_fields_share_batched_loads(monkeypatch):
+    part_batches, name_batches = [], []
+    acquirers = _chart("top5Acquirers", chart_configs["top5Acquirers"],
+                       ([1, 2], [5, 3], [4, 4], False))
+
+    async def load_parts(refs):
+        part_batches.append(refs)
+        return {ref: ([], [dict(acquirers)]) for ref in refs}
+
+    async def acquirer_names(ids):
+        name_batches.append(sorted(ids))
+        return {i: f"Acquirer {i}" for i in ids}
+
+    monkeypatch.setattr(loaders_module, "load_parts_async", load_parts)
+    monkeypatch.setattr(loaders_module, "fetch_acquirer_names_async", acquirer_names)
+
+    result = asyncio.run(schema.execute(QUERY, context_value={"loaders": RequestLoaders()}))
+
+    assert result.errors is None
+    assert len(part_batches) == 1
+    # a and b ask for the same WEEKLY parts; c adds the MONTHLY ones
+    assert set(part_batches[0]) == set(plan_parts("WEEKLY")) | set(plan_parts("MONTHLY"))
+    assert len(part_batches[0]) == len(set(part_batches[0]))
+    assert name_batches == [[1, 2]]
+    for alias in "abc":
+        assert result.data[alias]["charts"][0]["x"] == ["Acquirer 1", "Acquirer 2"]
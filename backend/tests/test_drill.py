@@ -0,0 +1,126 @@
+import pytest
+from sqlalchemy import text
+
+from app.services import fetch_dashboard
+from app.services.drill_planner import (
+    ALL_DIMS, MAX_DEPTH, NULL_LABEL, build_drill_plans, drill_plan
+)
+from app.services.fetch_dashboard import _drill_tasks, _task_tag
+from app.utils.exceptions import ValidationError
+
+BASE = "revenueByCurrency"
+DIMS = [d for d in ALL_DIMS if d != "transaction_currency"]
+
+
+def test_null_categories_are_labelled_and_drillable():
+    sql = drill_plan(BASE, "region", "sca_type").statement.text
+    assert f"COALESCE(t.region::text, '{NULL_LABEL}') AS k1" in sql
+    assert f"(COALESCE(t.region::text, '{NULL_LABEL}') = :v1) AS p2" in sql
+
+
+def test_paths_up_to_max_depth_compile_with_one_statement():
+    plan = drill_plan(BASE, *DIMS[:MAX_DEPTH])
+    assert plan.level == MAX_DEPTH
+    assert "GROUPING SETS" in plan.statement.text
+    assert drill_plan(BASE, *DIMS[:MAX_DEPTH]) is plan
+
+
+def test_shallow_paths_are_precompiled():
+    plans = build_drill_plans()
+    assert (BASE, DIMS[0]) in plans
+    assert (BASE, DIMS[0], DIMS[1]) in plans
+
+
+@pytest.mark.parametrize("base, dims", [
+    (BASE, DIMS[:MAX_DEPTH + 1]),                 # too deep
+    (BASE, ()),                                   # empty path
+    (BASE, (DIMS[0], DIMS[1], DIMS[0])),          # repeated dimension
+    (BASE, ("no_such_dim",)),                     # unknown dimension
+    ("noSuchChart", (DIMS[0],)),                  # unknown chart
+    ("DRILL_LVL1", (DIMS[0],)),                   # not a drillable base chart
+    (BASE, (["credit_card_type"],)),              # not a string
+])
+def test_invalid_paths_are_rejected(base, dims):
+    with pytest.raises(ValidationError):
+        drill_plan(base, *dims)
+
+
+def test_legacy_and_path_drill_keys_plan_the_same_task():
+    legacy = {
+        BASE: "EUR",
+        "DRILL_LVL1": {"dimension": "credit_card_type", "value": "VISA"},
+        "DRILL_LVL2": {"dimension": "merchant", "topN": 3},
+    }
+    path = {BASE: "EUR", "path": [
+        {"dimension": "credit_card_type", "value": "VISA"},
+        {"dimension": "merchant", "topN": 3},
+    ]}
+    (legacy_key, _), = _drill_tasks(legacy)
+    (path_key, _),   = _drill_tasks(path)
+    assert legacy_key == path_key
+    assert _task_tag(legacy_key) == {"part": "drill", "chart": BASE, "drill_level": 2}
+
+
+def test_path_stops_after_the_first_step_without_a_value():
+    keys = {BASE: "EUR", "path": [
+        {"dimension": "credit_card_type"},
+        {"dimension": "merchant", "value": "Acme"},
+    ]}
+    (task_key, _), = _drill_tasks(keys)
+    assert len(task_key) - 3 == 1
+
+
+@pytest.mark.parametrize("keys", [
+    {BASE: "EUR", "path": [{"dimension": "credit_card_type", "value": "VISA"}] * 2},
+    {BASE: "EUR", "path": "credit_card_type"},
+    {BASE: "EUR", "DRILL_LVL1": {"dimension": "credit_card_type", "topN": 0}},
+    {BASE: "EUR", "path": [{"dimension": d, "value": "x"} for d in DIMS[:MAX_DEPTH + 1]]},
+])
+def test_invalid_drill_keys_are_rejected_before_anything_runs(keys):
+    with pytest.raises(ValidationError):
+        _drill_tasks(keys)
+
+
+def test_no_drill_without_a_clicked_base_value():
+    assert _drill_tasks({}) == []
+    assert _drill_tasks({BASE: "EUR"}) == []
+
+
+def test_each_level_sums_to_the_bar_above(database, monkeypatch):
+    monkeypatch.setattr(fetch_dashboard, "CACHE_ENABLED", False)
+    base   = next(c for c in fetch_dashboard.get_dashboard_data("MONTHLY")["charts"]
+                  if c["key"] == BASE)
+    value, total = max(zip(base["x"], base["y"]), key=lambda p: p[1])
+
+    path = []
+    for dim in ("credit_card_type", "funding_source", "region"):
+        path.append({"dimension": dim})
+        charts = fetch_dashboard.get_dashboard_data(
+            "MONTHLY", drill_keys={BASE: value, "path": path}
+        )["charts"][-len(path):]
+        level  = charts[-1]
+        assert [c["key"] for c in charts] == [f"DRILL_LVL{i}" for i in range(1, len(path) + 1)]
+        assert sum(level["y"]) == pytest.approx(total)
+        # drill on into the largest real category
+        bars = list(zip(level["x"], level["y"]))[:-1 if level["other"] else None]
+        path[-1]["value"], total = max(bars, key=lambda p: p[1])
+
+
+def test_null_dimension_values_drill_as_a_named_category(database):
+    params = fetch_dashboard._resolve_window("MONTHLY", None).params
+    with database.connect() as conn, conn.begin() as tx:
+        conn.execute(text(
+            "UPDATE live_transactions SET region = NULL WHERE id % 3 = 0"
+        ))
+        _, (regions,) = fetch_dashboard._fetch_drill_path(
+            BASE, "USD", (("region", None, 25),), conn, params
+        )
+        assert NULL_LABEL in regions["x"]
+        assert all(isinstance(x, str) for x in regions["x"])
+        null_total = regions["y"][regions["x"].index(NULL_LABEL)]
+
+        _, (_, below) = fetch_dashboard._fetch_drill_path(
+            BASE, "USD", (("region", NULL_LABEL, 25), ("sca_type", None, 25)), conn, params
+        )
+        assert sum(below["y"]) == pytest.approx(null_total)
+        tx.rollback()
@@ -0,0 +1,35 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.import_time import LAZY_MODULES, measure
+
+BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1500"))
+BACKEND   = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_app_imports_within_budget(monkeypatch):
+    # fresh interpreters import app from the backend directory
+    monkeypatch.chdir(BACKEND)
+    rows  = measure("app.main")
+    total = next(c for c, _, name in rows if name == "app.main") / 1000
+    assert total <= BUDGET_MS, f"import app.main took {total:.0f} ms (budget {BUDGET_MS:.0f} ms)"
+
+
+def test_failed_imports_raise_with_stderr(monkeypatch):
+    monkeypatch.chdir(BACKEND)
+    with pytest.raises(RuntimeError, match="ModuleNotFoundError"):
+        measure("app.no_such_module")
+
+
+def test_insight_only_dependencies_load_lazily():
+    script = (
+        "import json, sys, app.main; "
+        f"print(json.dumps(sorted(m for m in {list(LAZY_MODULES)!r} if m in sys.modules)))"
+    )
+    proc = subprocess.run([sys.executable, "-c", script], cwd=BACKEND,
+                          capture_output=True, text=True, check=True)
+    assert json.loads(proc.stdout.splitlines()[-1]) == []
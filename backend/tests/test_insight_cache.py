@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+
+from app.LLM import insight_cache
+from app.LLM.insight_cache import (
+    DiskInsightStore, InsightCache, MemoryInsightStore, insight_key
+)
+
+
+def _generator(value=None, error=None):
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        if error is not None:
+            raise error
+        return value
+    return generate, calls
+
+
+def test_concurrent_identical_prompts_make_one_call():
+    cache = InsightCache(MemoryInsightStore())
+    generate, calls = _generator({"insight": "up"})
+
+    async def run():
+        return await asyncio.gather(*(
+            cache.get_or_generate("p", "m", 60, generate) for _ in range(5)
+        ))
+
+    assert asyncio.run(run()) == [{"insight": "up"}] * 5
+    assert len(calls) == 1
+    assert cache.stats()["inflight"] == 0
+
+
+def test_without_single_flight_every_caller_generates():
+    cache = InsightCache(None, single_flight=False)
+    generate, calls = _generator({"insight": "up"})
+
+    async def run():
+        await asyncio.gather(*(cache.get_or_generate("p", "m", 60, generate) for _ in range(3)))
+
+    asyncio.run(run())
+    assert len(calls) == 3
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    cache = InsightCache(MemoryInsightStore())
+    failing, _ = _generator(error=RuntimeError("llm down"))
+
+    async def run():
+        return await asyncio.gather(
+            *(cache.get_or_generate("p", "m", 60, failing) for _ in range(3)),
+            return_exceptions=True,
+        )
+
+    assert all(isinstance(r, RuntimeError) for r in asyncio.run(run()))
+    assert cache.get("p", "m") is None
+
+    generate, calls = _generator({"insight": "ok"})
+    assert asyncio.run(cache.get_or_generate("p", "m", 60, generate)) == {"insight": "ok"}
+    assert len(calls) == 1
+
+
+def test_memoized_per_prompt_and_model():
+    cache = InsightCache(MemoryInsightStore())
+    generate, calls = _generator({"insight": "up"})
+
+    async def run():
+        await cache.get_or_generate("p", "m", 60, generate)
+        await cache.get_or_generate("p", "m", 60, generate)
+        await cache.get_or_generate("p", "other-model", 60, generate)
+
+    asyncio.run(run())
+    assert len(calls) == 2
+    assert cache.stats()["hits"] == 1
+    assert insight_key("p", "m") != insight_key("p", "other-model")
+
+
+def test_disk_store_survives_a_new_instance(tmp_path):
+    path = str(tmp_path / "insights.sqlite3")
+    DiskInsightStore(path).set("k", {"insight": "up"}, ttl=60)
+    assert DiskInsightStore(path).get("k") == {"insight": "up"}
+
+
+def test_disk_store_skips_expired_and_trims_oldest(tmp_path, monkeypatch):
+    clock = iter(range(1000, 2000))
+    monkeypatch.setattr(insight_cache.time, "time", lambda: float(next(clock)))
+
+    store = DiskInsightStore(str(tmp_path / "insights.sqlite3"), max_entries=2)
+    store.set("expired", {"v": 0}, ttl=1)
+    for i in range(3):
+        store.set(f"k{i}", {"v": i}, ttl=60)
+
+    assert store.get("expired") is None
+    assert store.get("k0") is None
+    assert (store.get("k1"), store.get("k2")) == ({"v": 1}, {"v": 2})
+
+
+def test_cancelled_originator_does_not_cancel_waiters():
+    cache   = InsightCache(MemoryInsightStore())
+    started = []
+
+    async def generate():
+        started.append(1)
+        await asyncio.sleep(0.05)
+        return {"insight": "up"}
+
+    async def run():
+        originator = asyncio.ensure_future(cache.get_or_generate("p", "m", 60, generate))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.ensure_future(cache.get_or_generate("p", "m", 60, generate))
+        await asyncio.sleep(0.01)
+        originator.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await originator
+        return await waiter
+
+    assert asyncio.run(run()) == {"insight": "up"}
+    assert len(started) == 2
+    assert cache.get("p", "m") == {"insight": "up"}
@@ -0,0 +1,76 @@
+from datetime import datetime
+
+from app.services.live_dashboard import RunningAggregates
+from app.services.query_planner import build_live_plan
+
+PLAN = build_live_plan()
+# components: c0 = SUM(usd_value), c1 = COUNT(usd_value), c2 = COUNT(*)
+KEYS = ["gid", "d0", "d1", "d2", "c0", "q0", "c1", "q1", "c2", "q2", "max_id"]
+
+
+def _row(chart=None, dim=None, cur=(0, 0, 0), cmp=(0, 0, 0), max_id=None):
+    """One delta row: the totals set when chart is None, else one
+    category of that chart's grouping set."""
+    dims = [None, None, None]
+    if chart is None:
+        gid = PLAN.totals
+    else:
+        gid, dim_col, _ = PLAN.charts[chart]
+        dims[int(dim_col[1:])] = dim
+    return (gid, *dims, cur[0], cmp[0], cur[1], cmp[1], cur[2], cmp[2], max_id)
+
+
+def _chart(snapshot, key):
+    return next(c for c in snapshot["charts"] if c["key"] == key)
+
+
+def test_deltas_accumulate_into_the_snapshot():
+    state = RunningAggregates(PLAN, cmp_from=datetime(2026, 1, 1))
+
+    state.apply(KEYS, [
+        _row(cur=(300, 3, 3), cmp=(100, 2, 2), max_id=10),
+        _row("revenueByCurrency", "EUR", cur=(200, 2, 2), cmp=(100, 2, 2)),
+        _row("revenueByCurrency", "USD", cur=(100, 1, 1)),
+    ])
+    state.apply(KEYS, [
+        _row(cur=(100, 1, 1), cmp=(50, 1, 1), max_id=12),
+        _row("revenueByCurrency", "USD", cur=(100, 1, 1), cmp=(50, 1, 1)),
+    ])
+    snapshot = state.snapshot()
+
+    assert state.last_id == 12
+    total, average = snapshot["metrics"]
+    assert (total["title"], total["value"], total["previous"]) == ("Total Volume", 400, 150)
+    # AVG from the summed components, not an average of per-delta averages
+    assert (average["title"], average["value"], average["previous"]) == ("Average Value", 100, 50)
+
+    currency = _chart(snapshot, "revenueByCurrency")
+    assert currency["x"] == ["EUR", "USD"]
+    assert currency["y"] == [200, 200]
+    assert currency["previous"] == [100, 50]
+
+
+def test_categories_without_current_rows_are_left_out():
+    state = RunningAggregates(PLAN, cmp_from=datetime(2026, 1, 1))
+
+    state.apply(KEYS, [
+        _row(cur=(10, 1, 1), cmp=(70, 2, 2), max_id=3),
+        _row("top5Acquirers", 1, cur=(10, 1, 1), cmp=(20, 1, 1)),
+        # comparison-period rows only: no bar until the current period has one
+        _row("top5Acquirers", 2, cmp=(50, 1, 1)),
+    ])
+    assert _chart(state.snapshot(), "top5Acquirers")["x"] == [1]
+
+    state.apply(KEYS, [_row("top5Acquirers", 2, cur=(5, 1, 1), max_id=4)])
+    acquirers = _chart(state.snapshot(), "top5Acquirers")
+    assert acquirers["x"] == [1, 2]
+    assert acquirers["previous"] == [1, 1]
+
+
+def test_unknown_grouping_sets_are_ignored():
+    state = RunningAggregates(PLAN, cmp_from=datetime(2026, 1, 1))
+    state.apply(KEYS, [(-1, None, None, None, 10, 10, 1, 1, 1, 1, 99)])
+
+    assert state.totals == [0.0] * (2 * state.width)
+    assert state.groups == {}
+    assert state.last_id == 0
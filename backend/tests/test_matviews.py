@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services import fetch_dashboard, matviews
+from app.services.matviews import _full_hours, ensure_matviews, matview_window, refresh_matviews
+
+HWM = datetime(2026, 3, 10, 15)  # views cover hours before 15:00
+LOW = HWM - timedelta(days=30)
+
+
+def _at(day, hour, minute=0, second=0, microsecond=0):
+    return datetime(2026, 3, day, hour, minute, second, microsecond)
+
+
+@pytest.mark.parametrize("start, end, expected", [
+    # aligned start, end on the last microsecond of an hour: that hour is full
+    (_at(10, 9), _at(10, 11, 59, 59, 999999), (_at(10, 9), _at(10, 12))),
+    # ragged edges stay raw: 9:30 -> 10:00, 11:00 -> 11:45
+    (_at(10, 9, 30), _at(10, 11, 45), (_at(10, 10), _at(10, 11))),
+    # capped at the high-water mark: the open hour is never materialized
+    (_at(10, 9), _at(10, 18), (_at(10, 9), HWM)),
+    # and at retention: older hours come from raw rows
+    (LOW - timedelta(hours=5), _at(10, 0), (LOW, _at(10, 0))),
+])
+def test_full_hours_split(start, end, expected):
+    assert _full_hours(start, end, LOW, HWM) == expected
+
+
+@pytest.mark.parametrize("start, end", [
+    (_at(10, 9, 10), _at(10, 9, 50)),          # inside one hour
+    (_at(10, 15), _at(10, 18)),                # after the high-water mark
+    (LOW - timedelta(days=2), LOW - timedelta(days=1)),  # before retention
+])
+def test_windows_without_a_full_hour_are_empty(start, end):
+    assert _full_hours(start, end, LOW, HWM) == (start, start)
+
+
+def test_matview_window_params(monkeypatch):
+    monkeypatch.setattr(matviews, "_high_water_mark", HWM)
+
+    split = matview_window(_at(10, 0), _at(10, 16, 20), _at(9, 0), _at(9, 16, 20))
+    assert split == {"rs": _at(10, 0), "re": HWM, "crs": _at(9, 0), "cre": _at(9, 16)}
+
+    # only one window materialized: the other reads raw rows for all of it
+    split = matview_window(_at(10, 15), _at(10, 16), _at(9, 0), _at(9, 2))
+    assert (split["rs"], split["re"]) == (_at(10, 15), _at(10, 15))
+    assert (split["crs"], split["cre"]) == (_at(9, 0), _at(9, 2))
+
+
+def test_matview_window_falls_back_to_raw(monkeypatch):
+    monkeypatch.setattr(matviews, "_high_water_mark", None)
+    assert matview_window(_at(10, 0), _at(10, 12), _at(9, 0), _at(9, 12)) is None
+
+    monkeypatch.setattr(matviews, "_high_water_mark", HWM)
+    assert matview_window(_at(10, 15), _at(10, 16), _at(9, 15, 5), _at(9, 15, 55)) is None
+
+
+def test_matview_reads_match_raw_rows(database):
+    ensure_matviews(database)
+    hwm = refresh_matviews(database)
+
+    window = fetch_dashboard._resolve_window("WEEKLY", None)
+    # ragged edges on both sides of the materialized hours
+    params = {
+        **window.params,
+        "s":  hwm - timedelta(days=3, minutes=17),
+        "e":  hwm + timedelta(minutes=25),
+        "cs": hwm - timedelta(days=10, minutes=43),
+        "ce": hwm - timedelta(days=7) + timedelta(minutes=8),
+    }
+    assert matview_window(params["s"], params["e"], params["cs"], params["ce"])
+    with database.connect() as conn:
+        mv_metrics,  mv_charts  = fetch_dashboard._fetch_base_matviews(conn, params)
+        raw_metrics, raw_charts = fetch_dashboard._fetch_base_fused(conn, params)
+
+    for mv, raw in zip(mv_metrics, raw_metrics):
+        assert mv["value"]    == pytest.approx(raw["value"], abs=0.01)
+        assert mv["previous"] == pytest.approx(raw["previous"], abs=0.01)
+    for mv, raw in zip(mv_charts, raw_charts):
+        assert mv["x"] == raw["x"]
+        assert mv["y"] == pytest.approx(raw["y"])
+        assert mv["previous"] == pytest.approx(raw["previous"])
@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+import strawberry
+
+from app.gql_api.extensions import ResolverTiming
+from app.utils.instrumentation import GRAPHQL_RESOLVER_SECONDS
+from app.utils.metrics import Registry
+
+
+def test_render_is_prometheus_exposition_format():
+    registry = Registry()
+    counter  = registry.counter("jobs_total", 'Jobs "run".', ("kind",))
+    hist     = registry.histogram("job_seconds", "Job latency.", ("kind",), buckets=(0.1, 1.0))
+
+    counter.inc(kind="a")
+    counter.inc(2, kind="a")
+    counter.inc(kind='b"\n')
+    hist.observe(0.05, kind="a")
+    hist.observe(0.5, kind="a")
+    hist.observe(5, kind="a")
+
+    assert registry.render() == (
+        '# HELP jobs_total Jobs \\"run\\".\n'
+        "# TYPE jobs_total counter\n"
+        'jobs_total{kind="a"} 3.0\n'
+        'jobs_total{kind="b\\"\\n"} 1.0\n'
+        "# HELP job_seconds Job latency.\n"
+        "# TYPE job_seconds histogram\n"
+        'job_seconds_bucket{kind="a",le="0.1"} 1\n'
+        'job_seconds_bucket{kind="a",le="1.0"} 2\n'
+        'job_seconds_bucket{kind="a",le="+Inf"} 3\n'
+        'job_seconds_sum{kind="a"} 5.55\n'
+        'job_seconds_count{kind="a"} 3\n'
+    )
+
+
+def test_registering_a_name_twice_returns_the_first_metric():
+    registry = Registry()
+    first    = registry.counter("jobs_total", "Jobs.")
+    assert registry.counter("jobs_total", "Other.") is first
+    first.inc()
+    assert registry.render() == "# HELP jobs_total Jobs.\n# TYPE jobs_total counter\njobs_total 1.0\n"
+
+
+@strawberry.type
+class Item:
+    name: str
+
+
+@strawberry.type
+class Query:
+    @strawberry.field
+    def item(self) -> Item:
+        return Item(name="sync")
+
+    @strawberry.field
+    async def later(self) -> str:
+        await asyncio.sleep(0)
+        return "async"
+
+    @strawberry.field
+    def broken(self) -> str:
+        raise ValueError("boom")
+
+
+SCHEMA = strawberry.Schema(query=Query, extensions=[ResolverTiming])
+
+
+def _count(field: str, outcome: str) -> int:
+    counts, _ = GRAPHQL_RESOLVER_SECONDS._values.get((field, outcome), ([0], [0.0]))
+    return sum(counts)
+
+
+@pytest.mark.parametrize("query, field, outcome", [
+    ("{ item { name } }", "Query.item",   "ok"),
+    ("{ later }",         "Query.later",  "ok"),
+    ("{ broken }",        "Query.broken", "error"),
+])
+def test_resolver_timing_records_root_fields(query, field, outcome):
+    before = _count(field, outcome)
+    asyncio.run(SCHEMA.execute(query))
+    assert _count(field, outcome) == before + 1
+    # nested fields are not timed
+    assert _count("Item.name", "ok") == 0
+
+
+def test_metrics_endpoint_serves_the_registry():
+    from starlette.testclient import TestClient
+
+    from app.main import app
+    from app.utils.metrics import CONTENT_TYPE
+
+    response = TestClient(app).get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == CONTENT_TYPE
+    assert "# TYPE graphql_resolver_duration_seconds histogram" in response.text
@@ -0,0 +1,47 @@
+import base64
+import struct
+
+from app.gql_api.schema import Chart
+from app.utils.packing import dictionary_encode, pack_float64, pack_uint32
+
+
+def _unpack(fmt: str, encoded: str) -> list:
+    raw = base64.b64decode(encoded)
+    return list(struct.unpack(f"<{len(raw) // struct.calcsize(fmt)}{fmt}", raw))
+
+
+def test_float64_round_trip():
+    values = [0.0, -1.5, 3.141592653589793, 1e300, -2.5e-308, 42.0]
+    assert _unpack("d", pack_float64(values)) == values
+    assert pack_float64([]) == ""
+
+
+def test_uint32_round_trip():
+    values = [0, 1, 7, 2**32 - 1]
+    assert _unpack("I", pack_uint32(values)) == values
+
+
+def test_dictionary_encode_round_trip():
+    labels = ["EUR", "USD", "EUR", "GBP", "USD", "EUR"]
+    distinct, codes = dictionary_encode(labels)
+    assert distinct == ["EUR", "USD", "GBP"]  # first-seen order
+    assert codes == [0, 1, 0, 2, 1, 0]
+    assert [distinct[c] for c in codes] == labels
+
+
+def test_packed_chart_matches_its_series():
+    chart = Chart(
+        key="revenueByCurrency", title="Revenue by Currency", type="bar",
+        x=["EUR", "USD", "EUR", "Other"],
+        y=[120.5, 80.25, 60.0, 10.0],
+        previous=[100.0, 90.0, 0.0, 5.0],
+        diff=[20.5, -10.83, 0.0, 100.0],
+        drillable=True, nextChart="acquirerByCurrency",
+    )
+    packed = chart.packed()
+
+    assert packed.length == len(chart.x)
+    assert [packed.labels[c] for c in _unpack("I", packed.codes)] == chart.x
+    assert _unpack("d", packed.y) == chart.y
+    assert _unpack("d", packed.previous) == chart.previous
+    assert _unpack("d", packed.diff) == chart.diff
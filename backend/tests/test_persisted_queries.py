@@ -0,0 +1,69 @@
+import json
+
+import pytest
+from starlette.testclient import TestClient
+
+from app.gql_api import persisted_queries
+from app.gql_api.persisted_queries import query_hash
+from app.main import app
+from app.utils.cache import TTLCache
+
+QUERY = "{ __typename }"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(persisted_queries, "PERSISTED_QUERIES", TTLCache())
+    return TestClient(app)
+
+
+def _extensions(sha: str) -> dict:
+    return {"persistedQuery": {"version": 1, "sha256Hash": sha}}
+
+
+def _code(response) -> str:
+    return response.json()["errors"][0]["extensions"]["code"]
+
+
+def test_unknown_hash_asks_for_the_query(client):
+    response = client.post("/graphql", json={"extensions": _extensions(query_hash(QUERY))})
+    assert response.status_code == 200
+    assert _code(response) == "PERSISTED_QUERY_NOT_FOUND"
+
+
+def test_mismatched_hash_is_rejected_and_not_registered(client):
+    sha = query_hash("{ somethingElse }")
+    response = client.post("/graphql", json={"query": QUERY, "extensions": _extensions(sha)})
+    assert "does not match" in response.json()["errors"][0]["message"]
+
+    response = client.post("/graphql", json={"extensions": _extensions(sha)})
+    assert _code(response) == "PERSISTED_QUERY_NOT_FOUND"
+
+
+def test_registered_query_runs_from_its_hash(client):
+    sha = query_hash(QUERY)
+    first = client.post("/graphql", json={"query": QUERY, "extensions": _extensions(sha)})
+    assert first.json() == {"data": {"__typename": "Query"}}
+
+    again = client.post("/graphql", json={"extensions": _extensions(sha)})
+    assert again.json() == {"data": {"__typename": "Query"}}
+
+
+def test_hashed_get_is_cacheable(client):
+    sha = query_hash(QUERY)
+    client.post("/graphql", json={"query": QUERY, "extensions": _extensions(sha)})
+
+    response = client.get("/graphql", params={"extensions": json.dumps(_extensions(sha))})
+    assert response.json() == {"data": {"__typename": "Query"}}
+    assert "max-age" in response.headers.get("Cache-Control", "")
+
+
+def test_requests_without_a_hash_are_unchanged(client):
+    response = client.post("/graphql", json={"query": QUERY})
+    assert response.json() == {"data": {"__typename": "Query"}}
+
+
+def test_syntax_errors_are_graphql_errors(client):
+    response = client.post("/graphql", json={"query": "{ dashboard(filterType: TODAY) { metrics { title "})
+    assert response.status_code == 200
+    assert "Syntax Error" in response.json()["errors"][0]["message"]
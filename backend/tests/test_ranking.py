@@ -0,0 +1,47 @@
+import random
+
+import pytest
+
+from app.gql_api.schema import FilterType
+from app.services import fetch_dashboard
+from app.services.query_planner import OTHER_LABEL, bar_columns, rank_bars
+
+
+def test_rank_bars_breaks_ties_by_name_whatever_the_input_order():
+    rows = [("VISA", 5, 1), ("AMEX", 5, 2), ("JCB", None, 0), ("MIR", 9, 3), ("DINERS", 5, 0)]
+    expected = ["MIR", "AMEX", "DINERS", "VISA", "JCB"]
+    for seed in range(10):
+        shuffled = rows[:]
+        random.Random(seed).shuffle(shuffled)
+        top, tail = rank_bars(shuffled, 3)
+        assert [r[0] for r in top + tail] == expected
+        assert [r[0] for r in tail] == ["VISA", "JCB"]
+
+
+def test_rank_bars_orders_ids_like_their_text():
+    # top_n_sql ties on name::text, so id 10 sorts before id 2
+    top, _ = rank_bars([(2, 1, 0), (10, 1, 0)], 2)
+    assert [r[0] for r in top] == [10, 2]
+
+
+def test_bar_columns_folds_the_tail_into_other():
+    rows = [(f"C{i}", 1, 1) for i in range(30)]
+    names, values, _, other = bar_columns("revenueByCurrency", rows)
+    assert other and names[-1] == OTHER_LABEL
+    assert len(names) == fetch_dashboard.chart_top_n("revenueByCurrency") + 1
+    assert sum(values) == 30
+
+
+def _charts(filter_type: str) -> list:
+    data = fetch_dashboard.get_dashboard_data(filter_type)
+    return [(c["key"], c["x"], c["y"], c["other"]) for c in data["charts"]]
+
+
+@pytest.mark.parametrize("filter_type", [ft.value for ft in FilterType if ft.value != "CUSTOM"])
+def test_fused_and_sequential_plans_rank_alike(database, monkeypatch, filter_type):
+    monkeypatch.setattr(fetch_dashboard, "CACHE_ENABLED", False)
+    monkeypatch.setattr(fetch_dashboard, "MATVIEWS_ENABLED", False)
+    monkeypatch.setattr(fetch_dashboard, "EXECUTION_MODE", "fused")
+    fused = _charts(filter_type)
+    monkeypatch.setattr(fetch_dashboard, "EXECUTION_MODE", "sequential")
+    assert _charts(filter_type) == fused
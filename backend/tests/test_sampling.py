@@ -0,0 +1,76 @@
+import json
+import random
+
+import pytest
+
+from app.services import sampling
+from app.services.sampling import estimate, sample_percent
+
+
+def _page_sample(pages, fraction, rng):
+    """Totals of a Bernoulli page sample as an estimate() row: c0 = sum,
+    c1 = count, with per-page squares and cross products."""
+    kept = [p for p in pages if rng.random() < fraction]
+    sums   = [sum(p) for p in kept]
+    counts = [len(p) for p in kept]
+    row = {
+        "c0":   sum(sums),
+        "c0s":  sum(s * s for s in sums),
+        "c1":   sum(counts),
+        "c1s":  sum(n * n for n in counts),
+        "c0x1": sum(s * n for s, n in zip(sums, counts)),
+    }
+    col = {k: i for i, k in enumerate(row)}
+    return tuple(row.values()), col
+
+
+def _coverage(spec, truth_of, fraction=0.1, trials=400, seed=3):
+    rng   = random.Random(seed)
+    pages = [[rng.lognormvariate(3, 1) for _ in range(rng.randint(20, 60))] for _ in range(2000)]
+    truth = truth_of(pages)
+    hits  = 0
+    for _ in range(trials):
+        row, col = _page_sample(pages, fraction, rng)
+        value, error = estimate(row, col, "c", spec, fraction)
+        hits += abs(value - truth) <= error
+    return hits / trials
+
+
+def test_sum_error_bound_covers_the_truth_at_the_stated_confidence():
+    coverage = _coverage((0,), lambda pages: sum(map(sum, pages)))
+    assert coverage == pytest.approx(sampling.CONFIDENCE, abs=0.04)
+
+
+def test_average_error_bound_covers_the_truth_at_the_stated_confidence():
+    coverage = _coverage(
+        (0, 1), lambda pages: sum(map(sum, pages)) / sum(map(len, pages))
+    )
+    assert coverage == pytest.approx(sampling.CONFIDENCE, abs=0.04)
+
+
+def test_full_sample_is_exact():
+    pages = [[1.0, 2.0], [3.0]]
+    row, col = _page_sample(pages, 1.0, random.Random(0))
+    assert estimate(row, col, "c", (0,), 1.0) == (6.0, 0.0)
+    assert estimate(row, col, "c", (0, 1), 1.0) == (2.0, 0.0)
+
+
+class _Explain:
+    """Connection whose EXPLAIN estimates `rows` rows per period."""
+    def __init__(self, rows):
+        self.rows = rows
+
+    def execute(self, statement, params):
+        plan = json.dumps([{"Plan": {"Plan Rows": self.rows}}])
+        return type("Result", (), {"scalar": lambda _: plan})()
+
+
+def test_sample_percent_targets_rows_and_falls_back_to_exact(monkeypatch):
+    monkeypatch.setattr(sampling, "TARGET_ROWS", 100_000)
+    monkeypatch.setattr(sampling, "MAX_PERCENT", 20.0)
+    monkeypatch.setattr(sampling, "MIN_PERCENT", 0.01)
+
+    assert sample_percent(_Explain(10_000_000), {}) == 1.0
+    # small windows would need over MAX_PERCENT: answered exactly
+    assert sample_percent(_Explain(100_000), {}) is None
+    assert sample_percent(_Explain(10**12), {}) == 0.01
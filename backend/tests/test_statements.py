@@ -0,0 +1,25 @@
+from app.services.chart_configs import BASE_CHART_KEYS
+from app.services.drill_planner import build_drill_plans
+from app.services.fetch_dashboard import (
+    base_chart_statement, metric_statement, precompile_statements
+)
+from app.services.metric_configs import metric_configs
+
+
+def test_precompile_builds_every_statement_once():
+    count = precompile_statements()
+    assert count == len(metric_configs) + len(BASE_CHART_KEYS) + len(build_drill_plans())
+    assert precompile_statements() == count
+
+
+def test_statements_are_reused():
+    key = BASE_CHART_KEYS[0]
+    assert base_chart_statement(key) is base_chart_statement(key)
+    metric = next(iter(metric_configs))
+    assert metric_statement(metric) is metric_statement(metric)
+
+
+def test_chart_statements_bind_only_window_and_top_n_params():
+    for key in BASE_CHART_KEYS:
+        params = set(base_chart_statement(key)._bindparams)
+        assert params == {"s", "e", "cs", "ce", "top_n"}
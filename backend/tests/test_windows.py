@@ -0,0 +1,55 @@
+from datetime import date, timedelta
+
+import pytest
+
+from app.services.fetch_dashboard import _resolve_window
+
+FILTERS = ["TODAY", "YESTERDAY", "DAILY", "WEEKLY", "MTD", "MONTHLY", "YTD"]
+
+
+def _custom(days_back: int, days_long: int) -> tuple:
+    start = date.today() - timedelta(days=days_back)
+    return start, start + timedelta(days=days_long - 1)
+
+
+@pytest.mark.parametrize("filter_type", FILTERS)
+def test_window_key_is_stable(filter_type):
+    assert _resolve_window(filter_type, None).cache_key == \
+        _resolve_window(filter_type, None).cache_key
+
+
+@pytest.mark.parametrize("filter_type", FILTERS)
+def test_window_key_covers_comparison_period(filter_type):
+    window = _resolve_window(filter_type, None)
+    assert window.params["cs"].isoformat() in window.cache_key
+    # live windows key their moving comparison end by date
+    assert {window.params["ce"].isoformat(), window.params["ce"].date().isoformat()} \
+        & set(window.cache_key)
+
+
+def test_same_current_period_different_comparison_do_not_share_key():
+    # WEEKLY compares with the 7 days before; CUSTOM with the day before
+    weekly = _resolve_window("WEEKLY", None)
+    custom = _resolve_window("CUSTOM", (weekly.params["s"], weekly.params["e"]))
+    assert (weekly.params["s"], weekly.params["e"]) == (custom.params["s"], custom.params["e"])
+    assert weekly.params["cs"] != custom.params["cs"]
+    assert weekly.cache_key != custom.cache_key
+
+
+def test_distinct_windows_have_distinct_keys():
+    keys = [_resolve_window(ft, None).cache_key for ft in FILTERS]
+    keys.append(_resolve_window("CUSTOM", _custom(30, 7)).cache_key)
+    assert len(set(keys)) == len(keys)
+
+
+def test_live_custom_ranges_with_different_ends_do_not_share_key():
+    start = date.today() - timedelta(days=3)
+    to_today    = _resolve_window("CUSTOM", (start, date.today())).cache_key
+    to_tomorrow = _resolve_window("CUSTOM", (start, date.today() + timedelta(days=1))).cache_key
+    assert to_today != to_tomorrow
+
+
+def test_today_and_custom_from_today_do_not_share_key():
+    today = _resolve_window("TODAY", None).cache_key
+    custom = _resolve_window("CUSTOM", (date.today(), date.today())).cache_key
+    assert today != custom
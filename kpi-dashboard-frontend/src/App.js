@@ -13,9 +13,14 @@ const DIMENSIONS = [
   { label: "Card Type", value: "credit_card_type" },
   { label: "Currency",  value: "transaction_currency" },
   { label: "Acquirer",  value: "name" },
+  { label: "Merchant",  value: "merchant" },
+  { label: "Region",    value: "region" },
+  { label: "Funding Source", value: "funding_source" },
+  { label: "SCA Type",  value: "sca_type" },
+  { label: "Issuer Country", value: "issuer_country_code" },
 ];
-const LEVEL1 = "DRILL_LVL1";
-const LEVEL2 = "DRILL_LVL2";
+// Drill charts are keyed DRILL_LVL1, DRILL_LVL2, ... (one per level)
+const isDrillKey = (key) => key.startsWith("DRILL_LVL");
 
 // ── Helpers ───────────────────────────────────────────────────────────
 
@@ -62,73 +67,66 @@ function DrillSection({ baseKey, charts, drillKeys, setDrillKeys, filterType })
   const [getInsight, { data: insightData, loading: insightLoading, error: insightError }] =
     useLazyQuery(CHART_INSIGHT, { fetchPolicy: "no-cache" });
 
-  // Find Level 0, 1, 2 charts
+  // Find the base chart, then each drill level below it by following nextChart
   const baseChart = charts.find((c) => c.key === baseKey);
   if (!baseChart) return null;
 
-  const lvl1Key   = baseChart.nextChart;
-  const lvl1Chart = charts.find((c) => c.key === lvl1Key) || null;
-  const lvl2Key   = lvl1Chart?.nextChart;
-  const lvl2Chart = charts.find((c) => c.key === lvl2Key) || null;
-
   const baseVal = drillKeys[baseKey] || null;
-  const lvl1    = drillKeys[lvl1Key] || {};
-  const lvl2    = drillKeys[lvl2Key] || {};
-
-  const atLevel1 = baseVal && lvl1.dimension && !lvl1.value;
-  const atLevel2 = lvl1.value && lvl2.dimension && !lvl2.value;
-
-  // Drill click handlers
-  const onBaseClick = (e, name) =>
-    setContextMenu({ x: e.clientX, y: e.clientY, sliceName: name, level: "base", excludeDimension: null });
-
-  const onLvl1Click = (e, name) =>
-    setContextMenu({ x: e.clientX, y: e.clientY, sliceName: name, level: "lvl1", excludeDimension: lvl1.dimension });
+  const levels  = [];
+  for (let key = baseChart.nextChart; baseVal && key && drillKeys[key]; ) {
+    const chart = charts.find((c) => c.key === key) || null;
+    levels.push({ key, step: drillKeys[key], chart });
+    key = chart?.nextChart;
+  }
+  const current = levels[levels.length - 1] || null;
 
-  const onLvl2Click = (e, name) =>
-    setDrillKeys((prev) => ({ ...prev, [lvl2Key]: { dimension: lvl2.dimension, value: name } }));
+  // Drill click handler: pick the next dimension (not one already on the path)
+  const onDrill = (e, name) =>
+    setContextMenu({
+      x: e.clientX,
+      y: e.clientY,
+      sliceName: name,
+      excludeDimension: levels.map((l) => l.step.dimension),
+    });
 
   const handleDimensionSelect = (dim) => {
-    if (contextMenu.level === "base") {
+    if (!current) {
       setDrillKeys({
         [baseKey]: contextMenu.sliceName,
-        [lvl1Key]: { dimension: dim, value: null },
+        [baseChart.nextChart]: { dimension: dim, value: null },
       });
     } else {
       setDrillKeys((prev) => ({
         ...prev,
-        [lvl1Key]: { dimension: lvl1.dimension, value: contextMenu.sliceName },
-        [lvl2Key]: { dimension: dim, value: null },
+        [current.key]: { ...current.step, value: contextMenu.sliceName },
+        [current.chart.nextChart]: { dimension: dim, value: null },
       }));
     }
     setContextMenu(null);
   };
 
-  // Determine which chart to show & its onDrill handler
-  let chartToShow = baseChart;
-  let onDrill     = onBaseClick;
-  if (atLevel2 && lvl2Chart) {
-    chartToShow = lvl2Chart;
-    onDrill     = onLvl2Click;
-  } else if (atLevel1 && lvl1Chart) {
-    chartToShow = lvl1Chart;
-    onDrill     = onLvl1Click;
-  }
+  // Show the deepest level (the base chart until its data arrives)
+  const chartToShow = current?.chart || baseChart;
+
+  // The folded "Other" bar (last, when chart.other) is not a category to drill
+  // into, and the deepest level the server allows is not drillable
+  const drillTarget = (e, name) => {
+    const last = chartToShow.x[chartToShow.x.length - 1];
+    if (chartToShow.other && name === last) return;
+    if (!chartToShow.drillable || (current && !current.chart)) return;
+    onDrill(e, name);
+  };
 
-  // Back button logic
+  // Back button logic: drop the deepest level and reopen the one above
   let backButton = null;
-  if (atLevel2) {
+  if (current) {
+    const parent = levels[levels.length - 2] || null;
     backButton = renderBack(() => {
       const nk = { ...drillKeys };
-      delete nk[lvl2Key];
+      delete nk[current.key];
+      if (parent) nk[parent.key] = { ...parent.step, value: null };
       setDrillKeys(nk);
-    }, lvl1.value);
-  } else if (atLevel1) {
-    backButton = renderBack(() => {
-      const nk = { ...drillKeys };
-      delete nk[lvl1Key];
-      setDrillKeys(nk);
-    }, "Overview");
+    }, parent ? parent.step.value : "Overview");
   }
 
   return (
@@ -158,7 +156,7 @@ function DrillSection({ baseKey, charts, drillKeys, setDrillKeys, filterType })
       </div>
 
       {/* ECharts container */}
-      <ChartContainer chart={chartToShow} onDrill={onDrill} key={chartToShow.key} />
+      <ChartContainer chart={chartToShow} onDrill={drillTarget} key={chartToShow.key} />
 
       {/* AI Insight */}
       {insightError && <p style={{ color: "red" }}>Error: {insightError.message}</p>}
@@ -197,21 +195,50 @@ function DrillSection({ baseKey, charts, drillKeys, setDrillKeys, filterType })
   );
 }
 
+// Shown while the base charts are estimates from a sample
+function ApproximateBanner({ charts, onExact }) {
+  const pct = charts.find((c) => c.samplePercent)?.samplePercent;
+  return (
+    <div
+      style={{
+        margin: "0 20px",
+        padding: "8px 12px",
+        display: "flex",
+        justifyContent: "space-between",
+        alignItems: "center",
+        backgroundColor: "#fff8e1",
+        border: "1px solid #ffe082",
+        borderRadius: 4,
+      }}
+    >
+      <span>Approximate: estimated from a {pct}% sample (± shows the error bound).</span>
+      <button onClick={onExact} style={backButtonStyle}>
+        Load exact
+      </button>
+    </div>
+  );
+}
+
 // ── DashboardPage ───────────────────────────────────────────────────
 function DashboardPage() {
   const [drillKeys, setDrillKeys] = useState({});
-  const { data, loading, error } = useDashboard("YTD", null, drillKeys);
+  // wide windows load from a sample first; one click swaps in exact values
+  const [precision, setPrecision] = useState("APPROXIMATE");
+  const { data, loading, error } = useDashboard("YTD", null, drillKeys, precision);
 
   if (loading) return <CenteredMessage text="Loading dashboard…" />;
   if (error)   return <CenteredMessage text={`Error: ${error.message}`} retry />;
   if (!data?.dashboard) return <CenteredMessage text="No data" />;
 
   const { charts } = data.dashboard;
-  const baseKeys = charts.map((c) => c.key).filter((k) => k !== LEVEL1 && k !== LEVEL2);
+  const baseKeys = charts.map((c) => c.key).filter((k) => !isDrillKey(k));
 
   return (
     <div style={{ padding: 20, maxWidth: 1200, margin: "auto" }}>
       <h1>Dashboard</h1>
+      {data.dashboard.precision === "APPROXIMATE" && (
+        <ApproximateBanner charts={charts} onExact={() => setPrecision("EXACT")} />
+      )}
       {baseKeys.map((key) => (
         <DrillSection
           key={key}
@@ -1,6 +1,20 @@
 import { ApolloClient, InMemoryCache, HttpLink } from "@apollo/client";
+import { createPersistedQueryLink } from "@apollo/client/link/persisted-queries";
+
+// Automatic persisted queries: send the sha256 of the document and only
+// fall back to the full text when the server hasn't seen it yet. Hashed
+// queries go out as GETs so intermediaries can cache them.
+async function sha256(query) {
+  const bytes = new TextEncoder().encode(query);
+  const digest = await crypto.subtle.digest("SHA-256", bytes);
+  return Array.from(new Uint8Array(digest))
+    .map((b) => b.toString(16).padStart(2, "0"))
+    .join("");
+}
+
+const persistedQueries = createPersistedQueryLink({ sha256, useGETForHashedQueries: true });
 
 export const client = new ApolloClient({
-  link: new HttpLink({ uri: "http://localhost:8023/graphql" }),
+  link: persistedQueries.concat(new HttpLink({ uri: "http://localhost:8023/graphql" })),
   cache: new InMemoryCache(),
 });
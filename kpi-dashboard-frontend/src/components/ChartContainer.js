@@ -6,7 +6,14 @@ export function ChartContainer({ chart, onDrill }) {
   const rawId = useId()
   const echartsId = rawId.replace(/[^a-zA-Z0-9-_]/g, "") || `chart-${Math.random().toString(36).substr(2, 9)}`
 
-  const { title, type, x = [], y = [], drillable } = chart
+  const { title, type, x = [], y = [], drillable, error } = chart
+
+  // APPROXIMATE charts: show each estimate with its +/- error bound
+  const withError = (p) => {
+    const item = Array.isArray(p) ? p[0] : p
+    const bound = error[item.dataIndex]
+    return `${item.name}: ≈ ${Math.round(item.value).toLocaleString()} ± ${Math.round(bound).toLocaleString()}`
+  }
 
   console.log("ChartContainer rendered:", {
     title,
@@ -25,7 +32,7 @@ export function ChartContainer({ chart, onDrill }) {
     type === "pie"
       ? {
           title: { text: title, left: "center" },
-          tooltip: { trigger: "item" },
+          tooltip: { trigger: "item", ...(error ? { formatter: withError } : {}) },
           legend: { orient: "horizontal", top: 25 },
           series: [
             {
@@ -38,7 +45,7 @@ export function ChartContainer({ chart, onDrill }) {
         }
       : {
           title: { text: title, left: "center" },
-          tooltip: { trigger: "axis" },
+          tooltip: { trigger: "axis", ...(error ? { formatter: withError } : {}) },
           xAxis: { type: "category", data: x },
           yAxis: { type: "value" },
           series: [
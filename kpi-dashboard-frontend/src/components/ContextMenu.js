@@ -75,10 +75,9 @@ export function ContextMenu({ x, y, onClose, onSelect, sliceName, dimensions, ex
     top: Math.min(y, window.innerHeight - 200),
   }
 
-  // Filter out excluded dimension if provided
-  const availableDimensions = excludeDimension 
-    ? dimensions.filter(d => d.value !== excludeDimension)
-    : dimensions
+  // Filter out excluded dimension(s) if provided
+  const excluded = [].concat(excludeDimension || [])
+  const availableDimensions = dimensions.filter(d => !excluded.includes(d.value))
 
   return (
     <div ref={menuRef} style={adjustedStyle}>
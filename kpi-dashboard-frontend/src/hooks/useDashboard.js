@@ -4,9 +4,16 @@ const DASHBOARD_QUERY = gql`
   query Dashboard(
     $filterType: FilterType!,
     $custom:     CustomRange,
-    $drillKeys:  JSON
+    $drillKeys:  JSON,
+    $precision:  Precision
   ) {
-    dashboard(filterType: $filterType, custom: $custom, drillKeys: $drillKeys) {
+    dashboard(
+      filterType: $filterType,
+      custom:     $custom,
+      drillKeys:  $drillKeys,
+      precision:  $precision
+    ) {
+      precision
       metrics {
         title
         value
@@ -20,16 +27,20 @@ const DASHBOARD_QUERY = gql`
         y
         drillable
         nextChart
+        other
+        error
+        samplePercent
       }
     }
   }
 `;
 
-export function useDashboard(filterType, custom, drillKeys) {
+export function useDashboard(filterType, custom, drillKeys, precision = "EXACT") {
   const variables = {
     filterType,
     custom: filterType === "CUSTOM" ? custom : null,
     drillKeys,
+    precision,
   };
   return useQuery(DASHBOARD_QUERY, { variables, fetchPolicy: "network-only" });
 }